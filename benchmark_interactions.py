@@ -0,0 +1,185 @@
+"""Compare the quote_interactions layouts: insert throughput, lookups and file size.
+
+'rowid' is the layout before migration 6 (AUTOINCREMENT id, three flag
+columns, text timestamps, UNIQUE(user_id, quote_id) plus its indexes);
+'packed' is the current one (WITHOUT ROWID on (user_id, quote_id), one flags
+integer, Unix-second timestamps). Both are written with the upsert the
+interaction buffer uses, in batched transactions, into throwaway databases.
+
+Usage: python benchmark_interactions.py [--rows N] [--batch-size N] [--dir PATH]
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from itertools import islice
+from typing import Callable, Iterator, List, NamedTuple, Tuple
+
+QUOTES = 10_000            # distinct quote ids the simulated users interact with
+LOOKUPS = 100_000
+
+class Layout(NamedTuple):
+    name: str
+    schema: Tuple[str, ...]
+    upsert: str
+    lookup: str
+    pack: bool            # bind one flags integer instead of three columns
+
+ROWID = Layout(
+    'rowid',
+    (
+        '''
+        CREATE TABLE quote_interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            quote_id INTEGER,
+            is_liked INTEGER DEFAULT 0,
+            is_disliked INTEGER DEFAULT 0,
+            is_favorited INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, quote_id)
+        )''',
+        "CREATE INDEX idx_disliked ON quote_interactions(user_id, quote_id) WHERE is_disliked = 1",
+        "CREATE INDEX idx_liked_listing ON quote_interactions(user_id, updated_at, quote_id) WHERE is_liked = 1",
+        "CREATE INDEX idx_disliked_listing ON quote_interactions(user_id, updated_at, quote_id) WHERE is_disliked = 1",
+        "CREATE INDEX idx_quote ON quote_interactions(quote_id)",
+    ),
+    '''
+    INSERT INTO quote_interactions (user_id, quote_id, is_liked, is_disliked, is_favorited)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, quote_id) DO UPDATE SET
+        is_liked = excluded.is_liked,
+        is_disliked = excluded.is_disliked,
+        is_favorited = excluded.is_favorited,
+        updated_at = CURRENT_TIMESTAMP
+    ''',
+    "SELECT is_liked, is_disliked, is_favorited FROM quote_interactions WHERE user_id = ? AND quote_id = ?",
+    pack=False,
+)
+
+PACKED = Layout(
+    'packed',
+    (
+        '''
+        CREATE TABLE quote_interactions (
+            user_id INTEGER NOT NULL,
+            quote_id INTEGER NOT NULL,
+            flags INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (user_id, quote_id)
+        ) WITHOUT ROWID''',
+        "CREATE INDEX idx_liked_listing ON quote_interactions(user_id, updated_at) WHERE flags & 1",
+        "CREATE INDEX idx_disliked_listing ON quote_interactions(user_id, updated_at) WHERE flags & 2",
+    ),
+    '''
+    INSERT INTO quote_interactions (user_id, quote_id, flags, updated_at)
+    VALUES (?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT(user_id, quote_id) DO UPDATE SET
+        flags = excluded.flags,
+        updated_at = excluded.updated_at
+    ''',
+    "SELECT flags FROM quote_interactions WHERE user_id = ? AND quote_id = ?",
+    pack=True,
+)
+
+
+def pair_at(rows: int, seed: int = 42) -> Callable[[int], Tuple[int, int]]:
+    """Map 0..rows-1 to distinct (user_id, quote_id) pairs in a scattered, repeatable order."""
+    users = max(1, -(-rows // QUOTES))
+    total = users * QUOTES
+    step = random.Random(seed).randrange(1, total) | 1
+    while math.gcd(step, total) != 1:
+        step += 2
+    def pair(i: int) -> Tuple[int, int]:
+        position = (i * step) % total
+        return position // QUOTES + 1, position % QUOTES + 1
+    return pair
+
+
+def interactions(rows: int, pack: bool) -> Iterator[tuple]:
+    """Upsert parameters: mostly likes, some dislikes, a few favorites."""
+    rng = random.Random(7)
+    pair = pair_at(rows)
+    for user_id, quote_id in map(pair, range(rows)):
+        roll = rng.random()
+        liked, disliked = roll < 0.7, 0.7 <= roll < 0.95
+        favorited = rng.random() < 0.05
+        if pack:
+            yield user_id, quote_id, liked | disliked << 1 | favorited << 2
+        else:
+            yield user_id, quote_id, int(liked), int(disliked), int(favorited)
+
+
+def batches(rows: Iterator, size: int) -> Iterator[List]:
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def run(layout: Layout, rows: int, batch_size: int, directory: str) -> dict:
+    path = os.path.join(directory, f"interactions_{layout.name}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -16384")
+    for statement in layout.schema:
+        conn.execute(statement)
+    conn.commit()
+
+    started = time.perf_counter()
+    written = 0
+    for batch in batches(interactions(rows, layout.pack), batch_size):
+        with conn:  # one transaction per batch, like the interaction buffer
+            conn.executemany(layout.upsert, batch)
+        written += len(batch)
+        print(f"  … {layout.name}: {written:,} rows", end="\r")
+    insert_seconds = time.perf_counter() - started
+
+    keys = list(map(pair_at(rows), random.Random(1).sample(range(rows), min(LOOKUPS, rows))))
+    started = time.perf_counter()
+    for key in keys:
+        conn.execute(layout.lookup, key).fetchone()
+    lookup_seconds = time.perf_counter() - started
+
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    size = os.path.getsize(path)
+    return {
+        'layout': layout.name,
+        'rows_per_s': rows / insert_seconds,
+        'insert_s': insert_seconds,
+        'lookups_per_s': len(keys) / max(lookup_seconds, 1e-9),
+        'size': size,
+        'bytes_per_row': size / rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--dir", help="where to write the databases (default: a temp dir, removed afterwards)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.dir or scratch
+        print(f"Writing {args.rows:,} interactions per layout to {directory}")
+        results = [run(layout, args.rows, args.batch_size, directory) for layout in (ROWID, PACKED)]
+
+    print(f"\n{'layout':<8} {'insert rows/s':>14} {'insert s':>9} {'lookups/s':>10} {'size MiB':>9} {'B/row':>6}")
+    for r in results:
+        print(f"{r['layout']:<8} {r['rows_per_s']:>14,.0f} {r['insert_s']:>9.1f} {r['lookups_per_s']:>10,.0f} "
+              f"{r['size'] / 2**20:>9.1f} {r['bytes_per_row']:>6.1f}")
+    old, new = results
+    print(f"\npacked vs rowid: {new['rows_per_s'] / old['rows_per_s']:.2f}x insert throughput, "
+          f"{new['size'] / old['size']:.0%} of the size")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import logging
 import os
+import time
 from dotenv import load_dotenv
 
 from telegram.ext import Application
@@ -10,9 +11,9 @@ from telegram.request import HTTPXRequest
 
 # ─── project imports ────────────────────────────────────────────
 from bot.handlers import setup_handlers
-from bot.tasks.quote_tasks import send_daily_quotes_task
+from bot.tasks.quote_tasks import send_daily_quotes_task, send_quote_batch, reconcile_quote_stats_task
 from bot.services import quote_service, scheduler_service
-from quote_bot.db import init_db
+from quote_bot.db import init_db, close_connections, async_repository, interaction_buffer
 
 # ─── logging ────────────────────────────────────────────────────
 logging.basicConfig(
@@ -29,49 +30,81 @@ logger = logging.getLogger(__name__)
 async def _post_init(app: Application) -> None:
     """Runs once, right after PTB has started (event-loop alive)."""
     scheduler_service.start()
-    
-    # Store bot instance in scheduler service for user-specific jobs
-    scheduler_service._bot_instance = app.bot
-    logger.info("Bot instance stored in scheduler service ✅")
 
     async def _send_quotes_wrapper() -> None:
         # adapter: APScheduler → coroutine without parameters
         await send_daily_quotes_task(app.bot)
 
+    async def _send_slot_batch(user_ids) -> None:
+        # adapter: delivery slot → one batch of users
+        await send_quote_batch(app.bot, user_ids)
+
+    # per-user delivery slots send through the batched path
+    scheduler_service.set_daily_delivery(_send_slot_batch)
+
     # one global dispatch every day at 07:00 UTC (change if you like)
     scheduler_service.schedule_global_daily(_send_quotes_wrapper, hour=7, minute=0)
     logger.info("Daily-quote job scheduled (07:00 UTC) ✅")
+
+    # like/dislike taps are written in group commits
+    interaction_buffer.flush_interval_ms = int(os.getenv("INTERACTION_FLUSH_MS", "250"))
+    interaction_buffer.max_events = int(os.getenv("INTERACTION_FLUSH_EVENTS", "500"))
+    interaction_buffer.start()
+    logger.info(f"Interaction writes flushed every {interaction_buffer.flush_interval_ms}ms ✅")
+
+    # author / topic search indexes, built in the background
+    app.create_task(quote_service.prepare_indexes())
+
+    # pick up edits to quotes.csv / quotes.qbin without a restart
+    watch_seconds = int(os.getenv("QUOTES_WATCH_SECONDS", "60"))
+    if watch_seconds > 0:
+        scheduler_service.schedule_interval("quotes_watch", quote_service.check_for_updates, seconds=watch_seconds)
+        logger.info(f"Watching quote sources every {watch_seconds}s ✅")
+
+    # popularity weights for weighted selection, refreshed off the hot path
+    if quote_service.selection_mode == 'weighted':
+        await quote_service.refresh_popularity()
+        refresh_seconds = int(os.getenv("POPULARITY_REFRESH_SECONDS", "300"))
+        scheduler_service.schedule_interval("popularity_refresh", quote_service.refresh_popularity, seconds=refresh_seconds)
+        logger.info(f"Popularity weights refresh every {refresh_seconds}s ✅")
+    
+    # quote_stats counters: recount from the interactions, report and fix drift
+    reconcile_seconds = int(os.getenv("QUOTE_STATS_RECONCILE_SECONDS", "86400"))
+    if reconcile_seconds > 0:
+        scheduler_service.schedule_interval("quote_stats_reconcile", reconcile_quote_stats_task, seconds=reconcile_seconds)
+        logger.info(f"quote_stats reconciled every {reconcile_seconds}s ✅")
     
-    # Schedule existing users' daily quotes
+    # Schedule existing users' daily quotes, streamed in the background
+    app.create_task(_schedule_existing_users(app))
+
+
+async def _schedule_existing_users(app: Application) -> None:
+    """Register every onboarded user's daily quote, one chunk of users at a time."""
+    from quote_bot.db import iter_users_with_preferences
+
+    started = time.perf_counter()
+    scheduled = skipped = 0
     try:
-        from quote_bot.db import get_all_users_with_preferences
-        users_with_prefs = get_all_users_with_preferences()
-        for user_id, prefs in users_with_prefs:
-            from bot.tasks.quote_tasks import send_quote_to_user
-            
-            # Parse delivery time to handle test options like "21:52 (Test)"
-            delivery_time = prefs.get('delivery_time', '07:00')
-            if '(' in delivery_time:
-                delivery_time = delivery_time.split('(')[0].strip()
-            
-            # Update prefs with parsed time
-            prefs_copy = prefs.copy()
-            prefs_copy['delivery_time'] = delivery_time
-            
-            async def user_quote_wrapper(uid: int):
-                await send_quote_to_user(app.bot, uid)
-            
-            scheduler_service.schedule_user_daily_quote(user_id, prefs_copy, user_quote_wrapper)
-            logger.info(f"Scheduled existing user {user_id} for daily quotes at {delivery_time}")
+        async for chunk in async_repository.stream(iter_users_with_preferences()):
+            done, bad = scheduler_service.schedule_users_daily_quotes(chunk)
+            scheduled += done
+            skipped += bad
     except Exception as e:
         logger.error(f"Error scheduling existing users: {e}")
         import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
+    logger.info(
+        f"Scheduled {scheduled} existing users in {scheduler_service.slot_count()} delivery slots "
+        f"({skipped} skipped for invalid preferences) in {time.perf_counter() - started:.1f}s ✅"
+    )
 
 
 async def _on_shutdown(_: Application) -> None:
     """Called when PTB begins shutting down (loop still alive)."""
     scheduler_service.shutdown()
+    async_repository.shutdown()
+    interaction_buffer.stop()   # durably write buffered taps and deliveries
+    close_connections()
 
 
 # ─────────────────────────── main ──────────────────────────────
@@ -84,6 +117,7 @@ def main() -> None:
 
     # DB + quotes
     init_db()
+    quote_service.set_selection_mode(os.getenv("QUOTE_SELECTION_MODE", "rotation"))
     quote_service.load_quotes()
 
     # Telegram client
@@ -3,7 +3,7 @@ import logging
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CallbackQueryHandler, ContextTypes, Application
 from telegram.constants import ParseMode
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
 
 from bot.utils.helpers import escape_markdown
 from bot.services.quote_service import quote_service
@@ -11,52 +11,28 @@ from quote_bot.db.interaction_repository import (
     toggle_like,
     toggle_dislike,
     toggle_favorite,
-    get_quote_interaction,
-    update_quote_interaction
+    get_quote_interaction
 )
-from quote_bot.db.user_repository import get_user
+from quote_bot.db import async_repository as repo
 
 logger = logging.getLogger(__name__)
 
-def _extract_quote_parts(message_text: str) -> tuple[str, str]:
-    """Extract quote text and author from a formatted message."""
-    if not message_text:
-        return "Unknown quote", "Unknown"
-    
-    # Remove HTML tags for processing
-    import re
-    clean_text = re.sub(r'<[^>]+>', '', message_text)
-    
-    # Try to split by author pattern (— AuthorName)
-    parts = clean_text.split('\n— ')
-    if len(parts) == 2:
-        quote_text = parts[0].strip().strip('"')
-        author = parts[1].strip()
-        return quote_text, author
-    
-    # Try to split by author pattern (- AuthorName)
-    parts = clean_text.split('\n- ')
-    if len(parts) == 2:
-        quote_text = parts[0].strip().strip('"')
-        author = parts[1].strip()
-        return quote_text, author
-    
-    # If no author found, return the whole text as quote
-    quote_text = clean_text.strip().strip('"')
-    return quote_text, "Unknown"
-
-def get_quote_keyboard(quote_id: int, user_id: int) -> InlineKeyboardMarkup:
+def get_quote_keyboard(quote_id: int, user_id: int,
+                       interaction: Optional[Dict[str, Any]] = None) -> InlineKeyboardMarkup:
     """Generate an inline keyboard for a quote with like/dislike buttons.
     
     Args:
         quote_id: The ID of the quote
         user_id: The ID of the user
+        interaction: The user's current interaction with the quote, if
+            already known; otherwise it is looked up (blocking)
         
     Returns:
         InlineKeyboardMarkup: The generated keyboard
     """
     # Get the current interaction status
-    interaction = get_quote_interaction(user_id, quote_id) or {}
+    if interaction is None:
+        interaction = get_quote_interaction(user_id, quote_id) or {}
     
     # Create buttons with appropriate emojis based on current state
     like_emoji = '👍' if not interaction.get('is_liked') else '❤️'
@@ -80,6 +56,11 @@ def get_quote_keyboard(quote_id: int, user_id: int) -> InlineKeyboardMarkup:
     
     return InlineKeyboardMarkup(keyboard)
 
+async def quote_keyboard(quote_id: int, user_id: int) -> InlineKeyboardMarkup:
+    """get_quote_keyboard() for async code: the lookup runs on the database thread."""
+    interaction = await repo.get_quote_interaction(user_id, quote_id)
+    return get_quote_keyboard(quote_id, user_id, interaction or {})
+
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle all callback queries."""
     query = update.callback_query
@@ -108,21 +89,17 @@ async def handle_like(query, user_id: int, quote_id: int) -> None:
         # Get the current message text
         current_text = query.message.text
         
-        # Extract quote text and author from the message
-        quote_text, quote_author = _extract_quote_parts(current_text)
-        
-        # Always save to liked quotes (remove from disliked if exists)
-        update_quote_interaction(
+        # Always save to liked quotes (remove from disliked if exists);
+        # only the IDs are stored, the text comes from the corpus / ai_quotes
+        state = await repo.queue_quote_interaction(
             user_id,
             quote_id,
-            quote_text=quote_text,
-            quote_author=quote_author,
             is_liked=1,
             is_disliked=0
         )
         
-        # Get the updated keyboard
-        keyboard = get_quote_keyboard(quote_id, user_id)
+        # Both buttons' flags were just set, so the keyboard needs no read
+        keyboard = get_quote_keyboard(quote_id, user_id, state)
         
         # Update the message with the same text but updated keyboard
         await query.edit_message_text(
@@ -144,21 +121,16 @@ async def handle_dislike(query, user_id: int, quote_id: int) -> None:
         # Get the current message text
         current_text = query.message.text
         
-        # Extract quote text and author from the message
-        quote_text, quote_author = _extract_quote_parts(current_text)
-        
         # Always save to disliked quotes (remove from liked if exists)
-        update_quote_interaction(
+        state = await repo.queue_quote_interaction(
             user_id,
             quote_id,
-            quote_text=quote_text,
-            quote_author=quote_author,
             is_liked=0,
             is_disliked=1
         )
         
-        # Get the updated keyboard
-        keyboard = get_quote_keyboard(quote_id, user_id)
+        # Both buttons' flags were just set, so the keyboard needs no read
+        keyboard = get_quote_keyboard(quote_id, user_id, state)
         
         # Update the message with the same text but updated keyboard
         await query.edit_message_text(
@@ -178,15 +150,10 @@ async def handle_another_quote(query, user_id: int, current_quote_id: int) -> No
     """Handle request for another quote."""
     try:
         # Get user preferences
-        user = get_user(user_id)
-        prefs = {
-            'is_paused': user.get('is_paused', False),
-            'preferred_time': user.get('preferred_time'),
-            'timezone': user.get('timezone')
-        } if user else {}
+        prefs = (await repo.get_user_profile(user_id)).as_prefs()
         
         # Get a new quote
-        quote_data = quote_service.get_quote_for_user(user_id, prefs)
+        quote_data = await repo.run(quote_service.get_quote_for_user, user_id, prefs)
         
         if not quote_data or quote_data['id'] == current_quote_id:
             await query.answer("No more quotes available right now!")
@@ -202,7 +169,7 @@ async def handle_another_quote(query, user_id: int, current_quote_id: int) -> No
             message_text += f'<i>\n\n- {author}</i>'
         
         # Get the keyboard with like/dislike buttons
-        keyboard = get_quote_keyboard(quote_data['id'], user_id)
+        keyboard = await quote_keyboard(quote_data['id'], user_id)
         
         # Update the message with the new quote
         await query.edit_message_text(
@@ -211,6 +178,7 @@ async def handle_another_quote(query, user_id: int, current_quote_id: int) -> No
             parse_mode='HTML',
             disable_web_page_preview=True
         )
+        await repo.record_quote_delivery(quote_data['id'])
     except Exception as e:
         logger.error(f"Error in handle_another_quote: {e}", exc_info=True)
         await query.answer("Sorry, there was an error getting another quote. Please try again.")
@@ -1,25 +1,23 @@
 """Command handlers for the Quote Bot."""
 import asyncio
 import logging
+import os
 import re
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes, Application
-from quote_bot.db.user_repository import record_daily_interaction, get_streak_badge
-from quote_bot.db.user_repository import get_user_prefs 
+from quote_bot.db.user_repository import get_streak_badge
+from quote_bot.db import async_repository as repo
 from bot.services.ai_service import ai_service
 from bot.services import quote_service
 from bot.utils.helpers import escape_markdown, format_quote
-from bot.handlers.callbacks import get_quote_keyboard
-from quote_bot.db.interaction_repository import get_quotes_by_interaction, get_quote_interaction
-from quote_bot.db.quote_repository import get_quote_by_id
-from quote_bot.db.user_repository import get_user, update_user_status, add_user
+from bot.handlers.callbacks import get_quote_keyboard, quote_keyboard
 
 logger = logging.getLogger(__name__)
 
 async def _maybe_send_streak(update: Update, user_id: int) -> None:
     """If this is the first interaction today, bump/reset and send their streak badge."""
     try:
-        streak = record_daily_interaction(user_id)
+        streak = await repo.record_daily_interaction(user_id)
         if streak:
             badge = get_streak_badge(streak)
             msg = f"🔥 You’ve used me {streak} day{'s' if streak > 1 else ''} in a row!"
@@ -33,7 +31,7 @@ async def _maybe_send_streak(update: Update, user_id: int) -> None:
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /start command."""
     user = update.effective_user
-    add_user(user.id)
+    await repo.add_user(user.id)
     
     await update.message.reply_text(
         f"Hi {user.first_name}! I'm your Quote Bot.\n\n"
@@ -78,9 +76,8 @@ async def random_quote(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     """Handle the /random command."""
     user_id = update.effective_user.id
     
-    prefs = get_user_prefs(user_id) or {}
-    prefs['is_active'] = not get_user(user_id).is_paused
-    quote_data = quote_service.get_quote_for_user(user_id, prefs)
+    prefs = (await repo.get_user_profile(user_id)).as_prefs()
+    quote_data = await repo.run(quote_service.get_quote_for_user, user_id, prefs)
     
     
     if not quote_data:
@@ -99,7 +96,7 @@ async def random_quote(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         message_text += f'\n\n💡 <b>Takeaway:</b> {takeaway}'
         
     # Get the keyboard with like/dislike/favorite buttons
-    keyboard = get_quote_keyboard(quote_data['id'], user_id)
+    keyboard = await quote_keyboard(quote_data['id'], user_id)
         
     # Send the quote with HTML parsing
     await update.message.reply_text(
@@ -108,13 +105,14 @@ async def random_quote(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         parse_mode='HTML',
         disable_web_page_preview=True
     )
+    await repo.record_quote_delivery(quote_data['id'])
 
     await _maybe_send_streak(update, user_id)
 
 async def pause(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /pause command."""
     user_id = update.effective_user.id
-    update_user_status(user_id, is_paused=True)
+    await repo.update_user_status(user_id, is_paused=True)
     
     await update.message.reply_text(
         "⏸️ You've paused your daily quotes. Use /resume to start receiving them again."
@@ -123,7 +121,7 @@ async def pause(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def resume(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /resume command."""
     user_id = update.effective_user.id
-    update_user_status(user_id, is_paused=False)
+    await repo.update_user_status(user_id, is_paused=False)
     
     await update.message.reply_text(
         "▶️ You've resumed your daily quotes. You'll receive your next quote as scheduled."
@@ -132,11 +130,12 @@ async def resume(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /status command."""
     user_id = update.effective_user.id
-    user = get_user(user_id)
+    profile = await repo.get_user_profile(user_id)
+    user = profile.user
     if user:
         prefs = {
             'is_active': not user.is_paused,
-            'preferred_time': getattr(user, 'preferred_time', None),
+            'preferred_time': profile.preferences.get('delivery_time'),
             'timezone': getattr(user, 'timezone', None),
         }
     else:
@@ -157,7 +156,7 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def show_liked_quotes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /liked command to show all liked quotes (stripping out takeaways)."""
     user_id = update.effective_user.id
-    rows = get_quotes_by_interaction(user_id, 'liked')
+    rows = await repo.get_quotes_by_interaction(user_id, 'liked', resolve=quote_service.quotes.get)
     if not rows:
         await update.message.reply_text(
             "You haven't liked any quotes yet. Use the 👍 button to like quotes!"
@@ -189,7 +188,7 @@ async def show_liked_quotes(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def show_disliked_quotes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /disliked command to show all disliked quotes (stripping out takeaways)."""
     user_id = update.effective_user.id
-    rows = get_quotes_by_interaction(user_id, 'disliked')
+    rows = await repo.get_quotes_by_interaction(user_id, 'disliked', resolve=quote_service.quotes.get)
     if not rows:
         await update.message.reply_text(
             "You haven't disliked any quotes yet. Use the 👎 button to dislike quotes."
@@ -222,7 +221,7 @@ async def generate_quote(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """Generate an AI‐crafted quote with a one-line takeaway, cleanly formatted."""
     user_id = update.effective_user.id
     
-    prefs = get_user_prefs(user_id)
+    prefs = await repo.get_user_prefs(user_id)
     if not prefs:
         return await update.message.reply_text("I don’t have your preferences yet. Please run /onboard first 😊")
 
@@ -253,25 +252,39 @@ async def generate_quote(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if prefs.get("context_line",1) and takeaway:
         msg += f'\n\n<b>🔍 Takeaway:</b> {escape_markdown(takeaway)}'
 
-    # send with keyboard
-    quote_id = -int(asyncio.get_event_loop().time()*1000)
-    keyboard = get_quote_keyboard(quote_id, user_id)
+    # send with keyboard (stored so 👍/👎 can refer to it by ID)
+    quote_id = await repo.save_ai_quote(quote_line, author, takeaway or None)
+    keyboard = get_quote_keyboard(quote_id, user_id, {})
     await update.message.reply_text(msg, parse_mode="HTML", reply_markup=keyboard)
 
     # show streak once per day
     await _maybe_send_streak(update, user_id)
 
 async def author_deep_dive(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle `/author <name>` → returns 5 quotes by that author via AI."""
+    """Handle `/author <name>` → returns 5 quotes by that author.
+    
+    Quotes come from the local corpus when it knows the author; the AI is
+    only asked for however many are still missing.
+    """
     # parse the author name from the command args
     args = context.args
     if not args:
         await update.message.reply_text("Usage: /author <Author Name>")
         return
     author = " ".join(args)
-    await update.message.reply_text(f"🔎 Looking up quotes by *{author}*…", parse_mode="Markdown")
+    count = 5
     
-    quotes = await ai_service.deep_dive_by_author(author, count=5)
+    # A cold or just-reloaded author index is built here: keep it off the
+    # event loop and off the database thread
+    loop = asyncio.get_running_loop()
+    name, local = await loop.run_in_executor(None, quote_service.quotes_by_author, author, count)
+    quotes = [f'"{q["quote"]}" - {q["author"]}' for q in local]
+    if len(quotes) < count:
+        await update.message.reply_text(f"🔎 Looking up quotes by *{name or author}*…", parse_mode="Markdown")
+        known = {q["quote"].casefold() for q in local}
+        extra = await ai_service.deep_dive_by_author(name or author, count=count - len(quotes))
+        quotes += [line for line in extra
+                   if not any(text in line.casefold() for text in known)]
     if not quotes:
         await update.message.reply_text(
             f"Sorry, I couldn’t fetch quotes by {author} right now."
@@ -283,15 +296,25 @@ async def author_deep_dive(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await update.message.reply_text(text, parse_mode="Markdown")
 
 async def quote_topic(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle `/quote <topic>` → returns 3 fitting quotes via AI."""
+    """Handle `/quote <topic>` → returns 3 fitting quotes.
+    
+    The most relevant corpus quotes come first; the AI only fills in when
+    the corpus has fewer than three matches.
+    """
     args = context.args
     if not args:
         await update.message.reply_text("Usage: /quote <topic>\nE.g. /quote resilience")
         return
     
     topic = " ".join(args)
-    await update.message.reply_text(f"🔎 Fetching quotes about *{topic}*…", parse_mode="Markdown")
-    quotes = await ai_service.generate_by_topic(topic, count=3)
+    count = 3
+    # Off the event loop and the database thread, like /author
+    loop = asyncio.get_running_loop()
+    local = await loop.run_in_executor(None, quote_service.quotes_by_topic, topic, count)
+    quotes = [f'"{q["quote"]}" - {q["author"]}' for q in local]
+    if len(quotes) < count:
+        await update.message.reply_text(f"🔎 Fetching quotes about *{topic}*…", parse_mode="Markdown")
+        quotes += await ai_service.generate_by_topic(topic, count=count - len(quotes))
 
     if not quotes:
         return await update.message.reply_text(
@@ -301,6 +324,44 @@ async def quote_topic(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     out = "\n\n".join(f"{i+1}. {q}" for i, q in enumerate(quotes))
     await update.message.reply_text(out, parse_mode="Markdown")
 
+def _is_admin(user_id: int) -> bool:
+    """True if *user_id* is listed in the ADMIN_USER_IDS env var (comma-separated)."""
+    admins = os.getenv("ADMIN_USER_IDS", "")
+    return str(user_id) in {a.strip() for a in admins.split(",") if a.strip()}
+
+async def reload_quotes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the admin-only /reload command: rebuild and swap the quote corpus."""
+    if not _is_admin(update.effective_user.id):
+        return
+    
+    await update.message.reply_text("🔄 Reloading quotes…")
+    if await quote_service.reload_quotes():
+        await update.message.reply_text(f"✅ Loaded {len(quote_service.quotes)} quotes.")
+    else:
+        await update.message.reply_text("⚠️ Reload skipped (already running or the new corpus is empty).")
+
+async def quote_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the admin-only /quotestats [quote_id] command: engagement counters."""
+    if not _is_admin(update.effective_user.id):
+        return
+    
+    def line(stats) -> str:
+        return (f"#{stats.quote_id}: 👍 {stats.likes} · 👎 {stats.dislikes} · "
+                f"⭐ {stats.favorites} · 📨 {stats.deliveries}")
+    
+    if context.args:
+        if not context.args[0].isdigit():
+            await update.message.reply_text("Usage: /quotestats [quote_id]")
+            return
+        await update.message.reply_text(line(await repo.get_quote_stats(int(context.args[0]))))
+        return
+    
+    top = await repo.get_top_quote_stats('likes', limit=10)
+    if not top:
+        await update.message.reply_text("No quote engagement recorded yet.")
+        return
+    await update.message.reply_text("Most liked quotes:\n" + "\n".join(line(stats) for stats in top))
+
 def setup_command_handlers(application: Application) -> None:
     """Set up all command handlers."""
     application.add_handler(CommandHandler("start", start))
@@ -314,6 +375,8 @@ def setup_command_handlers(application: Application) -> None:
     application.add_handler(CommandHandler("disliked", show_disliked_quotes))
     application.add_handler(CommandHandler("author", author_deep_dive))
     application.add_handler(CommandHandler("quote", quote_topic))
+    application.add_handler(CommandHandler("reload", reload_quotes))
+    application.add_handler(CommandHandler("quotestats", quote_stats))
     
     logger.info("Command handlers have been set up")
     logger.info("Added /author deep-dive handler")
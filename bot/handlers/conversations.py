@@ -9,7 +9,7 @@ from telegram.ext import (
     ContextTypes
 )
 
-from quote_bot.db import save_user_preferences
+from quote_bot.db import async_repository as repo
 
 logger = logging.getLogger(__name__)
 
@@ -173,7 +173,7 @@ async def onboarding_complete(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # Save preferences to database
     user_id = update.effective_user.id
-    save_user_preferences(user_id, context.user_data)
+    await repo.save_user_preferences(user_id, context.user_data)
     
     await update.message.reply_text(
         "🎉 All set! Your preferences have been saved.\n\n"
@@ -0,0 +1,45 @@
+"""Vose alias tables for O(1) weighted sampling."""
+import random
+from array import array
+from typing import Sequence
+
+
+class AliasTable:
+    """Sample indexes ``0..n-1`` with probability proportional to their weights.
+
+    Building the table is O(n); every draw afterwards is O(1): pick a
+    column uniformly, then keep it or take its alias by a biased coin flip.
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        if not n:
+            raise ValueError("AliasTable needs at least one weight")
+        total = float(sum(weights))
+        if total <= 0:
+            weights, total = [1.0] * n, float(n)
+
+        self.size = n
+        self.prob = array('d', [0.0]) * n
+        self.alias = array('I', [0]) * n
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1.0 up to floating-point error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def draw(self, rng: random.Random = random) -> int:
+        """Return one weighted-random index."""
+        column = rng.randrange(self.size)
+        return column if rng.random() < self.prob[column] else self.alias[column]
+
+    def __len__(self) -> int:
+        return self.size
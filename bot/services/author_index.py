@@ -0,0 +1,117 @@
+"""Normalized, typo-tolerant lookup of authors in the quote corpus.
+
+Author names are matched in three steps, stopping at the first hit:
+
+1. exact match on a normalized key (case, diacritics and punctuation
+   folded: "Søren Kierkegaard" and "soren kierkegaard" are the same key)
+2. initials match ("JK Rowling", "J. K. Rowling" and "Joanne K. Rowling"
+   all reduce to "jk rowling")
+3. fuzzy match by trigram Jaccard similarity against full names and
+   surnames ("Ralph Waldo Emmersen", "einstien")
+"""
+import re
+import unicodedata
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .quote_store import QuoteStore
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Minimum trigram Jaccard similarity for a fuzzy match
+FUZZY_THRESHOLD = 0.4
+
+
+def author_key(name: Optional[str]) -> str:
+    """Fold case, diacritics and punctuation: "J.R.R. Tolkién" → "j r r tolkien"."""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(_TOKEN_RE.findall(stripped.casefold()))
+
+
+def initials_key(key: str) -> str:
+    """Reduce given names to initials: "joanne k rowling" → "jk rowling".
+
+    Tokens of one or two letters are taken as initials already ("jk").
+    """
+    tokens = key.split()
+    if len(tokens) < 2:
+        return key
+    given = ''.join(t if len(t) <= 2 else t[0] for t in tokens[:-1])
+    return f"{given} {tokens[-1]}"
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of *key*, padded so short names still get some."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AuthorIndex:
+    """Author key → quote positions, with initials and trigram lookups."""
+
+    def __init__(self, store: QuoteStore):
+        positions: Dict[str, array] = defaultdict(lambda: array('I'))
+        names: Dict[str, str] = {}
+        keys_by_code = [author_key(name) for name in store.authors.values]
+        for pos, code in enumerate(store.author_codes):
+            key = keys_by_code[code]
+            if key:
+                positions[key].append(pos)
+                names.setdefault(key, store.authors[code])
+
+        self.positions: Dict[str, array] = dict(positions)
+        self.names = names
+        # Full keys and bare surnames ("einstein") are both matchable aliases
+        self._aliases: Dict[str, List[str]] = defaultdict(list)
+        self._by_initials: Dict[str, List[str]] = defaultdict(list)
+        for key in self.positions:
+            self._by_initials[initials_key(key)].append(key)
+            self._aliases[key].append(key)
+            surname = key.rsplit(' ', 1)[-1]
+            if surname != key:
+                self._aliases[surname].append(key)
+        self._by_trigram: Dict[str, List[str]] = defaultdict(list)
+        self._trigram_counts: Dict[str, int] = {}
+        for alias in self._aliases:
+            grams = trigrams(alias)
+            self._trigram_counts[alias] = len(grams)
+            for gram in grams:
+                self._by_trigram[gram].append(alias)
+
+    def match(self, name: str) -> Optional[str]:
+        """Return the index key that best matches *name*, or None."""
+        key = author_key(name)
+        if not key:
+            return None
+        if key in self.positions:
+            return key
+        for candidates in (self._aliases.get(key, []), self._by_initials.get(initials_key(key), [])):
+            if len(candidates) == 1:
+                return candidates[0]
+
+        grams = trigrams(key)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for alias in self._by_trigram.get(gram, ()):
+                shared[alias] += 1
+        best, best_score = None, FUZZY_THRESHOLD
+        for alias, common in shared.items():
+            score = common / (len(grams) + self._trigram_counts[alias] - common)
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = alias, score
+        if best is None:
+            return None
+        # An ambiguous surname ("Roosevelt") resolves to its most quoted author
+        return max(self._aliases[best], key=lambda k: len(self.positions[k]))
+
+    def lookup(self, name: str) -> Tuple[Optional[str], array]:
+        """Return the display name and quote positions for *name*.
+
+        Returns ``(None, empty array)`` when no author matches.
+        """
+        key = self.match(name)
+        if key is None:
+            return None, array('I')
+        return self.names[key], self.positions[key]
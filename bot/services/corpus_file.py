@@ -0,0 +1,291 @@
+"""Loading the quote corpus from SQLite, CSV or a precompiled binary file.
+
+The ``quotes`` table (filled by ``import_quotes.py``) is the source of
+truth; the CSV is only read directly while the database holds no quotes.
+
+The binary corpus (``quotes.qbin``) holds the QuoteStore columns and the
+QuoteIndex posting lists in one file, laid out so they can be used in place
+through ``mmap``: starting a worker costs a few page faults instead of a
+CSV parse, and every process on the host shares the same page-cache pages.
+
+Layout (all integers native little-endian, sections 8-byte aligned)::
+
+    header    magic "QOTD", format version, flags, quote count,
+              source CRC32, section count
+    sections  table of (name, offset, length) entries, then the sections:
+              ids        int64[n]
+              words      uint16[n]
+              authc/topicc/tonec
+                         uint32[n] dictionary codes
+              offsets    uint64[2n+1] into ``text``
+              text       UTF-8 quote and takeaway texts
+              authors/topics/tones
+                         string tables
+              ixtopic/ixword/ixauth/ixlen
+                         posting lists keyed by sorted UTF-8 strings
+"""
+import csv
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .quote_index import QuoteIndex
+from .quote_store import QuoteStore, StringTable
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'QOTD'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIII')   # magic, version, flags, count, crc, sections
+_FLAG_SORTED_IDS = 0x1
+_SECTION = struct.Struct('<8sQQ')     # name, offset, length
+_ALIGN = 8
+
+# Index attributes and the section each one is stored in
+_POSTING_SECTIONS = {
+    'topics': b'ixtopic',
+    'keywords': b'ixword',
+    'authors': b'ixauth',
+    'lengths': b'ixlen',
+}
+
+
+class CorpusFormatError(Exception):
+    """Raised when a binary corpus file is missing, corrupt or incompatible."""
+
+
+# ─────────────── SQLITE ────────────────
+def load_db() -> Optional[QuoteStore]:
+    """Read the quotes table into a QuoteStore (ids are the table ids).
+
+    Returns:
+        The store, versioned by the table's corpus version, or None if the
+        database holds no quotes
+    """
+    from quote_bot.db import get_corpus_version, iter_quotes
+    version = get_corpus_version()
+    if version is None:
+        return None
+    store = QuoteStore.from_rows(iter_quotes())
+    store.version = version
+    return store
+
+
+# ─────────────── CSV ────────────────
+def source_checksum(path: str) -> int:
+    """CRC32 of a corpus source file, used as the corpus version."""
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def load_csv(path: str) -> QuoteStore:
+    """Parse a quotes CSV into a QuoteStore.
+
+    Rows without a numeric ``id`` column are numbered by line (1-based).
+    """
+    store = QuoteStore()
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for idx, row in enumerate(reader, 1):
+            # Ensure each quote has an ID
+            try:
+                row['id'] = int(row.get('id') or idx)
+            except (ValueError, TypeError):
+                row['id'] = idx  # Fallback to line number if ID is not a number
+            store.append(row)
+    store.version = source_checksum(path)
+    return store
+
+
+# ─────────────── WRITING ────────────────
+def _pack_strings(values: List[str]) -> bytes:
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = array('I', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return struct.pack('<I', len(encoded)) + offsets.tobytes() + b''.join(encoded)
+
+
+def _pack_postings(postings: Dict[str, array]) -> bytes:
+    items = sorted((key.encode('utf-8'), positions) for key, positions in postings.items())
+    key_offsets, post_offsets = array('I', [0]), array('I', [0])
+    positions = array('I')
+    for key, plist in items:
+        key_offsets.append(key_offsets[-1] + len(key))
+        positions.extend(plist)
+        post_offsets.append(len(positions))
+    return (
+        struct.pack('<I', len(items))
+        + key_offsets.tobytes()
+        + post_offsets.tobytes()
+        + positions.tobytes()
+        + b''.join(key for key, _ in items)
+    )
+
+
+def write_corpus(store: QuoteStore, index: QuoteIndex, path: str) -> None:
+    """Serialize *store* and *index* to *path* (atomically replaced)."""
+    sections = [
+        (b'ids', store.ids.tobytes()),
+        (b'words', store.word_counts.tobytes()),
+        (b'authc', store.author_codes.tobytes()),
+        (b'topicc', store.topic_codes.tobytes()),
+        (b'tonec', store.tone_codes.tobytes()),
+        (b'offsets', store.offsets.tobytes()),
+        (b'text', bytes(store.buffer)),
+        (b'authors', _pack_strings(store.authors.values)),
+        (b'topics', _pack_strings(store.topics.values)),
+        (b'tones', _pack_strings(store.tones.values)),
+    ]
+    sections += [(name, _pack_postings(getattr(index, attr)))
+                 for attr, name in _POSTING_SECTIONS.items()]
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table, body = [], []
+    for name, data in sections:
+        padding = -offset % _ALIGN
+        body.append(b'\0' * padding)
+        offset += padding
+        table.append(_SECTION.pack(name, offset, len(data)))
+        body.append(data)
+        offset += len(data)
+
+    flags = _FLAG_SORTED_IDS if store.sorted_ids else 0
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(store),
+                          store.version, len(sections))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.writelines(table)
+        f.writelines(body)
+    # Processes that still map the old file keep their pages until they reload
+    os.replace(tmp_path, path)
+
+
+def compile_corpus(csv_path: str, out_path: str) -> int:
+    """Compile the quote corpus into a binary corpus file; returns the quote count.
+
+    Compiles the quotes table, or the CSV at *csv_path* if the database
+    holds no quotes.
+    """
+    store = load_db() or load_csv(csv_path)
+    write_corpus(store, QuoteIndex(store), out_path)
+    return len(store)
+
+
+# ─────────────── READING ────────────────
+def _unpack_strings(view: memoryview) -> List[str]:
+    count = struct.unpack_from('<I', view)[0]
+    offsets = view[4:8 + 4 * count].cast('I')
+    blob = view[8 + 4 * count:]
+    return [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(count)]
+
+
+class PackedPostings(Mapping):
+    """Read-only key → positions mapping over a packed postings section.
+
+    Keys are looked up by binary search over the sorted UTF-8 key table, so
+    nothing is decoded until a key is actually requested.
+    """
+
+    def __init__(self, view: memoryview):
+        self._count = count = struct.unpack_from('<I', view)[0]
+        header = 4 + 4 * (count + 1)
+        self._key_offsets = view[4:header].cast('I')
+        self._post_offsets = view[header:header + 4 * (count + 1)].cast('I')
+        positions_start = header + 4 * (count + 1)
+        positions_end = positions_start + 4 * self._post_offsets[count]
+        self._positions = view[positions_start:positions_end].cast('I')
+        self._keys = view[positions_end:]
+
+    def _key(self, i: int) -> bytes:
+        return bytes(self._keys[self._key_offsets[i]:self._key_offsets[i + 1]])
+
+    def _find(self, key: str) -> int:
+        target = key.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self._count and self._key(lo) == target else -1
+
+    def __getitem__(self, key: str) -> memoryview:
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._positions[self._post_offsets[i]:self._post_offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._key(i).decode('utf-8') for i in range(self._count))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def load_corpus(path: str) -> Tuple[QuoteStore, QuoteIndex]:
+    """Memory-map a binary corpus and return its store and index.
+
+    Raises:
+        CorpusFormatError: If the file is unreadable or was written by an
+            incompatible version of this module.
+    """
+    if sys.byteorder != 'little':
+        raise CorpusFormatError("binary corpus requires a little-endian host")
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise CorpusFormatError(f"cannot map {path}: {e}") from e
+
+    view = memoryview(mapped)
+    try:
+        magic, version, flags, count, crc, n_sections = _HEADER.unpack_from(view)
+    except struct.error as e:
+        raise CorpusFormatError(f"truncated corpus header in {path}") from e
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CorpusFormatError(f"{path} is not a v{FORMAT_VERSION} quote corpus")
+
+    sections: Dict[bytes, memoryview] = {}
+    for i in range(n_sections):
+        name, offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+        if offset + length > len(view):
+            raise CorpusFormatError(f"section {name!r} runs past the end of {path}")
+        sections[name.rstrip(b'\0')] = view[offset:offset + length]
+
+    try:
+        store = QuoteStore.from_columns(
+            ids=sections[b'ids'].cast('q'),
+            word_counts=sections[b'words'].cast('H'),
+            author_codes=sections[b'authc'].cast('I'),
+            topic_codes=sections[b'topicc'].cast('I'),
+            tone_codes=sections[b'tonec'].cast('I'),
+            authors=StringTable(_unpack_strings(sections[b'authors'])),
+            topics=StringTable(_unpack_strings(sections[b'topics'])),
+            tones=StringTable(_unpack_strings(sections[b'tones'])),
+            buffer=sections[b'text'],
+            offsets=sections[b'offsets'].cast('Q'),
+            sorted_ids=bool(flags & _FLAG_SORTED_IDS),
+        )
+        postings = {attr: PackedPostings(sections[name])
+                    for attr, name in _POSTING_SECTIONS.items()}
+    except KeyError as e:
+        raise CorpusFormatError(f"{path} is missing section {e}") from e
+    if len(store) != count:
+        raise CorpusFormatError(f"{path} holds {len(store)} quotes, header says {count}")
+
+    store.version = crc
+    store.mapping = mapped  # keep the map open as long as the store is in use
+    return store, QuoteIndex(store, postings)
@@ -0,0 +1,209 @@
+"""Inverted indexes and bitmask filters over the quote corpus.
+
+Every quote gets a *position* (its offset in the corpus). Index keys map to
+posting lists of positions, and filters are plain Python ints used as
+bitsets over those positions, so combining filters is a single AND.
+"""
+import random
+import re
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional
+
+from .quote_store import QuoteStore, QuoteView
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Length buckets offered during onboarding (see conversations.get_quote_length_keyboard)
+LENGTH_BUCKETS = ('short', 'medium', 'long')
+
+# Number of materialized key masks kept around per index
+MASK_CACHE_SIZE = 512
+
+# Random probes tried before falling back to an exact rank lookup
+_PICK_PROBES = 16
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase and collapse whitespace so keys compare reliably."""
+    return " ".join((text or "").lower().split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _WORD_RE.findall((text or "").lower())
+
+
+def length_bucket(word_count: int) -> Optional[str]:
+    """Return the length bucket a quote with *word_count* words falls into."""
+    if word_count < 10:
+        return 'short'
+    if 10 <= word_count <= 15:
+        return 'medium'
+    if word_count > 20:
+        return 'long'
+    return None
+
+
+def parse_length_pref(pref: Optional[str]) -> Optional[str]:
+    """Map a stored quote_length preference (e.g. "Short (< 10 words)") to a bucket."""
+    pref = normalize(pref)
+    for bucket in LENGTH_BUCKETS:
+        if pref.startswith(bucket):
+            return bucket
+    return None
+
+
+def popcount(mask: int) -> int:
+    """Number of set bits in *mask*."""
+    return bin(mask).count('1')
+
+
+def nth_set_bit(mask: int, n: int) -> int:
+    """Return the position of the *n*-th (0-based) set bit of *mask*."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for offset in range(0, len(data), 8):
+        word = int.from_bytes(data[offset:offset + 8], 'little')
+        count = popcount(word)
+        if n >= count:
+            n -= count
+            continue
+        for _ in range(n):
+            word &= word - 1  # drop lowest set bit
+        return offset * 8 + (word & -word).bit_length() - 1
+    raise IndexError("mask has fewer set bits than requested")
+
+
+def iter_set_bits(mask: int) -> Iterable[int]:
+    """Yield the positions of the set bits of *mask* in ascending order."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for offset in range(0, len(data), 8):
+        word = int.from_bytes(data[offset:offset + 8], 'little')
+        while word:
+            low = word & -word
+            yield offset * 8 + low.bit_length() - 1
+            word ^= low
+
+
+class QuoteIndex:
+    """Topic, keyword, author and length indexes with bitmask filters."""
+
+    def __init__(self, store: QuoteStore, postings: Optional[Dict[str, Mapping]] = None):
+        """Index *store*, or wrap already-built posting lists.
+
+        Args:
+            store: The quote corpus to index
+            postings: Prebuilt ``topics``/``keywords``/``authors``/``lengths``
+                mappings (e.g. from a binary corpus); built from *store* if omitted
+        """
+        self.store = store
+        if postings is None:
+            postings = self._build_postings(store)
+        self.topics: Mapping = postings['topics']
+        self.keywords: Mapping = postings['keywords']
+        self.authors: Mapping = postings['authors']
+        self.lengths: Mapping = postings['lengths']
+        self._masks: 'OrderedDict[tuple, int]' = OrderedDict()
+        self.size = len(store)
+        self.full_mask = (1 << self.size) - 1
+
+    @staticmethod
+    def _build_postings(store: QuoteStore) -> Dict[str, Dict[str, array]]:
+        """Build all posting lists in a single pass over *store*."""
+        topics: Dict[str, array] = {}
+        keywords: Dict[str, array] = {}
+        authors: Dict[str, array] = {}
+        lengths: Dict[str, array] = {bucket: array('I') for bucket in LENGTH_BUCKETS}
+
+        # Topics and authors are dictionary-encoded: index each distinct
+        # value once and expand to positions through the code columns
+        topic_keys = [normalize(t) for t in store.topics.values]
+        author_keys = [normalize(a) for a in store.authors.values]
+
+        for pos in range(len(store)):
+            topic = topic_keys[store.topic_codes[pos]]
+            if topic:
+                topics.setdefault(topic, array('I')).append(pos)
+
+            for word in set(tokenize(store.text(pos))):
+                keywords.setdefault(word, array('I')).append(pos)
+
+            author = author_keys[store.author_codes[pos]]
+            if author:
+                authors.setdefault(author, array('I')).append(pos)
+
+            bucket = length_bucket(store.word_counts[pos])
+            if bucket:
+                lengths[bucket].append(pos)
+
+        return {'topics': topics, 'keywords': keywords, 'authors': authors, 'lengths': lengths}
+
+    # ─────────────── MASK CONSTRUCTION ────────────────
+    def positions_mask(self, positions: Iterable[int]) -> int:
+        """Build a bitmask with the given positions set."""
+        bits = bytearray((self.size + 7) // 8)
+        for pos in positions:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        return int.from_bytes(bits, 'little')
+
+    def ids_mask(self, quote_ids: Iterable[int]) -> int:
+        """Build a bitmask of the positions of *quote_ids* (unknown ids are ignored)."""
+        positions = (self.store.position(qid) for qid in quote_ids)
+        return self.positions_mask(pos for pos in positions if pos is not None)
+
+    def _key_mask(self, kind: str, key: str) -> int:
+        """Return (and memoize) the mask for one index key."""
+        cache_key = (kind, key)
+        mask = self._masks.get(cache_key)
+        if mask is not None:
+            self._masks.move_to_end(cache_key)
+            return mask
+        postings = getattr(self, kind).get(key)
+        mask = self.positions_mask(postings) if postings else 0
+        self._masks[cache_key] = mask
+        if len(self._masks) > MASK_CACHE_SIZE:
+            self._masks.popitem(last=False)
+        return mask
+
+    def topic_mask(self, topics: Iterable[str]) -> int:
+        """Mask of quotes tagged with, or mentioning, any of *topics*.
+
+        A quote matches a topic if its CSV ``topic`` column equals it, or if
+        its text contains every keyword of the topic.
+        """
+        result = 0
+        for topic in topics:
+            result |= self._key_mask('topics', normalize(topic))
+            words = tokenize(topic)
+            if words:
+                matches = self._key_mask('keywords', words[0])
+                for word in words[1:]:
+                    matches &= self._key_mask('keywords', word)
+                result |= matches
+        return result
+
+    def author_mask(self, author: str) -> int:
+        """Mask of quotes by *author* (case-insensitive)."""
+        return self._key_mask('authors', normalize(author))
+
+    def length_mask(self, bucket: str) -> int:
+        """Mask of quotes in the given length bucket."""
+        return self._key_mask('lengths', bucket)
+
+    # ─────────────── SELECTION ────────────────
+    @staticmethod
+    def mask_positions(mask: int) -> array:
+        """Expand *mask* into an ascending array of positions."""
+        return array('I', iter_set_bits(mask))
+
+    def pick(self, mask: int, rng: random.Random = random) -> Optional[QuoteView]:
+        """Pick a uniformly random quote among the positions set in *mask*."""
+        if not mask:
+            return None
+        # Dense masks: a few random probes almost always hit
+        for _ in range(_PICK_PROBES):
+            pos = rng.randrange(self.size)
+            if (mask >> pos) & 1:
+                return self.store[pos]
+        return self.store[nth_set_bit(mask, rng.randrange(popcount(mask)))]
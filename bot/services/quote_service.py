@@ -1,26 +1,158 @@
 """Quote management service for the Quote Bot."""
-import csv
+import asyncio
 import logging
+import os
 import random
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import TYPE_CHECKING, Any, Callable, List, Dict, NamedTuple, Optional, Sequence, Tuple, FrozenSet
 import datetime as dt
 import zoneinfo    
 
+from .alias import AliasTable
+from .author_index import AuthorIndex
+from .corpus_file import CorpusFormatError, load_corpus, load_csv, load_db, write_corpus
+from .quote_index import QuoteIndex, normalize, parse_length_pref
+from .quote_store import QuoteStore, QuoteView
+from .rotation import SeededPermutation, filter_signature, new_seed
+from .topic_search import TopicSearch
+
+if TYPE_CHECKING:
+    from quote_bot.db.models import RotationState
+
 logger = logging.getLogger(__name__)
 
+# How many users' rotation states are kept in memory (all are persisted)
+ROTATION_CACHE_MAX = 100_000
+# How many distinct filter combinations keep their eligible positions expanded
+ELIGIBLE_CACHE_MAX = 256
+
+# 'rotation': no repeats until a user's filtered corpus is exhausted
+# 'weighted': draw in proportion to 👍/👎 engagement (repeats possible)
+SELECTION_MODES = ('rotation', 'weighted')
+# Weighted draws tried before giving up on finding a non-disliked quote
+WEIGHTED_DRAW_ATTEMPTS = 32
+
+# Database corpus version, CSV mtime and compiled corpus mtime (None if absent)
+SourceState = Tuple[Optional[int], Optional[float], Optional[float]]
+
+
+@dataclass(frozen=True)
+class CorpusSnapshot:
+    """An immutable, fully indexed version of the quote corpus.
+
+    Readers grab ``QuoteService.snapshot`` once per operation; a reload
+    builds a new snapshot and swaps the reference, so in-flight selections
+    finish against the corpus they started with.
+    """
+    store: QuoteStore
+    index: QuoteIndex
+    source_state: SourceState = (None, None, None)
+
+    @property
+    def version(self) -> int:
+        """Version (database corpus version or CSV checksum) of the source."""
+        return self.store.version
+
+    @classmethod
+    def empty(cls, source_state: SourceState = (None, None, None)) -> 'CorpusSnapshot':
+        store = QuoteStore()
+        return cls(store, QuoteIndex(store), source_state)
+
+
+class WeightedBucket(NamedTuple):
+    """Alias table over the quotes matching one filter combination."""
+    table: AliasTable
+    positions: array
+    mask: int
+
+
 class QuoteService:
     """Handles quote loading and selection."""
     
-    def __init__(self, quotes_file: str = 'quotes.csv'):
+    def __init__(self, quotes_file: str = 'quotes.csv', corpus_file: Optional[str] = None,
+                 selection_mode: str = 'rotation'):
         """Initialize the quote service.
         
+        Quotes are loaded lazily on first use, or explicitly via load_quotes().
+        
         Args:
             quotes_file: Path to the CSV file containing quotes
+            corpus_file: Path to the compiled binary corpus (defaults to the
+                CSV path with a ``.qbin`` suffix)
+            selection_mode: One of SELECTION_MODES
         """
         self.quotes_file = quotes_file
-        self.quotes: List[Dict[str, Any]] = []
-        self.load_quotes()
+        self.corpus_file = corpus_file or str(Path(quotes_file).with_suffix('.qbin'))
+        self.snapshot = CorpusSnapshot.empty()
+        self._loaded = False
+        self._reloading = False
+        self._rotations: 'OrderedDict[int, RotationState]' = OrderedDict()
+        self._eligible: 'OrderedDict[Tuple[int, int], array]' = OrderedDict()
+        self._weights: Dict[int, float] = {}
+        self._buckets: 'OrderedDict[Tuple[int, int], WeightedBucket]' = OrderedDict()
+        self._derived: Dict[str, Tuple[CorpusSnapshot, Any]] = {}
+        self._derive_lock = threading.Lock()
+        self.set_selection_mode(selection_mode)
+
+    def set_selection_mode(self, mode: str) -> None:
+        """Switch between 'rotation' and 'weighted' quote selection."""
+        if mode not in SELECTION_MODES:
+            raise ValueError(f"selection_mode must be one of {SELECTION_MODES}, got {mode!r}")
+        self.selection_mode = mode
+
+    @property
+    def quotes(self) -> QuoteStore:
+        """The quotes of the current snapshot."""
+        return self.snapshot.store
+
+    @property
+    def index(self) -> QuoteIndex:
+        """The index of the current snapshot."""
+        return self.snapshot.index
+
+    @property
+    def author_index(self) -> AuthorIndex:
+        """The author index of the current snapshot (built on first use)."""
+        return self._derive(self.snapshot, AuthorIndex)
+
+    @property
+    def topic_search(self) -> TopicSearch:
+        """The TF-IDF topic index of the current snapshot (built on first use)."""
+        return self._derive(self.snapshot, TopicSearch)
+
+    def _derive(self, snapshot: CorpusSnapshot, factory: Callable[[QuoteStore], Any]) -> Any:
+        """Return *factory*'s index over *snapshot*, building it once per snapshot.
+        
+        Derived indexes are only built on the default executor (lookups,
+        prepare_indexes, reloads); the lock makes a lookup that races a build
+        wait for it instead of building the same index again.
+        """
+        cached = self._derived.get(factory.__name__)
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+        with self._derive_lock:
+            cached = self._derived.get(factory.__name__)
+            if cached is None or cached[0] is not snapshot:
+                cached = self._derived[factory.__name__] = (snapshot, factory(snapshot.store))
+            return cached[1]
+
+    def _prepare(self, snapshot: CorpusSnapshot) -> None:
+        """Build the secondary indexes of *snapshot* ahead of first use."""
+        for factory in (AuthorIndex, TopicSearch):
+            self._derive(snapshot, factory)
+
+    async def prepare_indexes(self) -> None:
+        """Build the current snapshot's author and topic indexes off the event loop.
+        
+        Reloads do this before swapping; call it once after load_quotes()
+        so the first /author or /quote doesn't pay for the build.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._prepare, self.snapshot)
     
     def should_send_today(prefs: dict) -> bool:
         """
@@ -34,95 +166,432 @@ class QuoteService:
         return True
     
     def load_quotes(self) -> None:
-        """Load quotes from the CSV file."""
+        """Load quotes, preferring the compiled corpus when it is up to date.
+        
+        The quotes table in SQLite is the source of truth. The binary corpus
+        is a memory-mapped copy of it, so loading it is near-instant and its
+        pages are shared between processes; it is used while its version
+        matches the database. If it is missing, stale or unreadable, the
+        table is read instead (or quotes.csv, while the database is empty).
+        """
+        self._loaded = True
+        self._install(self._build_snapshot())
+
+    def _install(self, snapshot: CorpusSnapshot) -> None:
+        """Swap in *snapshot*, dropping database-side quote caches if it changed."""
+        from quote_bot.db.cache import quote_cache
+        if snapshot.version != self.snapshot.version:
+            quote_cache.invalidate()
+        self.snapshot = snapshot
+
+    async def reload_quotes(self) -> bool:
+        """Rebuild the corpus off the event loop and swap it in atomically.
+        
+        Returns:
+            bool: True if a new snapshot was installed, False if a reload was
+            already running or the new corpus came out empty
+        """
+        if self._reloading:
+            return False
+        self._reloading = True
         try:
-            with open(self.quotes_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                self.quotes = []
-                for idx, row in enumerate(reader, 1):
-                    # Ensure each quote has an ID
-                    if 'id' not in row or not row['id']:
-                        row['id'] = str(idx)
-                    try:
-                        row['id'] = int(row['id'])
-                    except (ValueError, TypeError):
-                        row['id'] = idx  # Fallback to line number if ID is not a number
-                    self.quotes.append(row)
-                    
-            logger.info(f"Loaded {len(self.quotes)} quotes from {self.quotes_file}")
-        except FileNotFoundError:
-            logger.error(f"Quotes file not found: {self.quotes_file}")
-            self.quotes = []
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(None, self._build_snapshot)
+            if not snapshot.store and self.snapshot.store:
+                logger.error("Reload produced an empty corpus; keeping the current one")
+                return False
+            await loop.run_in_executor(None, self._prepare, snapshot)
+        finally:
+            self._reloading = False
+        
+        self._install(snapshot)
+        self._loaded = True
+        logger.info(f"Reloaded quote corpus: {len(snapshot.store)} quotes (version {snapshot.version:08x})")
+        return True
+
+    async def check_for_updates(self) -> None:
+        """Reload the corpus if the database, CSV or compiled corpus changed."""
+        if not self._loaded:
+            return
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(None, self._source_state)
+        if state != self.snapshot.source_state:
+            logger.info("Quote sources changed, reloading")
+            await self.reload_quotes()
+
+    def _build_snapshot(self) -> CorpusSnapshot:
+        """Load and index the corpus (safe to run in a worker thread)."""
+        state = self._source_state()
+        db_version, csv_mtime, corpus_mtime = state
+        if corpus_mtime is not None and (db_version is not None or csv_mtime is None
+                                         or corpus_mtime >= csv_mtime):
+            try:
+                store, index = load_corpus(self.corpus_file)
+                if db_version is None or store.version == db_version:
+                    logger.info(f"Mapped {len(store)} quotes from {self.corpus_file}")
+                    return CorpusSnapshot(store, index, state)
+                logger.info("Compiled corpus predates the last quote import")
+            except CorpusFormatError as e:
+                logger.warning(f"Ignoring compiled corpus: {e}")
+        
+        store = load_db() if db_version is not None else None
+        if store is not None:
+            logger.info(f"Loaded {len(store)} quotes from the database")
+        else:
+            try:
+                store = load_csv(self.quotes_file)
+            except FileNotFoundError:
+                logger.error(f"Quotes file not found: {self.quotes_file}")
+                return CorpusSnapshot.empty(state)
+            logger.info(f"Loaded {len(store)} quotes from {self.quotes_file}")
+        index = QuoteIndex(store)
+        
+        if corpus_mtime is not None:
+            # A compiled corpus is in use but stale: refresh it for the next start
+            try:
+                write_corpus(store, index, self.corpus_file)
+                state = self._source_state()
+            except OSError as e:
+                logger.warning(f"Could not refresh compiled corpus: {e}")
+        return CorpusSnapshot(store, index, state)
+
+    def _source_state(self) -> SourceState:
+        """Database corpus version and the CSV / compiled corpus modification times."""
+        from quote_bot.db import get_corpus_version
+        def mtime(path: str) -> Optional[float]:
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return None
+        return get_corpus_version(), mtime(self.quotes_file), mtime(self.corpus_file)
+
+    @staticmethod
+    def _preferred_topics(prefs: Dict) -> List[str]:
+        """Collect topics from either a ``topics`` list or ``topic1``..``topic3`` keys."""
+        topics = list(prefs.get('topics') or [])
+        topics += [prefs.get(f'topic{i}') for i in range(1, 4)]
+        return [t for t in topics if t]
     
-    def get_quote_for_user(self, user_id: int, prefs: Optional[Dict] = None) -> Optional[Dict]:
+    def get_quote_for_user(self, user_id: int, prefs: Optional[Dict] = None) -> Optional[QuoteView]:
         """Get a personalized quote for a user based on their preferences.
         
+        Quotes come from the user's rotation: a seeded permutation of every
+        quote matching their filters, walked with a persisted cursor, so no
+        quote repeats until all of them have been shown.
+        
         Args:
             user_id: The ID of the user
             prefs: User preferences (optional)
             
         Returns:
-            Optional[Dict]: A quote or None if no quotes are available
+            Optional[QuoteView]: A quote or None if no quotes are available
+        
+        Blocking (queries the database) - from async code, run it on the
+        database thread with ``await async_repository.run(...)``.
         """
-        if not self.quotes:
+        if not self._loaded:
+            self.load_quotes()
+        snapshot = self.snapshot
+        if not snapshot.store:
             return None
-            
-        if not prefs:
-            return random.choice(self.quotes)
+        prefs = prefs or {}
         
         # Get disliked quote IDs to exclude
-        from quote_bot.db import get_disliked_quote_ids
-        disliked_quotes = get_disliked_quote_ids(user_id)
-        
-        # Filter quotes by topics if specified
-        topics = [prefs.get(f'topic{i}') for i in range(1, 4) if prefs.get(f'topic{i}')]
-        topics = [t.lower() for t in topics if t]
-        
-        candidate_quotes = []
-        for quote in self.quotes:
-            # Skip disliked quotes
-            if quote['id'] in disliked_quotes:
-                continue
-                
-            # Filter by topic if specified
-            if topics and not any(topic in quote.get('quote', '').lower() for topic in topics):
-                continue
-                
-            candidate_quotes.append(quote)
-        
-        # If no quotes match topics, use all non-disliked quotes
-        if not candidate_quotes:
-            candidate_quotes = [q for q in self.quotes if q['id'] not in disliked_quotes]
-        
-        # If still no quotes, use all quotes (including disliked ones as last resort)
-        if not candidate_quotes:
-            candidate_quotes = self.quotes
+        from quote_bot.db import get_disliked_quote_id_set
+        disliked = get_disliked_quote_id_set(user_id)
+        index = snapshot.index
+        
+        filters = self._filters(prefs)
+        eligible, signature = self._filter_mask(index, filters, index.full_mask)
+        if self.selection_mode == 'weighted':
+            quote = self._weighted_pick(snapshot, eligible, signature, disliked)
+        else:
+            quote = self._next_in_rotation(snapshot, user_id, eligible, signature, disliked)
+        if quote is None:
+            quote = self._fallback_pick(index, filters, disliked)
+        return quote
+
+    def quotes_by_author(self, author: str, count: int = 5) -> Tuple[Optional[str], List[QuoteView]]:
+        """Get up to *count* random corpus quotes by an author.
+        
+        The name is matched case-, accent- and typo-tolerantly (see
+        AuthorIndex), so "einstien" finds "Albert Einstein".
+        
+        Returns:
+            Tuple of the matched author's name (None if nobody matched) and
+            the quotes found
+        """
+        if not self._loaded:
+            self.load_quotes()
+        snapshot = self.snapshot
+        store = snapshot.store
+        name, positions = self._derive(snapshot, AuthorIndex).lookup(author)
+        picked = random.sample(range(len(positions)), min(count, len(positions)))
+        return name, [store[positions[i]] for i in picked]
+
+    def quotes_by_topic(self, topic: str, count: int = 3) -> List[QuoteView]:
+        """Get the *count* corpus quotes most relevant to a free-text topic.
+        
+        Ranked by TF-IDF cosine similarity over quote, takeaway and topic;
+        quotes sharing no term with *topic* are never returned.
+        """
+        if not self._loaded:
+            self.load_quotes()
+        snapshot = self.snapshot
+        return [snapshot.store[pos] for pos, _ in self._derive(snapshot, TopicSearch).search(topic, count)]
+
+    def select_for_users(self, user_ids: Sequence[int],
+                         prefs_by_user: Optional[Dict[int, Dict]] = None) -> Dict[int, Optional[QuoteView]]:
+        """Pick quotes for a whole cohort of users at once (daily broadcast).
+        
+        Same result per user as get_quote_for_user, but preferences,
+        dislikes and rotation states are read with a handful of bulk
+        queries, filter masks and eligible positions are computed once per
+        distinct filter combination, and rotation states are written back
+        in one transaction. Blocking - run it on the database thread
+        (``await async_repository.run(...)``) from async code.
+        
+        Args:
+            user_ids: The users to pick quotes for
+            prefs_by_user: Preferences already loaded by the caller (optional)
+            
+        Returns:
+            Dict mapping each user ID to its quote (None if none is available)
+        """
+        from quote_bot.db import (
+            get_disliked_quote_id_sets, get_preferences_for_users,
+            get_rotation_states, save_rotation_states
+        )
+        if not self._loaded:
+            self.load_quotes()
+        snapshot = self.snapshot
+        if not snapshot.store:
+            return {user_id: None for user_id in user_ids}
+        index = snapshot.index
+        if prefs_by_user is None:
+            prefs_by_user = get_preferences_for_users(user_ids)
+        dislikes = get_disliked_quote_id_sets(user_ids)
+        
+        # Users with identical filters share one mask and position list
+        groups: Dict[Tuple, List[int]] = {}
+        for user_id in user_ids:
+            filters = self._filters(prefs_by_user.get(user_id) or {})
+            groups.setdefault(filters, []).append(user_id)
+        
+        rotation = self.selection_mode != 'weighted'
+        if rotation:
+            states = {user_id: self._rotations[user_id]
+                      for user_id in user_ids if user_id in self._rotations}
+            states.update(get_rotation_states(
+                [user_id for user_id in user_ids if user_id not in states]))
+        
+        selected: Dict[int, Optional[QuoteView]] = {}
+        advanced = []
+        for filters, members in groups.items():
+            eligible, signature = self._filter_mask(index, filters, index.full_mask)
+            positions = self._eligible_positions(snapshot, signature, eligible)
+            for user_id in members:
+                disliked = dislikes.get(user_id, frozenset())
+                if not rotation:
+                    quote = self._weighted_pick(snapshot, eligible, signature, disliked)
+                elif positions:
+                    quote, state = self._advance_rotation(
+                        snapshot, user_id, states.get(user_id), positions, signature, disliked)
+                    self._remember_rotation(state)
+                    advanced.append(state)
+                else:
+                    quote = None
+                if quote is None:
+                    quote = self._fallback_pick(index, filters, disliked)
+                selected[user_id] = quote
+        
+        if advanced:
+            save_rotation_states(advanced)
+        return selected
+
+    def _fallback_pick(self, index: QuoteIndex, filters: Tuple, disliked: FrozenSet[int]) -> Optional[QuoteView]:
+        """Pick when every quote in the user's rotation is disliked.
+        
+        Falls back to the non-disliked quotes, then (as a last resort) to
+        all quotes.
+        """
+        allowed = index.full_mask & ~index.ids_mask(disliked)
+        candidates, _ = self._filter_mask(index, filters, allowed or index.full_mask)
+        return index.pick(candidates)
+
+    def _filters(self, prefs: Dict) -> Tuple[Tuple[str, ...], str, Optional[str]]:
+        """Normalize the user's topic, author and length preferences.
+        
+        Returns:
+            Hashable (topics, author, length bucket) tuple; users with equal
+            tuples get the same candidate quotes
+        """
+        topics = tuple(sorted({normalize(t) for t in self._preferred_topics(prefs)}))
+        author_pref = normalize(prefs.get('author_pref'))
+        if author_pref == 'any':
+            author_pref = ''
+        return topics, author_pref, parse_length_pref(prefs.get('quote_length'))
+
+    def _filter_mask(self, index: QuoteIndex, filters: Tuple, base: int) -> Tuple[int, int]:
+        """Narrow *base* by normalized filters from _filters().
+        
+        Each filter is only applied if something still matches afterwards.
+        
+        Returns:
+            Tuple of the candidate mask and the filter signature
+        """
+        topics, author_pref, bucket = filters
+        candidates = (base & index.topic_mask(topics) if topics else 0) or base
         
         # Filter by author preference if specified
-        if prefs.get('author_pref') and prefs['author_pref'].lower() != 'any':
-            author_quotes = [
-                q for q in candidate_quotes 
-                if q.get('author', '').lower() == prefs['author_pref'].lower()
-            ]
-            if author_quotes:
-                candidate_quotes = author_quotes
+        if author_pref:
+            candidates = (candidates & index.author_mask(author_pref)) or candidates
         
         # Filter by quote length if specified
-        if prefs.get('quote_length') and prefs['quote_length'].lower() != 'any length':
-            length_filtered = []
-            for q in candidate_quotes:
-                word_count = len(q.get('quote', '').split())
-                if prefs['quote_length'] == 'short (< 10 words)' and word_count < 10:
-                    length_filtered.append(q)
-                elif prefs['quote_length'] == 'medium (10-15 words)' and 10 <= word_count <= 15:
-                    length_filtered.append(q)
-                elif prefs['quote_length'] == 'long >20 words' and word_count > 20:
-                    length_filtered.append(q)
-            
-            if length_filtered:  # Only apply if we found matches
-                candidate_quotes = length_filtered
+        if bucket:
+            candidates = (candidates & index.length_mask(bucket)) or candidates
         
-        return random.choice(candidate_quotes) if candidate_quotes else None
+        return candidates, filter_signature(topics, author_pref, bucket)
+
+    def _next_in_rotation(self, snapshot: CorpusSnapshot, user_id: int, eligible: int,
+                          signature: int, disliked: FrozenSet[int]) -> Optional[QuoteView]:
+        """Advance the user's rotation to the next non-disliked quote."""
+        from quote_bot.db import get_rotation_state, save_rotation_state
+        
+        positions = self._eligible_positions(snapshot, signature, eligible)
+        if not positions:
+            return None
+        
+        state = self._rotations.get(user_id)
+        if state is None:
+            state = get_rotation_state(user_id)
+        quote, state = self._advance_rotation(snapshot, user_id, state, positions, signature, disliked)
+        self._remember_rotation(state)
+        save_rotation_state(state)
+        return quote
+
+    def _advance_rotation(self, snapshot: CorpusSnapshot, user_id: int,
+                          state: Optional['RotationState'], positions: array, signature: int,
+                          disliked: FrozenSet[int]) -> Tuple[Optional[QuoteView], 'RotationState']:
+        """Move *state* past the next non-disliked quote; doesn't persist it.
+        
+        O(1) per step: the permutation is recomputed from the seed, never
+        materialized. A missing or stale state starts a fresh permutation.
+        """
+        from quote_bot.db import RotationState
+        
+        size = len(positions)
+        if state is None:
+            state = RotationState(user_id, new_seed(), signature, snapshot.version)
+        elif state.signature != signature or state.corpus_version != snapshot.version:
+            # Filters or corpus changed: start a fresh permutation
+            state.seed, state.signature, state.corpus_version, state.cursor = (
+                new_seed(), signature, snapshot.version, 0)
+        
+        store = snapshot.store
+        permutation = SeededPermutation(size, state.seed)
+        for _ in range(size):
+            if state.cursor >= size:
+                # Every quote has been shown once: start the next cycle
+                state.seed, state.cursor = new_seed(), 0
+                permutation = SeededPermutation(size, state.seed)
+            pos = positions[permutation[state.cursor]]
+            state.cursor += 1
+            if store.ids[pos] not in disliked:
+                return store[pos], state
+        return None, state
+
+    def _eligible_positions(self, snapshot: CorpusSnapshot, signature: int, mask: int) -> array:
+        """Positions set in *mask*, cached per corpus version and filter signature."""
+        key = (snapshot.version, signature)
+        positions = self._eligible.get(key)
+        if positions is None:
+            positions = self._eligible[key] = snapshot.index.mask_positions(mask)
+            if len(self._eligible) > ELIGIBLE_CACHE_MAX:
+                self._eligible.popitem(last=False)
+        else:
+            self._eligible.move_to_end(key)
+        return positions
+
+    def _weighted_pick(self, snapshot: CorpusSnapshot, eligible: int, signature: int,
+                       disliked: FrozenSet[int]) -> Optional[QuoteView]:
+        """Draw a popularity-weighted, non-disliked quote from the filter bucket."""
+        key = (snapshot.version, signature)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = self._build_bucket(snapshot, signature, eligible)
+            if len(self._buckets) > ELIGIBLE_CACHE_MAX:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        if bucket is None:
+            return None
+        
+        store = snapshot.store
+        for _ in range(WEIGHTED_DRAW_ATTEMPTS):
+            pos = bucket.positions[bucket.table.draw()]
+            if store.ids[pos] not in disliked:
+                return store[pos]
+        return None
+
+    def _build_bucket(self, snapshot: CorpusSnapshot, signature: int, mask: int) -> Optional[WeightedBucket]:
+        """Build the alias table for the quotes in *mask* from current weights."""
+        positions = self._eligible_positions(snapshot, signature, mask)
+        if not positions:
+            return None
+        ids, weights = snapshot.store.ids, self._weights
+        table = AliasTable([weights.get(ids[pos], 1.0) for pos in positions])
+        return WeightedBucket(table, positions, mask)
+
+    def refresh_weights(self) -> int:
+        """Recompute popularity weights and rebuild the alias tables they affect.
+        
+        Weights are ``(1 + likes) / (1 + dislikes)``, from the quote_stats
+        counters (no aggregation over interactions). Only buckets containing
+        a quote whose weight changed are rebuilt; the rest are kept as is.
+        Blocking (runs a query) - call via refresh_popularity() from async code.
+        
+        Returns:
+            int: Number of alias tables rebuilt
+        """
+        from quote_bot.db import get_quote_engagement
+        weights = {
+            quote_id: (1 + likes) / (1 + dislikes)
+            for quote_id, (likes, dislikes) in get_quote_engagement().items()
+        }
+        old = self._weights
+        changed = [qid for qid in weights.keys() | old.keys()
+                   if weights.get(qid, 1.0) != old.get(qid, 1.0)]
+        self._weights = weights
+        
+        snapshot = self.snapshot
+        changed_mask = snapshot.index.ids_mask(changed)
+        rebuilt = 0
+        for key, bucket in list(self._buckets.items()):
+            version, signature = key
+            if version != snapshot.version or bucket is None:
+                self._buckets.pop(key, None)
+            elif bucket.mask & changed_mask:
+                self._buckets[key] = self._build_bucket(snapshot, signature, bucket.mask)
+                rebuilt += 1
+        return rebuilt
+
+    async def refresh_popularity(self) -> None:
+        """Run refresh_weights() on the database thread (scheduled periodically).
+        
+        Sharing that thread with get_quote_for_user() and select_for_users()
+        keeps the alias tables from being rebuilt while a pick reads them.
+        """
+        from quote_bot.db import async_repository
+        rebuilt = await async_repository.run(self.refresh_weights)
+        logger.debug(f"Popularity weights refreshed, {rebuilt} alias tables rebuilt")
+
+    def _remember_rotation(self, state: 'RotationState') -> None:
+        """Keep a user's rotation state in the in-memory LRU."""
+        self._rotations[state.user_id] = state
+        self._rotations.move_to_end(state.user_id)
+        if len(self._rotations) > ROTATION_CACHE_MAX:
+            self._rotations.popitem(last=False)
 
 # Global instance for convenience
 quote_service = QuoteService()
@@ -0,0 +1,190 @@
+"""Compact columnar in-memory storage for the quote corpus."""
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Keys exposed by QuoteView, in the order of the CSV columns
+FIELDS = ('id', 'quote', 'author', 'topic', 'tone', 'takeaway')
+
+
+class StringTable:
+    """Dictionary encoding for a low-cardinality string column."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: Optional[str]) -> int:
+        """Return the code for *value*, adding it to the table if new."""
+        value = value or ''
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class QuoteView(Mapping):
+    """Read-only, dict-like view of one quote in a QuoteStore.
+
+    Views hold only a store reference and a position; field values are
+    decoded on access, so handing them out costs almost nothing.
+    """
+
+    __slots__ = ('_store', 'position')
+
+    def __init__(self, store: 'QuoteStore', position: int):
+        self._store = store
+        self.position = position
+
+    def __getitem__(self, key: str) -> Any:
+        store, pos = self._store, self.position
+        if key == 'id':
+            return store.ids[pos]
+        if key == 'quote':
+            return store.text(pos)
+        if key == 'author':
+            return store.author(pos)
+        if key == 'topic':
+            return store.topic(pos)
+        if key == 'tone':
+            return store.tone(pos)
+        if key == 'takeaway':
+            return store.takeaway(pos)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"QuoteView({dict(self)!r})"
+
+
+class QuoteStore(Sequence):
+    """Column-oriented quote corpus.
+
+    * ids and word counts live in typed ``array`` columns
+    * author/topic/tone are dictionary-encoded into small-int code columns
+    * quote and takeaway texts share one UTF-8 buffer addressed by offsets
+      (quote *i* spans ``offsets[2i]:offsets[2i+1]``, its takeaway
+      ``offsets[2i+1]:offsets[2i+2]``)
+
+    Indexing by position yields a QuoteView; ``get`` looks quotes up by id.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.word_counts = array('H')
+        self.author_codes = array('I')
+        self.topic_codes = array('I')
+        self.tone_codes = array('I')
+        self.authors = StringTable()
+        self.topics = StringTable()
+        self.tones = StringTable()
+        self.buffer = bytearray()
+        self.offsets = array('Q', [0])
+        self.version = 0
+        self.mapping = None  # backing mmap when loaded from a compiled corpus
+        self._sorted_ids = True
+        self._positions: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'QuoteStore':
+        """Build a store from quote dicts (e.g. rows of a ``csv.DictReader``)."""
+        store = cls()
+        for row in rows:
+            store.append(row)
+        return store
+
+    @classmethod
+    def from_columns(cls, *, ids, word_counts, author_codes, topic_codes, tone_codes,
+                     authors: StringTable, topics: StringTable, tones: StringTable,
+                     buffer, offsets, sorted_ids: bool) -> 'QuoteStore':
+        """Wrap prebuilt columns (arrays or memoryviews) without copying them."""
+        store = cls()
+        store.ids, store.word_counts = ids, word_counts
+        store.author_codes, store.topic_codes, store.tone_codes = author_codes, topic_codes, tone_codes
+        store.authors, store.topics, store.tones = authors, topics, tones
+        store.buffer, store.offsets = buffer, offsets
+        store._sorted_ids = sorted_ids
+        return store
+
+    @property
+    def sorted_ids(self) -> bool:
+        """True if ids are strictly ascending (id lookups then use bisection)."""
+        return self._sorted_ids
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Add one quote; *row* must carry an integer ``id``."""
+        quote_id = int(row['id'])
+        if self.ids and quote_id <= self.ids[-1]:
+            self._sorted_ids = False
+        text = row.get('quote') or ''
+        self.ids.append(quote_id)
+        self.word_counts.append(min(len(text.split()), 0xFFFF))
+        self.author_codes.append(self.authors.encode(row.get('author')))
+        self.topic_codes.append(self.topics.encode(row.get('topic')))
+        self.tone_codes.append(self.tones.encode(row.get('tone')))
+        self.buffer += text.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+        self.buffer += (row.get('takeaway') or '').encode('utf-8')
+        self.offsets.append(len(self.buffer))
+        self._positions = None
+
+    # ─────────────── COLUMN ACCESS ────────────────
+    def text(self, position: int) -> str:
+        """Decode the quote text at *position*."""
+        start, end = self.offsets[2 * position], self.offsets[2 * position + 1]
+        return str(self.buffer[start:end], 'utf-8')
+
+    def takeaway(self, position: int) -> str:
+        """Decode the takeaway at *position*."""
+        start, end = self.offsets[2 * position + 1], self.offsets[2 * position + 2]
+        return str(self.buffer[start:end], 'utf-8')
+
+    def author(self, position: int) -> str:
+        return self.authors[self.author_codes[position]]
+
+    def topic(self, position: int) -> str:
+        return self.topics[self.topic_codes[position]]
+
+    def tone(self, position: int) -> str:
+        return self.tones[self.tone_codes[position]]
+
+    # ─────────────── LOOKUP ────────────────
+    def position(self, quote_id: int) -> Optional[int]:
+        """Return the position of *quote_id*, or None if it isn't stored."""
+        if self._sorted_ids:
+            pos = bisect_left(self.ids, quote_id)
+            return pos if pos < len(self.ids) and self.ids[pos] == quote_id else None
+        if self._positions is None:
+            self._positions = {qid: pos for pos, qid in enumerate(self.ids)}
+        return self._positions.get(quote_id)
+
+    def get(self, quote_id: int) -> Optional[QuoteView]:
+        """Return the quote with the given id, or None."""
+        pos = self.position(quote_id)
+        return None if pos is None else QuoteView(self, pos)
+
+    def __getitem__(self, position: int) -> QuoteView:
+        if position < 0:
+            position += len(self.ids)
+        if not 0 <= position < len(self.ids):
+            raise IndexError("quote position out of range")
+        return QuoteView(self, position)
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,64 @@
+"""Seeded permutations for per-user no-repeat quote rotations."""
+import random
+import zlib
+from typing import Iterable, Optional
+
+_ROUNDS = 4
+
+
+def filter_signature(topics: Iterable[str], author: Optional[str], length: Optional[str]) -> int:
+    """Stable 32-bit fingerprint of a user's quote filters.
+
+    Used to tell whether a stored rotation was built for the same filters;
+    it must not depend on the process (so no built-in ``hash``).
+    """
+    key = "\x1f".join([",".join(sorted(topics)), author or "", length or ""])
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def new_seed() -> int:
+    """A fresh rotation seed that fits in a signed SQLite INTEGER."""
+    return random.getrandbits(63)
+
+
+class SeededPermutation:
+    """A pseudo-random bijection on ``range(size)`` determined by a seed.
+
+    Built from a small Feistel network over the next even bit width, with
+    cycle walking to stay inside ``range(size)``. ``perm[i]`` costs O(1)
+    (amortized) and the permutation is never materialized, so a rotation
+    only needs its seed and a cursor to be stored.
+    """
+
+    def __init__(self, size: int, seed: int):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits & 1
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(32) for _ in range(_ROUNDS)]
+
+    def _round(self, value: int, key: int) -> int:
+        h = (value * 0x9E3779B1 + key) & 0xFFFFFFFF
+        h ^= h >> 15
+        h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+        h ^= h >> 13
+        return h & self._mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self._half, value & self._mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self._half) | right
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError("permutation index out of range")
+        value = self._encrypt(index)
+        while value >= self.size:  # the domain is < 4x size, so this ends quickly
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self) -> int:
+        return self.size
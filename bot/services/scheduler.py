@@ -1,16 +1,42 @@
 """Scheduling service for the Quote Bot."""
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import Callable, Awaitable, Optional
+from typing import Callable, Awaitable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 logger = logging.getLogger(__name__)
 
+# Telegram accepts about 30 bot messages per second across different chats.
+# A slot job starts one batch per SLOT_BATCH_DELAY window, sized to that
+# limit, so a slot spreads over len(users) / 30 seconds: 1,000 users take
+# about 33 s, 10,000 users about 5.5 minutes after the slot time.
+TELEGRAM_SENDS_PER_SECOND = 30
+SLOT_BATCH_DELAY = 1.0
+SLOT_BATCH_SIZE = int(TELEGRAM_SENDS_PER_SECOND * SLOT_BATCH_DELAY)
+
+# Sends the daily quote to a batch of user IDs
+BatchDelivery = Callable[[List[int]], Awaitable[None]]
+
+
+class DeliverySlot(NamedTuple):
+    """When a user's daily quote goes out; users with equal slots share a job."""
+    hour: int
+    minute: int
+    tz_name: str
+    weekends_ok: bool
+
+    @property
+    def job_id(self) -> str:
+        days = "daily" if self.weekends_ok else "weekdays"
+        return f"daily_quote_{self.hour:02d}{self.minute:02d}_{self.tz_name}_{days}"
+
 
 class SchedulerService:
     """Handles ALL scheduling (per-user & global) for the bot."""
@@ -18,10 +44,19 @@ class SchedulerService:
     def __init__(self, default_tz: str = "UTC") -> None:
         self.default_tz = default_tz
         self.scheduler  = AsyncIOScheduler(timezone=pytz.timezone(default_tz))
+        # slot → its users (a dict for insertion order), and each user's current slot
+        self._slot_users: Dict[DeliverySlot, Dict[int, None]] = {}
+        self._user_slots: Dict[int, DeliverySlot] = {}
+        self._deliver: Optional[BatchDelivery] = None
+        # APScheduler's job store and the slot tables are only touched on
+        # this loop (set by start()); other threads hand changes over to it
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     # ─────────────── LIFECYCLE ────────────────
     def start(self) -> None:
+        """Start the scheduler; call from the event loop it should run on."""
         if not self.scheduler.running:
+            self._loop = asyncio.get_running_loop()
             self.scheduler.start()
             logger.info("Scheduler started (default tz %s)", self.default_tz)
 
@@ -45,54 +80,164 @@ class SchedulerService:
         )
         logger.info("Global daily job scheduled for %02d:%02d", hour, minute)
 
-    # ─────────────── USER-SPECIFIC DAILY JOB ────────────────
-    def schedule_user_daily_quote(
+    # ─────────────── PERIODIC JOBS ────────────────
+    def schedule_interval(
         self,
-        user_id: int,
-        prefs: dict,
-        coro: Callable[[int], Awaitable[None]],
+        job_id: str,
+        coro: Callable[[], Awaitable[None]],
+        seconds: int,
     ) -> None:
+        """Run a coroutine every *seconds* seconds (skipped while still running)."""
+        self._replace_job(
+            job_id,
+            coro,
+            IntervalTrigger(seconds=seconds, timezone=self.scheduler.timezone),
+        )
+        logger.info("Interval job %s scheduled every %ss", job_id, seconds)
+
+    # ─────────────── USER-SPECIFIC DAILY JOB ────────────────
+    def set_daily_delivery(self, deliver: BatchDelivery) -> None:
         """
-        Schedule the quote-delivery coroutine for one user.
+        Set the coroutine that delivery slots call with each batch of users.
 
-        • Skips weekends if weekend_toggle == 0  
-        • Uses the user’s timezone & HH:MM stored in *prefs*
+        It should fetch, select and send for the whole batch at once (see
+        bot.tasks.send_quote_batch).
         """
-        delivery_time = prefs.get("delivery_time", "07:00")
-        hour, minute  = map(int, delivery_time.split(":"))
-        tz_name       = prefs.get("timezone", self.default_tz)
-        weekends_ok   = bool(prefs.get("weekend_toggle", 1))
+        self._deliver = deliver
 
-        job_id = f"daily_quote_{user_id}"
-        try:
-            self.scheduler.remove_job(job_id)
-        except Exception:
-            pass  # job did not exist – fine
+    def schedule_user_daily_quote(self, user_id: int, prefs: dict) -> None:
+        """
+        Schedule one user's daily quote.
 
-        day_of_week = "*" if weekends_ok else "mon-fri"
+        Safe to call from any thread (preferences are saved on the database
+        thread): the change is applied on the scheduler's event loop.
 
-        self.scheduler.add_job(
-            coro,
-            trigger="cron",
-            id=job_id,
-            name=f"daily quote for {user_id}",
-            timezone=pytz.timezone(tz_name),
-            day_of_week=day_of_week,
-            hour=hour,
-            minute=minute,
-            args=[user_id],          # pass the user_id to the coroutine
-            replace_existing=True,
-        )
+        • Skips weekends if weekend_toggle == 0  
+        • Uses the user’s timezone & HH:MM stored in *prefs*
+        """
+        slot = self._slot_for(prefs)
+        self._on_loop(self._assign, user_id, slot)
         logger.info(
             "Scheduled daily quote for %s at %02d:%02d %s (%s)",
             user_id,
-            hour,
-            minute,
-            tz_name,
-            "weekends OK" if weekends_ok else "weekdays only",
+            slot.hour,
+            slot.minute,
+            slot.tz_name,
+            "weekends OK" if slot.weekends_ok else "weekdays only",
         )
 
+    # ─────────────── BULK USER DAILY JOBS ────────────────
+    def schedule_users_daily_quotes(self, users: Iterable[Tuple[int, dict]]) -> Tuple[int, int]:
+        """
+        Schedule many users' daily quotes.
+
+        Users are grouped by delivery slot (time, timezone, weekend rule)
+        and every slot is one cron job that hands its users to the daily
+        delivery (see set_daily_delivery) a batch at a time. Registering a
+        user costs a dict entry, not an APScheduler job, so a million users
+        need at most one job per distinct slot. Logs nothing per user;
+        callers log a summary. Call from the event loop.
+
+        Returns:
+            (users scheduled, users skipped because of invalid preferences)
+        """
+        scheduled = skipped = 0
+        # Few distinct (time, timezone, weekend) combinations: parse each once
+        slots: Dict[tuple, Optional[DeliverySlot]] = {}
+        for user_id, prefs in users:
+            key = (prefs.get("delivery_time"), prefs.get("timezone"), prefs.get("weekend_toggle", 1))
+            if key in slots:
+                slot = slots[key]
+            else:
+                try:
+                    slot = slots[key] = self._slot_for(prefs)
+                except (ValueError, TypeError, AttributeError, pytz.UnknownTimeZoneError):
+                    slot = slots[key] = None
+            if slot is None:
+                skipped += 1
+                continue
+            self._assign(user_id, slot)
+            scheduled += 1
+        return scheduled, skipped
+
+    def slot_count(self) -> int:
+        """Number of delivery slots (one cron job each) in use."""
+        return len(self._slot_users)
+
+    def _slot_for(self, prefs: dict) -> DeliverySlot:
+        """The delivery slot for *prefs*; raises on an unusable time or timezone."""
+        delivery_time = prefs.get("delivery_time") or "07:00"
+        # test options look like "21:52 (Test)"
+        hour, minute  = map(int, delivery_time.split("(")[0].strip().split(":"))
+        tz_name       = prefs.get("timezone") or self.default_tz
+        pytz.timezone(tz_name)
+        return DeliverySlot(hour, minute, tz_name, bool(prefs.get("weekend_toggle", 1)))
+
+    def _assign(self, user_id: int, slot: DeliverySlot) -> None:
+        """Move *user_id* into *slot*, creating/dropping slot jobs as needed."""
+        old = self._user_slots.get(user_id)
+        if old is not None and old != slot:
+            members = self._slot_users[old]
+            del members[user_id]
+            if not members:
+                del self._slot_users[old]
+                try:
+                    self.scheduler.remove_job(old.job_id)
+                except Exception:
+                    pass
+        members = self._slot_users.get(slot)
+        if members is None:
+            members = self._slot_users[slot] = {}
+            self.scheduler.add_job(
+                self._run_slot,
+                trigger="cron",
+                id=slot.job_id,
+                name=f"daily quotes at {slot.hour:02d}:{slot.minute:02d} {slot.tz_name}",
+                timezone=pytz.timezone(slot.tz_name),
+                day_of_week="*" if slot.weekends_ok else "mon-fri",
+                hour=slot.hour,
+                minute=slot.minute,
+                args=[slot],
+                replace_existing=True,
+            )
+        members[user_id] = None
+        self._user_slots[user_id] = slot
+
+    async def _run_slot(self, slot: DeliverySlot) -> None:
+        """Deliver to every user in *slot*, a batch at a time."""
+        members = list(self._slot_users.get(slot, {}))
+        if self._deliver is None:
+            logger.error("No daily delivery set; skipping %d users (%s)", len(members), slot.job_id)
+            return
+        logger.info("Delivering daily quotes to %d users (%s)", len(members), slot.job_id)
+        loop = asyncio.get_running_loop()
+        for i in range(0, len(members), SLOT_BATCH_SIZE):
+            started = loop.time()
+            batch = members[i:i + SLOT_BATCH_SIZE]
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                logger.error("Daily quotes for %d users (%s) failed: %s", len(batch), slot.job_id, e)
+            # Sleep out the rest of the window; the sends' own time counts towards it
+            if i + SLOT_BATCH_SIZE < len(members):
+                await asyncio.sleep(max(0.0, started + SLOT_BATCH_DELAY - loop.time()))
+
     # ─────────────── HELPERS ────────────────
+    def _on_loop(self, func: Callable[..., None], *args) -> None:
+        """Call *func* on the scheduler's loop: now if already there, else soon."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            func(*args)  # not started (scripts, tests): nothing else is running
+            return
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is loop:
+            func(*args)
+        else:
+            loop.call_soon_threadsafe(func, *args)
+
     def _replace_job(self, job_id: str, func, trigger) -> None:
         """Safely replace an existing job."""
         try:
@@ -0,0 +1,102 @@
+"""Local topic retrieval: sparse TF-IDF over the quote corpus.
+
+Each quote is a document made of its text, takeaway and topic (the topic
+counted twice, since it is a curated label). Term weights are sublinear TF
+times smoothed IDF, L2-normalized per document, and stored as an inverted
+index of ``(positions, weights)`` arrays. A query is scored by walking the
+postings of its terms only, which is the sparse matrix-vector product of a
+cosine search without materializing the matrix.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from .quote_index import tokenize
+from .quote_store import QuoteStore
+
+# Words too common to say anything about a topic
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be because been but by can could
+do does for from had has have he her his how i if in into is it its just me
+more most my no not of on one only or our out so some than that the their
+them then there these they this to up us was we were what when which who
+will with would you your
+""".split())
+
+# (suffix, replacement), tried in order
+_SUFFIXES = (('iness', 'y'), ('ness', ''), ('ment', ''), ('ing', ''), ('ies', 'y'),
+             ('ed', ''), ('ly', ''), ('s', ''))
+
+# Words the suffix rules would mangle or merge with an unrelated one
+# ("business" is not "busy"), mapped to their stem
+_STEM_EXCEPTIONS = {
+    'business': 'business', 'businesses': 'business',
+    'witness': 'witness', 'witnesses': 'witness',
+    'harness': 'harness', 'harnessed': 'harness', 'harnessing': 'harness',
+}
+
+
+def stem(token: str) -> str:
+    """Strip one common English suffix so "dreams"/"dreaming" match "dream"."""
+    token = token.strip("'")
+    if token in _STEM_EXCEPTIONS:
+        return _STEM_EXCEPTIONS[token]
+    for suffix, replacement in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def terms(text: str) -> List[str]:
+    """Stemmed, stopword-free terms of *text*."""
+    return [stem(t) for t in tokenize(text) if t not in STOPWORDS]
+
+
+class TopicSearch:
+    """Cosine top-k retrieval of quotes for a free-text topic."""
+
+    def __init__(self, store: QuoteStore):
+        counts: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for pos in range(len(store)):
+            document = terms(f"{store.text(pos)} {store.takeaway(pos)}")
+            document += terms(store.topic(pos)) * 2
+            for term, tf in Counter(document).items():
+                counts[term].append((pos, tf))
+
+        n = len(store)
+        self.idf: Dict[str, float] = {}
+        norms = [0.0] * n
+        raw: Dict[str, List[Tuple[int, float]]] = {}
+        for term, postings in counts.items():
+            idf = self.idf[term] = math.log((1 + n) / (1 + len(postings))) + 1.0
+            weighted = raw[term] = [(pos, (1.0 + math.log(tf)) * idf) for pos, tf in postings]
+            for pos, weight in weighted:
+                norms[pos] += weight * weight
+
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        for term, weighted in raw.items():
+            self.postings[term] = (
+                array('I', [pos for pos, _ in weighted]),
+                array('f', [weight / math.sqrt(norms[pos]) for pos, weight in weighted]),
+            )
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """Return up to *k* ``(position, score)`` pairs, best first.
+
+        Only quotes sharing at least one term with the query are returned.
+        """
+        query_terms = Counter(t for t in terms(query) if t in self.postings)
+        if not query_terms:
+            return []
+        weights = {t: (1.0 + math.log(tf)) * self.idf[t] for t, tf in query_terms.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term, query_weight in weights.items():
+            positions, doc_weights = self.postings[term]
+            query_weight /= norm
+            for pos, weight in zip(positions, doc_weights):
+                scores[pos] += query_weight * weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
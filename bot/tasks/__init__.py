@@ -1,4 +1,4 @@
 """Background tasks for the Quote Bot."""
-from .quote_tasks import send_daily_quotes_task
+from .quote_tasks import send_daily_quotes_task, send_quote_batch
 
-__all__ = ['send_daily_quotes_task']
+__all__ = ['send_daily_quotes_task', 'send_quote_batch']
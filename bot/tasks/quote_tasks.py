@@ -1,6 +1,7 @@
 """Background tasks related to quotes."""
+import asyncio
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Sequence
 import datetime    
 
 if TYPE_CHECKING:
@@ -9,7 +10,7 @@ if TYPE_CHECKING:
 
 from bot.services import quote_service
 from bot.utils.helpers import escape_markdown
-from quote_bot.db import get_user_preferences
+from quote_bot.db import async_repository as repo
 
 logger = logging.getLogger(__name__)
 
@@ -19,41 +20,82 @@ async def send_daily_quotes_task(bot: 'Bot') -> None:
     Args:
         bot: The Telegram bot instance
     """
-    from quote_bot.db import get_active_users
-    import asyncio
-    
-    user_ids = get_active_users()
+    user_ids = await repo.get_active_users()
     logger.info(f"Scheduler running for {len(user_ids)} active users.")
     
+    # Pick every user's quote up front with bulk queries, off the event loop
+    prefs_by_user = await repo.get_preferences_for_users(user_ids)
+    user_ids = [user_id for user_id in user_ids
+                if not _skip_today(prefs_by_user.get(user_id) or {})]
+    selected = await repo.run(quote_service.select_for_users, user_ids, prefs_by_user)
+    
     # Process users in batches to avoid rate limiting
     BATCH_SIZE = 10
     for i in range(0, len(user_ids), BATCH_SIZE):
-        batch = user_ids[i:i+BATCH_SIZE]
-        # Process batch concurrently
-        await asyncio.gather(
-            *[send_quote_to_user(bot, user_id) for user_id in batch],
-            return_exceptions=True
-        )
+        await _send_selected(bot, user_ids[i:i+BATCH_SIZE], selected)
         # Small delay between batches
         await asyncio.sleep(1)
 
-async def send_quote_to_user(bot: 'Bot', user_id: int) -> None:
-    """Send a personalized quote to a specific user.
+async def send_quote_batch(bot: 'Bot', user_ids: Sequence[int]) -> None:
+    """Send one batch of daily quotes, e.g. a delivery slot's next batch.
+    
+    Preferences, quote selection and keyboard states are fetched for the
+    whole batch with bulk queries, then the messages go out concurrently.
     
     Args:
         bot: The Telegram bot instance
-        user_id: The ID of the user to send the quote to
+        user_ids: The users to send to
     """
-    # Get user preferences
-    prefs = get_user_preferences(user_id)
+    prefs_by_user = await repo.get_preferences_for_users(user_ids)
+    user_ids = [user_id for user_id in user_ids
+                if not _skip_today(prefs_by_user.get(user_id) or {})]
+    selected = await repo.run(quote_service.select_for_users, user_ids, prefs_by_user)
+    await _send_selected(bot, user_ids, selected)
+
+async def _send_selected(bot: 'Bot', user_ids: Sequence[int],
+                         selected: Mapping[int, Optional[Mapping[str, Any]]]) -> None:
+    """Send each user their already selected quote, concurrently."""
+    # One query for the whole batch's keyboard states
+    quote_ids = {user_id: selected[user_id]['id'] for user_id in user_ids if selected.get(user_id)}
+    states = await repo.get_quote_interactions(quote_ids.items()) if quote_ids else {}
+    results = await asyncio.gather(
+        *[send_quote_to_user(bot, user_id, selected.get(user_id),
+                             states.get((user_id, quote_ids.get(user_id))))
+          for user_id in user_ids],
+        return_exceptions=True
+    )
+    for user_id, result in zip(user_ids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Daily quote for user {user_id} failed: {result}")
 
+def _skip_today(prefs: Dict[str, Any]) -> bool:
+    """True if the user turned weekend quotes off and today is a weekend."""
     if not prefs.get("weekend_toggle", 1):              # 0 = off, 1 = on
         today = datetime.date.today().weekday()         # 0-Mon … 5-Sat 6-Sun
-        if today in (5, 6):                             # Sat/Sun
-            return 
+        return today in (5, 6)                          # Sat/Sun
+    return False
+
+async def send_quote_to_user(bot: 'Bot', user_id: int,
+                             quote_data: Optional[Mapping[str, Any]] = None,
+                             interaction: Optional[Dict[str, bool]] = None) -> None:
+    """Send a personalized quote to a specific user.
     
-    # Get a personalized quote
-    quote_data = quote_service.get_quote_for_user(user_id, prefs or {})
+    Args:
+        bot: The Telegram bot instance
+        user_id: The ID of the user to send the quote to
+        quote_data: A quote already selected for this user (e.g. by the
+            daily broadcast); if omitted one is picked here
+        interaction: The user's interaction with quote_data, if the caller
+            already looked it up (see get_quote_interactions)
+    """
+    if quote_data is None:
+        # Get user preferences
+        prefs = (await repo.get_user_profile(user_id)).as_prefs()
+        if _skip_today(prefs):
+            return 
+        
+        # Get a personalized quote
+        quote_data = await repo.run(quote_service.get_quote_for_user, user_id, prefs)
     
     if not quote_data:
         logger.warning(f"No quote found for user {user_id}")
@@ -69,8 +111,11 @@ async def send_quote_to_user(bot: 'Bot', user_id: int) -> None:
         quote_text += f'\n\n— <b>{escape_markdown(quote_data["author"])}</b>'
     
     # Get the keyboard with like/dislike/favorite buttons
-    from bot.handlers.callbacks import get_quote_keyboard
-    keyboard = get_quote_keyboard(quote_data['id'], user_id)
+    from bot.handlers.callbacks import get_quote_keyboard, quote_keyboard
+    if interaction is not None:
+        keyboard = get_quote_keyboard(quote_data['id'], user_id, interaction)
+    else:
+        keyboard = await quote_keyboard(quote_data['id'], user_id)
     
     # Send the quote
     await bot.send_message(
@@ -79,4 +124,16 @@ async def send_quote_to_user(bot: 'Bot', user_id: int) -> None:
         reply_markup=keyboard,
         parse_mode='HTML'
     )
+    await repo.record_quote_delivery(quote_data['id'])
     logger.info(f"Sent quote {quote_data['id']} to user {user_id}")
+
+async def reconcile_quote_stats_task() -> None:
+    """Task to recount the quote_stats counters and log any drift it repaired."""
+    drift = await repo.reconcile_quote_stats()
+    if drift:
+        sample = ", ".join(f"{quote_id}: {have} → {want}"
+                           for quote_id, (have, want) in list(drift.items())[:10])
+        logger.warning(f"quote_stats drifted for {len(drift)} quotes, repaired "
+                       f"(likes, dislikes, favorites): {sample}")
+    else:
+        logger.info("quote_stats reconciled, no drift")
@@ -0,0 +1,31 @@
+"""Compile the quotes table (or quotes.csv) into the binary corpus (quotes.qbin) the bot memory-maps."""
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+def compile_quotes():
+    # Importing the bot package builds service singletons that read .env
+    load_dotenv()
+    from bot.services.corpus_file import compile_corpus
+
+    csv_path = Path(__file__).parent / "quotes.csv"
+    out_path = csv_path.with_suffix(".qbin")
+
+    print(f"CSV path: {csv_path}")
+    print(f"Corpus path: {out_path}")
+
+    if not csv_path.exists():
+        print(f"Error: {csv_path} not found!")
+        return
+
+    started = time.perf_counter()
+    count = compile_corpus(str(csv_path), str(out_path))
+    elapsed = time.perf_counter() - started
+    print(f"✅ Compiled {count} quotes ({out_path.stat().st_size:,} bytes) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    print("Starting corpus compile...")
+    compile_quotes()
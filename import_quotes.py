@@ -1,59 +1,177 @@
-import sqlite3
+"""Import quotes.csv into the quotes table incrementally.
+
+Every quote is keyed by a hash of its normalized text and author, so
+re-importing keeps quote ids (and the interactions that reference them)
+stable: new quotes are inserted, quotes whose topic/tone/takeaway changed
+are updated in place, and unchanged rows are not written at all. The CSV
+is streamed and written in batched transactions.
+
+Usage: python import_quotes.py [CSV_PATH] [--batch-size N]
+"""
+import argparse
 import csv
+import random
+import sqlite3
+import time
+from itertools import islice
 from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from quote_bot.db.database import create_quote_search_index
+from quote_bot.db.keys import content_hash
+
+BATCH_SIZE = 50_000
+
+# Each batch goes into a temp table first, so that rows already stored and
+# unchanged are never written (and never burn AUTOINCREMENT ids)
+STAGE_SQL = '''
+INSERT OR IGNORE INTO import_stage (content_hash, quote, author, topic, tone, takeaway)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Driven by the staged hashes (an UPDATE ... FROM would scan all quotes)
+UPDATE_SQL = '''
+UPDATE quotes SET
+    topic = (SELECT s.topic FROM import_stage s WHERE s.content_hash = quotes.content_hash),
+    tone = (SELECT s.tone FROM import_stage s WHERE s.content_hash = quotes.content_hash),
+    takeaway = (SELECT s.takeaway FROM import_stage s WHERE s.content_hash = quotes.content_hash)
+WHERE content_hash IN (
+    SELECT s.content_hash
+    FROM import_stage s
+    JOIN quotes q ON q.content_hash = s.content_hash
+    WHERE q.topic IS NOT s.topic
+       OR q.tone IS NOT s.tone
+       OR q.takeaway IS NOT s.takeaway
+)
+'''
+
+INSERT_SQL = '''
+INSERT INTO quotes (content_hash, quote, author, topic, tone, takeaway)
+SELECT s.content_hash, s.quote, s.author, s.topic, s.tone, s.takeaway
+FROM import_stage AS s
+WHERE NOT EXISTS (SELECT 1 FROM quotes q WHERE q.content_hash = s.content_hash)
+ORDER BY s.seq
+'''
+
+
+def ensure_schema(cursor: sqlite3.Cursor) -> None:
+    """Create the quotes table, or add the content_hash key to an older one."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS quotes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content_hash INTEGER,
+        quote TEXT NOT NULL,
+        author TEXT,
+        topic TEXT,
+        tone TEXT,
+        takeaway TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(quotes)")}
+    if "content_hash" not in columns:
+        # Tables from the old drop-and-recreate importer: key the existing rows
+        cursor.execute("ALTER TABLE quotes ADD COLUMN content_hash INTEGER")
+        seen = set()
+        updates = []
+        for quote_id, quote, author in cursor.execute(
+            "SELECT id, quote, author FROM quotes ORDER BY id"
+        ).fetchall():
+            key = content_hash(quote, author)
+            if key not in seen:  # duplicates keep a NULL key and their id
+                seen.add(key)
+                updates.append((key, quote_id))
+        cursor.executemany("UPDATE quotes SET content_hash = ? WHERE id = ?", updates)
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_quotes_content_hash
+    ON quotes(content_hash)
+    ''')
+    create_quote_search_index(cursor)
+    cursor.execute('''
+    CREATE TEMP TABLE IF NOT EXISTS import_stage (
+        seq INTEGER PRIMARY KEY,
+        content_hash INTEGER UNIQUE,
+        quote TEXT,
+        author TEXT,
+        topic TEXT,
+        tone TEXT,
+        takeaway TEXT
+    )
+    ''')
+
+
+def read_rows(csv_path: Path) -> Iterator[Tuple[int, str, str, str, str, str]]:
+    """Stream staging parameters from the CSV, skipping rows without text."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = [header.index(name) if name in header else None
+                   for name in ("quote", "author", "topic", "tone", "takeaway")]
+        for row in reader:
+            quote, author, topic, tone, takeaway = (
+                (row[i] or None) if i is not None and i < len(row) else None
+                for i in columns
+            )
+            quote = (quote or "").strip()
+            if quote:
+                yield content_hash(quote, author), quote, author, topic, tone, takeaway
 
-def import_quotes():
+
+def batches(rows: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_quotes(csv_path: Path = None, batch_size: int = BATCH_SIZE, db_path: Path = None):
     # Paths
-    db_path = Path(__file__).parent / "quote_bot.db"
-    csv_path = Path(__file__).parent / "quotes.csv"
-    
+    db_path = db_path or Path(__file__).parent / "quote_bot.db"
+    csv_path = csv_path or Path(__file__).parent / "quotes.csv"
+
     print(f"Database path: {db_path}")
     print(f"CSV path: {csv_path}")
-    
+
     # Check if files exist
     if not csv_path.exists():
         print(f"Error: {csv_path} not found!")
         return
-        
+
     conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
     cursor = conn.cursor()
-    
+
     try:
-        # Drop existing table if it exists
-        cursor.execute("DROP TABLE IF EXISTS quotes")
-        
-        # Create the quotes table with the new schema
-        cursor.execute('''
-        CREATE TABLE quotes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            quote TEXT NOT NULL,
-            author TEXT,
-            topic TEXT,
-            tone TEXT,
-            takeaway TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Read and insert quotes from CSV
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                cursor.execute('''
-                INSERT INTO quotes (quote, author, topic, tone, takeaway)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    row['quote'],
-                    row['author'],
-                    row['topic'],
-                    row['tone'],
-                    row['takeaway']
-                ))
-        
+        started = time.perf_counter()
+        ensure_schema(cursor)
         conn.commit()
-        count = cursor.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
-        print(f"✅ Successfully imported {count} quotes!")
-        
+
+        read = inserted = updated = 0
+        for batch in batches(read_rows(csv_path), batch_size):
+            with conn:  # one transaction per batch
+                cursor.executemany(STAGE_SQL, batch)
+                updated += cursor.execute(UPDATE_SQL).rowcount
+                inserted += cursor.execute(INSERT_SQL).rowcount
+                cursor.execute("DELETE FROM import_stage")
+            read += len(batch)
+            print(f"  … {read:,} rows read")
+        elapsed = time.perf_counter() - started
+
+        if inserted or updated:
+            # Tell running bots (and the compiled corpus) the content changed
+            with conn:
+                cursor.execute(
+                    """
+                    INSERT INTO corpus_state (id, version) VALUES (1, ?)
+                    ON CONFLICT(id) DO UPDATE SET version = excluded.version
+                    """,
+                    (random.getrandbits(32),)
+                )
+
+        after = cursor.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+        print(f"✅ Imported {read:,} rows in {elapsed:.2f}s ({read / max(elapsed, 1e-9):,.0f} rows/s): "
+              f"{inserted:,} new, {updated:,} updated, {after:,} quotes total")
+
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         conn.rollback()
@@ -61,5 +179,10 @@ def import_quotes():
         conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv_path", nargs="?", type=Path, help="defaults to quotes.csv next to this script")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
     print("Starting quote import...")
-    import_quotes()
\ No newline at end of file
+    import_quotes(args.csv_path, args.batch_size)
@@ -1,23 +1,51 @@
 """Database package for the Quote Bot application."""
 
-from .database import get_connection, init_db
-from .models import User, UserPreferences, QuoteInteraction
+from .database import get_connection, connection, close_connections, init_db
+from .migrations import run_migrations, schema_version, check_query_plans
+from .models import User, UserPreferences, UserProfile, QuoteInteraction, QuoteStats, RotationState
 from .user_repository import add_user, update_user_status, get_active_users, get_user
-from .preference_repository import save_user_preferences, get_user_preferences, get_all_users_with_preferences
+from .preference_repository import (
+    save_user_preferences, get_user_preferences, get_preferences_for_users,
+    get_all_users_with_preferences, iter_users_with_preferences
+)
 from .interaction_repository import (
-    get_quote_interaction, update_quote_interaction,
+    get_quote_interaction, get_quote_interactions, update_quote_interaction, queue_quote_interaction,
     toggle_like, toggle_dislike, toggle_favorite,
-    get_disliked_quote_ids, get_quotes_by_interaction
+    get_disliked_quote_ids, get_disliked_quote_id_set, get_disliked_quote_id_sets,
+    get_quotes_by_interaction, get_quote_engagement
+)
+from .quote_repository import (
+    get_quote_by_id, get_random_quote, search_quotes, get_quote_ids, iter_quotes,
+    get_corpus_version, save_ai_quote, get_ai_quote
+)
+from .quote_stats_repository import (
+    get_quote_stats, get_top_quote_stats, record_quote_delivery, reconcile_quote_stats
+)
+from .profile_repository import get_user_profile
+from .cache import profile_cache
+from .interaction_buffer import InteractionBuffer, interaction_buffer
+from .rotation_repository import (
+    get_rotation_state, save_rotation_state, get_rotation_states, save_rotation_states
 )
-from .quote_repository import get_quote_by_id, get_random_quote, search_quotes
+from . import async_repository
 
 __all__ = [
-    'get_connection', 'init_db',
-    'User', 'UserPreferences', 'QuoteInteraction',
+    'get_connection', 'connection', 'close_connections', 'init_db',
+    'run_migrations', 'schema_version', 'check_query_plans',
+    'User', 'UserPreferences', 'UserProfile', 'QuoteInteraction', 'QuoteStats', 'RotationState',
     'add_user', 'update_user_status', 'get_active_users', 'get_user',
-    'save_user_preferences', 'get_user_preferences', 'get_all_users_with_preferences',
-    'get_quote_interaction', 'update_quote_interaction',
+    'get_user_profile', 'profile_cache',
+    'save_user_preferences', 'get_user_preferences', 'get_preferences_for_users',
+    'get_all_users_with_preferences', 'iter_users_with_preferences',
+    'get_quote_interaction', 'get_quote_interactions', 'update_quote_interaction',
+    'queue_quote_interaction',
+    'InteractionBuffer', 'interaction_buffer',
     'toggle_like', 'toggle_dislike', 'toggle_favorite',
-    'get_disliked_quote_ids', 'get_quotes_by_interaction',
-    'get_quote_by_id', 'get_random_quote', 'search_quotes'
+    'get_disliked_quote_ids', 'get_disliked_quote_id_set', 'get_disliked_quote_id_sets',
+    'get_quotes_by_interaction', 'get_quote_engagement',
+    'get_quote_by_id', 'get_random_quote', 'search_quotes', 'get_quote_ids', 'iter_quotes',
+    'get_corpus_version', 'save_ai_quote', 'get_ai_quote',
+    'get_quote_stats', 'get_top_quote_stats', 'record_quote_delivery', 'reconcile_quote_stats',
+    'get_rotation_state', 'save_rotation_state', 'get_rotation_states', 'save_rotation_states',
+    'async_repository'
 ]
@@ -0,0 +1,145 @@
+"""Awaitable versions of the repository functions.
+
+sqlite3 calls block, so running them in a handler stalls every other update
+on the event loop. The functions here run the repository calls on a
+dedicated database thread instead:
+
+    from quote_bot.db import async_repository as repo
+    prefs = await repo.get_user_preferences(user_id)
+
+Any other blocking database work can be sent there with ``await repo.run(fn, *args)``.
+The thread reuses its pooled connection (see database.connection()).
+There is one thread, so calls run one at a time in submission order. A slow
+write delays other database calls, but never the event loop, and writers
+never contend for SQLite's lock. At most MAX_PENDING calls are queued at
+once; further callers wait their turn without blocking the loop.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, Tuple, TypeVar
+
+from . import (
+    interaction_repository, preference_repository, profile_repository, quote_repository,
+    quote_stats_repository, rotation_repository, user_repository
+)
+
+T = TypeVar('T')
+
+# Calls queued on (or running in) the database thread before callers wait
+MAX_PENDING = 256
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quote-db")
+        return _executor
+
+def _get_slots() -> asyncio.Semaphore:
+    """The bounded queue's semaphore for the running event loop."""
+    global _slots
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots[0] is not loop:
+        _slots = (loop, asyncio.Semaphore(MAX_PENDING))
+    return _slots[1]
+
+async def run(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run ``fn(*args, **kwargs)`` on the database thread and await its result.
+
+    Args:
+        fn: A blocking callable, typically a repository function
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        Whatever fn returns; exceptions raised by fn propagate to the caller
+    """
+    async with _get_slots():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+_DONE = object()
+
+async def stream(items: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Iterate a blocking iterator on the database thread, one item per call.
+    
+    Meant for chunked generators such as iter_users_with_preferences(),
+    whose every step runs a query:
+    
+        async for chunk in repo.stream(iter_users_with_preferences()):
+            ...
+    """
+    while (item := await run(next, items, _DONE)) is not _DONE:
+        yield item
+
+def shutdown() -> None:
+    """Finish the queued calls and stop the database thread (call at shutdown)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+def _awaitable(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+# Users
+add_user = _awaitable(user_repository.add_user)
+update_user_status = _awaitable(user_repository.update_user_status)
+get_active_users = _awaitable(user_repository.get_active_users)
+get_user = _awaitable(user_repository.get_user)
+get_user_prefs = _awaitable(user_repository.get_user_prefs)
+record_daily_interaction = _awaitable(user_repository.record_daily_interaction)
+get_user_profile = _awaitable(profile_repository.get_user_profile)
+
+# Preferences
+save_user_preferences = _awaitable(preference_repository.save_user_preferences)
+get_user_preferences = _awaitable(preference_repository.get_user_preferences)
+get_preferences_for_users = _awaitable(preference_repository.get_preferences_for_users)
+get_all_users_with_preferences = _awaitable(preference_repository.get_all_users_with_preferences)
+
+# Interactions
+get_quote_interaction = _awaitable(interaction_repository.get_quote_interaction)
+get_quote_interactions = _awaitable(interaction_repository.get_quote_interactions)
+update_quote_interaction = _awaitable(interaction_repository.update_quote_interaction)
+queue_quote_interaction = _awaitable(interaction_repository.queue_quote_interaction)
+toggle_like = _awaitable(interaction_repository.toggle_like)
+toggle_dislike = _awaitable(interaction_repository.toggle_dislike)
+toggle_favorite = _awaitable(interaction_repository.toggle_favorite)
+get_disliked_quote_ids = _awaitable(interaction_repository.get_disliked_quote_ids)
+get_disliked_quote_id_set = _awaitable(interaction_repository.get_disliked_quote_id_set)
+get_disliked_quote_id_sets = _awaitable(interaction_repository.get_disliked_quote_id_sets)
+get_quotes_by_interaction = _awaitable(interaction_repository.get_quotes_by_interaction)
+get_quote_engagement = _awaitable(interaction_repository.get_quote_engagement)
+
+# Quotes
+get_quote_by_id = _awaitable(quote_repository.get_quote_by_id)
+get_random_quote = _awaitable(quote_repository.get_random_quote)
+search_quotes = _awaitable(quote_repository.search_quotes)
+get_quote_ids = _awaitable(quote_repository.get_quote_ids)
+get_corpus_version = _awaitable(quote_repository.get_corpus_version)
+save_ai_quote = _awaitable(quote_repository.save_ai_quote)
+get_ai_quote = _awaitable(quote_repository.get_ai_quote)
+
+# Quote stats
+get_quote_stats = _awaitable(quote_stats_repository.get_quote_stats)
+get_top_quote_stats = _awaitable(quote_stats_repository.get_top_quote_stats)
+record_quote_delivery = _awaitable(quote_stats_repository.record_quote_delivery)
+reconcile_quote_stats = _awaitable(quote_stats_repository.reconcile_quote_stats)
+
+# Rotations
+get_rotation_state = _awaitable(rotation_repository.get_rotation_state)
+save_rotation_state = _awaitable(rotation_repository.save_rotation_state)
+get_rotation_states = _awaitable(rotation_repository.get_rotation_states)
+save_rotation_states = _awaitable(rotation_repository.save_rotation_states)
@@ -0,0 +1,190 @@
+"""In-process caches for hot database lookups."""
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+# Upper bound on disliked ids held across all cached users (~8 bytes per id
+# for the set slot plus the shared small-int objects)
+DISLIKE_CACHE_MAX_IDS = 1_000_000
+
+# Quote rows kept by the read-through quote cache (a row is ~0.5-1 KB)
+QUOTE_CACHE_MAX_ENTRIES = 50_000
+
+# User profiles kept, and how long one is trusted before it is re-read
+# (writes through this process invalidate immediately; the TTL bounds how
+# stale a change made by another process can look)
+PROFILE_CACHE_MAX_ENTRIES = 10_000
+PROFILE_CACHE_TTL_SECONDS = 300
+
+
+class DislikeCache:
+    """LRU cache of each user's disliked quote ids.
+
+    Entries are immutable frozensets so readers can hold on to them without
+    copying; writers replace the entry for a user instead of mutating it.
+    The cache is bounded by the total number of ids it holds, evicting the
+    least recently used users first.
+    """
+
+    def __init__(self, max_ids: int = DISLIKE_CACHE_MAX_IDS):
+        self.max_ids = max_ids
+        self._entries: 'OrderedDict[int, FrozenSet[int]]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[FrozenSet[int]]:
+        """Return the cached dislikes for *user_id*, or None on a miss."""
+        with self._lock:
+            ids = self._entries.get(user_id)
+            if ids is not None:
+                self._entries.move_to_end(user_id)
+            return ids
+
+    def put(self, user_id: int, quote_ids: Iterable[int]) -> FrozenSet[int]:
+        """Cache the full set of dislikes for *user_id* and return it."""
+        ids = frozenset(quote_ids)
+        with self._lock:
+            self._store(user_id, ids)
+        return ids
+
+    def update(self, user_id: int, quote_id: int, is_disliked: bool) -> None:
+        """Apply a single dislike change to a cached user (no-op on a miss)."""
+        with self._lock:
+            ids = self._entries.get(user_id)
+            if ids is None:
+                return
+            self._store(user_id, ids | {quote_id} if is_disliked else ids - {quote_id})
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop one user's entry, or everything when *user_id* is None."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._size = 0
+            elif user_id in self._entries:
+                self._size -= len(self._entries.pop(user_id)) + 1
+
+    def _store(self, user_id: int, ids: FrozenSet[int]) -> None:
+        old = self._entries.pop(user_id, None)
+        if old is not None:
+            self._size -= len(old) + 1
+        self._entries[user_id] = ids
+        self._size += len(ids) + 1
+        while self._size > self.max_ids and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted) + 1
+
+
+class QuoteCache:
+    """Read-through cache of quote rows, plus every quote id for random draws.
+
+    Rows are kept in an LRU keyed by id. The full id list is loaded once
+    into a compact ``array`` so a random quote costs one ``random.choice``
+    and one cached lookup instead of an ``ORDER BY RANDOM()`` sort. Call
+    invalidate() when the quotes table changes (QuoteService does on reload).
+    """
+
+    def __init__(self, max_entries: int = QUOTE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._ids: Optional[array] = None
+        self._lock = threading.Lock()
+
+    def get(self, quote_id: int) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached row for *quote_id*, or None on a miss."""
+        with self._lock:
+            quote = self._entries.get(quote_id)
+            if quote is None:
+                return None
+            self._entries.move_to_end(quote_id)
+            return dict(quote)
+
+    def put(self, quote_id: int, quote: Dict[str, Any]) -> None:
+        """Cache the row for *quote_id*."""
+        with self._lock:
+            self._entries[quote_id] = dict(quote)
+            self._entries.move_to_end(quote_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def random_id(self, load_ids: Callable[[], Iterable[int]]) -> Optional[int]:
+        """Return a uniformly random quote id, loading the id list on first use."""
+        ids = self._ids
+        if ids is None:
+            ids = array('q', load_ids())
+            with self._lock:
+                self._ids = ids
+        return random.choice(ids) if ids else None
+
+    def invalidate(self) -> None:
+        """Drop all cached rows and the id list."""
+        with self._lock:
+            self._entries.clear()
+            self._ids = None
+
+
+class ProfileCache:
+    """TTL + LRU cache of UserProfile objects, with hit/miss counters.
+
+    Entries expire *ttl* seconds after they were stored and the least
+    recently used ones are evicted beyond *max_entries*. The repositories
+    invalidate a user whenever they change their row or preferences.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_MAX_ENTRIES,
+                 ttl: float = PROFILE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[int, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Any]:
+        """Return the cached profile for *user_id*, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: int, profile: Any) -> None:
+        """Cache *profile* for *user_id* for the next *ttl* seconds."""
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end(user_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop one user's profile, or everything when *user_id* is None."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+            }
+
+
+# Shared instances used by the repositories
+dislike_cache = DislikeCache()
+quote_cache = QuoteCache()
+profile_cache = ProfileCache()
@@ -2,15 +2,157 @@
 import os
 import sqlite3
 import logging
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, TypeVar
+
+from .migrations import run_migrations
+
+T = TypeVar('T')
 
 logger = logging.getLogger(__name__)
 DB_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "quote_bot.db")
 print("🔍 Using database:", DB_FILE)
 
-def get_connection() -> sqlite3.Connection:
-    """Get a database connection."""
-    return sqlite3.connect(DB_FILE)
+# Applied once to every connection. WAL lets readers run alongside the
+# writer; NORMAL sync is durable across crashes of the bot process (only an
+# OS crash can lose the last commits); mmap and a bigger page cache keep hot
+# pages out of read() calls.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",   # 256 MiB
+    "PRAGMA cache_size = -16384",     # 16 MiB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+# Prepared statements kept per connection (sqlite3's default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+def get_connection(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a new, tuned database connection that the caller must close.
+    
+    Repositories should borrow the shared per-thread connection through
+    connection() instead; this is for one-off work such as init_db().
+    """
+    conn = sqlite3.connect(DB_FILE, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=check_same_thread)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class _ThreadConnection(threading.local):
+    conn: Optional[sqlite3.Connection] = None
+    generation: int = -1
+    depth: int = 0
+
+_local = _ThreadConnection()
+_open_connections: List[sqlite3.Connection] = []
+_open_lock = threading.Lock()
+_generation = 0  # bumped by close_connections() so threads reconnect
+
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow this thread's persistent database connection.
+    
+    The connection is opened (and tuned) on a thread's first borrow and then
+    reused, so queries skip the connect/PRAGMA/statement-prepare cost.
+    Borrows may nest. When the outermost borrow ends, any transaction the
+    caller left open is rolled back, just as closing a connection would.
+    
+    Yields:
+        The thread's sqlite3 connection
+    """
+    local = _local
+    if local.conn is None or local.generation != _generation:
+        # Only this thread uses it; check_same_thread is off so that
+        # close_connections() can close it from the shutdown thread
+        local.conn = get_connection(check_same_thread=False)
+        local.generation = _generation
+        with _open_lock:
+            _open_connections.append(local.conn)
+    conn = local.conn
+    local.depth += 1
+    try:
+        yield conn
+    finally:
+        local.depth -= 1
+        if local.depth == 0 and conn.in_transaction:
+            conn.rollback()
+
+def close_connections() -> None:
+    """Close every connection handed out by connection() (call at shutdown)."""
+    global _generation
+    with _open_lock:
+        _generation += 1
+        for conn in _open_connections:
+            conn.close()
+        _open_connections.clear()
+
+# Stay under SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds (999)
+MAX_QUERY_PARAMS = 900
+
+def chunked(items: Iterable[T], size: int = MAX_QUERY_PARAMS) -> Iterator[List[T]]:
+    """Split *items* into lists of at most *size*, e.g. for ``IN (...)`` queries."""
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def create_quote_search_index(cursor: sqlite3.Cursor) -> bool:
+    """
+    Create the FTS5 index over the quotes table and the triggers that keep it in sync.
+    
+    ``quotes_fts`` is an external-content table: it stores only the token
+    index and reads column values from ``quotes`` by rowid. The index is
+    rebuilt from ``quotes`` when it is first created.
+    
+    Args:
+        cursor: Cursor on a connection where the quotes table exists
+    
+    Returns:
+        True if the index is available, False if SQLite lacks FTS5
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quotes_fts'"
+    ).fetchone()
+    try:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(
+            quote, author, topic, takeaway,
+            content='quotes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Full-text search unavailable, falling back to LIKE: {e}")
+        return False
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_insert AFTER INSERT ON quotes BEGIN
+        INSERT INTO quotes_fts(rowid, quote, author, topic, takeaway)
+        VALUES (new.id, new.quote, new.author, new.topic, new.takeaway);
+    END''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_delete AFTER DELETE ON quotes BEGIN
+        INSERT INTO quotes_fts(quotes_fts, rowid, quote, author, topic, takeaway)
+        VALUES ('delete', old.id, old.quote, old.author, old.topic, old.takeaway);
+    END''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_update AFTER UPDATE ON quotes BEGIN
+        INSERT INTO quotes_fts(quotes_fts, rowid, quote, author, topic, takeaway)
+        VALUES ('delete', old.id, old.quote, old.author, old.topic, old.takeaway);
+        INSERT INTO quotes_fts(rowid, quote, author, topic, takeaway)
+        VALUES (new.id, new.quote, new.author, new.topic, new.takeaway);
+    END''')
+    
+    if not exists:
+        cursor.execute("INSERT INTO quotes_fts(quotes_fts) VALUES ('rebuild')")
+    return True
 
 def init_db() -> None:
     """Initialize the database and create necessary tables if they don't exist."""
@@ -19,56 +161,19 @@ def init_db() -> None:
         conn = get_connection()
         cursor = conn.cursor()
         
-        # Users table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            first_name TEXT,
-            is_paused INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
+        # Tables, columns and indexes (see migrations.py)
+        applied = run_migrations(conn)
+        if applied:
+            logger.info(f"Applied {applied} schema migrations")
         
-        # User preferences table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_preferences (
-            user_id INTEGER PRIMARY KEY,
-            topics TEXT,
-            tone TEXT,
-            quote_length TEXT,
-            author_pref TEXT,
-            delivery_time TEXT,
-            weekend_toggle INTEGER DEFAULT 1,
-            context_line INTEGER DEFAULT 0,
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )''')
-        
-        # Quote interactions table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS quote_interactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            quote_id INTEGER,
-            quote_text TEXT,
-            quote_author TEXT,
-            is_liked INTEGER DEFAULT 0,
-            is_disliked INTEGER DEFAULT 0,
-            is_favorited INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, quote_id),
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )''')
-        
-        # Create indexes for better query performance
-        cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_quote_interactions_user 
-        ON quote_interactions(user_id)
-        ''')
-        cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_quote_interactions_quote 
-        ON quote_interactions(quote_id)
-        ''')
+        # Full-text search over quotes (the table itself is created by import_quotes.py)
+        if cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quotes'"
+        ).fetchone():
+            create_quote_search_index(cursor)
+            cursor.execute(
+                "INSERT OR IGNORE INTO corpus_state (id, version) VALUES (1, abs(random()) % 4294967296)"
+            )
         
         conn.commit()
         logger.info("Database initialized successfully.")
@@ -0,0 +1,188 @@
+"""Write-behind buffer for quote interactions.
+
+Like/dislike/favorite taps are recorded in memory and written by a
+background thread in one transaction every FLUSH_INTERVAL_MS, or as soon as
+FLUSH_MAX_EVENTS taps are waiting, so a burst of taps costs one commit (and
+one fsync) instead of one each. Repeated taps on the same (user, quote)
+coalesce into a single row write. The interaction repository overlays the
+unwritten changes on what it reads, so readers see them immediately.
+
+Quote deliveries are counted here too and added to quote_stats in the same
+commit (the quote_stats counters therefore trail sends and taps by at most
+one flush).
+"""
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .cache import dislike_cache
+from .database import connection
+from .models import INTERACTION_FLAGS, UNIX_NOW, flag_masks
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_MS = 250
+FLUSH_MAX_EVENTS = 500
+
+INTERACTION_COLUMNS = frozenset(INTERACTION_FLAGS)
+
+# Flags a tap did not touch keep their stored value
+FLUSH_SQL = f'''
+INSERT INTO quote_interactions (user_id, quote_id, flags, updated_at)
+VALUES (:user_id, :quote_id, :set, {UNIX_NOW})
+ON CONFLICT(user_id, quote_id) DO UPDATE SET
+    flags = (flags & ~:touched) | :set,
+    updated_at = excluded.updated_at
+'''
+
+DELIVERIES_SQL = '''
+INSERT INTO quote_stats (quote_id, deliveries) VALUES (?, ?)
+ON CONFLICT(quote_id) DO UPDATE SET deliveries = deliveries + excluded.deliveries
+'''
+
+Pending = Dict[Tuple[int, int], Dict[str, Any]]
+
+class InteractionBuffer:
+    """Coalescing write-behind queue of quote_interactions updates.
+
+    Until start() is called (and after stop()) every record() is written
+    through immediately, so scripts and tests need no flush thread.
+    """
+
+    def __init__(self, flush_interval_ms: int = FLUSH_INTERVAL_MS,
+                 max_events: int = FLUSH_MAX_EVENTS):
+        self.flush_interval_ms = flush_interval_ms
+        self.max_events = max_events
+        self._pending: Pending = {}
+        self._flushing: Pending = {}    # taken by a flush, not committed yet
+        self._deliveries: Counter = Counter()
+        self._events = 0
+        self._retrying = False          # last flush failed: wait before the next
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="interaction-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and write out everything still pending."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._wakeup.notify()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def record(self, user_id: int, quote_id: int, **updates: Any) -> None:
+        """
+        Queue field updates for one interaction row.
+
+        Args:
+            user_id: The Telegram user ID
+            quote_id: The ID of the quote
+            **updates: Flag values (see INTERACTION_FLAGS); later taps
+                on the same row override earlier ones
+        """
+        with self._lock:
+            self._pending.setdefault((user_id, quote_id), {}).update(updates)
+            self._events += 1
+            if self._events >= self.max_events:
+                self._wakeup.notify()
+            running = self._thread is not None
+        if 'is_disliked' in updates:
+            dislike_cache.update(user_id, quote_id, bool(updates['is_disliked']))
+        if not running:
+            self.flush()
+
+    def record_delivery(self, quote_id: int) -> None:
+        """Count one send of *quote_id* towards its quote_stats deliveries."""
+        with self._lock:
+            self._deliveries[quote_id] += 1
+            self._events += 1
+            if self._events >= self.max_events:
+                self._wakeup.notify()
+            running = self._thread is not None
+        if not running:
+            self.flush()
+
+    def pending(self, user_id: int, quote_id: int) -> Dict[str, Any]:
+        """Field values recorded for one interaction but not committed yet."""
+        key = (user_id, quote_id)
+        with self._lock:
+            return {**self._flushing.get(key, {}), **self._pending.get(key, {})}
+
+    def pending_dislikes(self, user_ids: Iterable[int]) -> Dict[int, Dict[int, bool]]:
+        """Uncommitted dislike flags of *user_ids*: user → quote → is_disliked."""
+        wanted = set(user_ids)
+        result: Dict[int, Dict[int, bool]] = {}
+        with self._lock:
+            for source in (self._flushing, self._pending):
+                for (user_id, quote_id), updates in source.items():
+                    if user_id in wanted and 'is_disliked' in updates:
+                        result.setdefault(user_id, {})[quote_id] = bool(updates['is_disliked'])
+        return result
+
+    def flush(self) -> int:
+        """
+        Write every pending update and delivery count in one transaction.
+
+        On failure the updates are put back (newer taps still win) and
+        retried by the next flush.
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                events, self._events = self._events, 0
+                deliveries, self._deliveries = self._deliveries, Counter()
+                self._flushing = batch
+            if not batch and not deliveries:
+                return 0
+            rows = [dict(zip(('set', 'touched'), flag_masks(updates)), user_id=user_id, quote_id=quote_id)
+                    for (user_id, quote_id), updates in batch.items()]
+            try:
+                with connection() as conn:
+                    conn.executemany(FLUSH_SQL, rows)
+                    conn.executemany(DELIVERIES_SQL, deliveries.items())
+                    conn.commit()
+            except Exception as e:
+                logger.error(f"Error flushing {len(rows)} quote interactions: {e}", exc_info=True)
+                with self._lock:
+                    for key, updates in self._pending.items():
+                        batch.setdefault(key, {}).update(updates)
+                    self._pending, self._flushing = batch, {}
+                    self._deliveries.update(deliveries)
+                    self._events += events
+                    self._retrying = True
+                return 0
+            with self._lock:
+                self._flushing = {}
+                self._retrying = False
+            logger.debug(f"Flushed {len(rows)} quote interactions")
+            return len(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._thread is not None and (self._events < self.max_events or self._retrying):
+                    self._wakeup.wait(self.flush_interval_ms / 1000)
+                if self._thread is None:
+                    return
+            self.flush()
+
+# Global buffer instance
+interaction_buffer = InteractionBuffer()
@@ -1,11 +1,39 @@
 """Quote interaction database operations for the Quote Bot application."""
 import logging
-from typing import List, Dict, Optional, Tuple
-from .database import get_connection
-from .models import QuoteInteraction
+from typing import Any, Callable, List, Dict, Mapping, Optional, Tuple, FrozenSet, Iterable
+from .database import connection, chunked, MAX_QUERY_PARAMS
+from .cache import dislike_cache
+from .interaction_buffer import INTERACTION_COLUMNS, interaction_buffer
+from .models import (
+    INTERACTION_FLAGS, FLAG_BITS, LIKED, DISLIKED, FAVORITED, UNIX_NOW, flag_masks, QuoteInteraction
+)
 
 logger = logging.getLogger(__name__)
 
+def _interaction_state(flags: Optional[int], *pending: Dict) -> Dict[str, bool]:
+    """
+    Map a stored flags integer to the interaction dict.
+    
+    Args:
+        flags: The stored flag bits, or None if there is no row
+        *pending: Buffered updates to apply on top, oldest first
+    """
+    state = {flag: bool((flags or 0) & bit) for flag, bit in FLAG_BITS.items()}
+    for updates in pending:
+        state.update((flag, bool(updates[flag])) for flag in INTERACTION_FLAGS if flag in updates)
+    return state
+
+def _with_pending_dislikes(user_id: int, quote_ids: Iterable[int], *pending: Dict) -> List[int]:
+    """Apply buffered dislike changes (user → quote → flag maps, oldest first) to stored IDs."""
+    ids = set(quote_ids)
+    for overrides in pending:
+        for quote_id, is_disliked in overrides.get(user_id, {}).items():
+            if is_disliked:
+                ids.add(quote_id)
+            else:
+                ids.discard(quote_id)
+    return list(ids)
+
 def get_quote_interaction(user_id: int, quote_id: int) -> Dict[str, bool]:
     """
     Get a user's interaction with a specific quote.
@@ -15,98 +43,158 @@ def get_quote_interaction(user_id: int, quote_id: int) -> Dict[str, bool]:
         quote_id: The ID of the quote
         
     Returns:
-        Dictionary with interaction status (liked, disliked, favorited)
+        Dictionary with interaction status (liked, disliked, favorited),
+        including taps still waiting in the interaction buffer
     """
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT is_liked, is_disliked, is_favorited
-            FROM quote_interactions
-            WHERE user_id = ? AND quote_id = ?
-            """,
-            (user_id, quote_id)
-        )
-        result = cursor.fetchone()
-        if result:
-            return {
-                'is_liked': bool(result[0]),
-                'is_disliked': bool(result[1]),
-                'is_favorited': bool(result[2])
-            }
-        return {'is_liked': False, 'is_disliked': False, 'is_favorited': False}
+        # Read the buffer on both sides of the query so a flush committing
+        # in between can't hide a tap
+        before = interaction_buffer.pending(user_id, quote_id)
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT flags FROM quote_interactions WHERE user_id = ? AND quote_id = ?",
+                (user_id, quote_id)
+            )
+            row = cursor.fetchone()
+        return _interaction_state(row and row[0], before, interaction_buffer.pending(user_id, quote_id))
     except Exception as e:
         logger.error(f"Error getting quote interaction: {e}")
-        return {'is_liked': False, 'is_disliked': False, 'is_favorited': False}
-    finally:
-        if conn:
-            conn.close()
+        return _interaction_state(None)
 
-def update_quote_interaction(user_id: int, quote_id: int, **updates) -> None:
+def get_quote_interactions(pairs: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Dict[str, bool]]:
+    """
+    Get the interaction state of many (user, quote) pairs at once.
+    
+    Pairs are looked up with one indexed join per chunk, e.g. for all the
+    keyboards of a broadcast batch.
+    
+    Args:
+        pairs: (user_id, quote_id) tuples
+        
+    Returns:
+        Dictionary mapping every requested pair to the same dict
+        get_quote_interaction returns (all False for pairs without a row)
+    """
+    pairs = list(dict.fromkeys(pairs))
+    rows: Dict[Tuple[int, int], int] = {}
+    before = {pair: interaction_buffer.pending(*pair) for pair in pairs}
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(pairs, MAX_QUERY_PARAMS // 2):
+                values = ", ".join(["(?, ?)"] * len(chunk))
+                cursor.execute(
+                    f"""
+                    WITH wanted(user_id, quote_id) AS (VALUES {values})
+                    SELECT qi.user_id, qi.quote_id, qi.flags
+                    FROM wanted
+                    JOIN quote_interactions qi
+                      ON qi.user_id = wanted.user_id AND qi.quote_id = wanted.quote_id
+                    """,
+                    [value for pair in chunk for value in pair]
+                )
+                for user_id, quote_id, flags in cursor.fetchall():
+                    rows[user_id, quote_id] = flags
+    except Exception as e:
+        logger.error(f"Error getting interactions for {len(pairs)} quotes: {e}")
+    return {
+        pair: _interaction_state(rows.get(pair), before[pair], interaction_buffer.pending(*pair))
+        for pair in pairs
+    }
+
+def _upsert_interaction(user_id: int, quote_id: int, insert_flags: int,
+                        update_sql: str, guard: str = "") -> Optional[Dict[str, bool]]:
+    """
+    Insert or update one interaction row with a single statement.
+    
+    Args:
+        user_id: The Telegram user ID
+        quote_id: The ID of the quote
+        insert_flags: Flag bits of a new row
+        update_sql: New flags of an existing row (an expression over ``flags``)
+        guard: Optional WHERE condition on the existing row; if it is false
+            the row is left untouched
+        
+    Returns:
+        The interaction state after the write, or None if the guard skipped it
+    """
+    if interaction_buffer.pending(user_id, quote_id):
+        interaction_buffer.flush()  # or the buffered tap would land after this write
+    where = f" WHERE {guard}" if guard else ""
+    try:
+        with connection() as conn:
+            row = conn.execute(
+                f"""
+                INSERT INTO quote_interactions (user_id, quote_id, flags, updated_at)
+                VALUES (?, ?, ?, {UNIX_NOW})
+                ON CONFLICT(user_id, quote_id) DO UPDATE SET
+                    flags = {update_sql}, updated_at = excluded.updated_at{where}
+                RETURNING flags
+                """,
+                (user_id, quote_id, insert_flags)
+            ).fetchone()
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error updating quote interaction: {e}", exc_info=True)
+        raise
+    if row is None:
+        return None
+    state = _interaction_state(row[0])
+    dislike_cache.update(user_id, quote_id, state['is_disliked'])
+    return state
+
+def update_quote_interaction(user_id: int, quote_id: int, **updates) -> Dict[str, bool]:
     """
     Update a user's interaction with a quote.
     
+    The row is created or updated by a single upsert, which also returns
+    the resulting flags, so callers can render them without another read.
+    
     Args:
         user_id: The Telegram user ID
         quote_id: The ID of the quote
         **updates: Dictionary of fields to update (is_liked, is_disliked, is_favorited)
+        
+    Returns:
+        Dictionary with the interaction status after the update
     """
     if not updates:
-        return
-        
-    conn = None
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Log the update attempt
-        logger.debug(f"Updating interaction - User: {user_id}, Quote: {quote_id}, Updates: {updates}")
-        
-        # Check if interaction exists
-        cursor.execute(
-            "SELECT id, is_liked, is_disliked, is_favorited FROM quote_interactions WHERE user_id = ? AND quote_id = ?",
-            (user_id, quote_id)
-        )
-        exists = cursor.fetchone()
-        
-        if exists:
-            # Update existing interaction
-            set_clause = ", ".join(f"{k} = ?" for k in updates)
-            set_clause += ", updated_at = CURRENT_TIMESTAMP"
-            values = list(updates.values()) + [user_id, quote_id]
-            query = f"UPDATE quote_interactions SET {set_clause} WHERE user_id = ? AND quote_id = ?"
-            logger.debug(f"Executing update query: {query} with values {values}")
-            cursor.execute(query, values)
-        else:
-            # Insert new interaction
-            columns = ["user_id", "quote_id"] + list(updates.keys())
-            placeholders = ", ".join(["?"] * len(columns))
-            values = [user_id, quote_id] + list(updates.values())
-            query = f"INSERT INTO quote_interactions ({', '.join(columns)}) VALUES ({placeholders})"
-            logger.debug(f"Executing insert query: {query} with values {values}")
-            cursor.execute(query, values)
+        return get_quote_interaction(user_id, quote_id)
+    unknown = set(updates) - INTERACTION_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown interaction fields: {', '.join(sorted(unknown))}")
         
-        # Verify the update/insert was successful
-        cursor.execute(
-            "SELECT is_liked, is_disliked, is_favorited FROM quote_interactions WHERE user_id = ? AND quote_id = ?",
-            (user_id, quote_id)
-        )
-        result = cursor.fetchone()
-        logger.debug(f"Verification query result: {result}")
-        
-        conn.commit()
-        logger.info(f"Successfully updated interaction - User: {user_id}, Quote: {quote_id}")
+    logger.debug(f"Updating interaction - User: {user_id}, Quote: {quote_id}, Updates: {updates}")
+    set_bits, touched = flag_masks(updates)
+    return _upsert_interaction(user_id, quote_id, set_bits, f"(flags & ~{touched}) | {set_bits}")
+
+def queue_quote_interaction(user_id: int, quote_id: int, **updates) -> Dict[str, bool]:
+    """
+    Record an interaction update in the write-behind buffer.
+    
+    Cheaper than update_quote_interaction under bursts of taps: the row is
+    written by the buffer's next group commit (see interaction_buffer), and
+    nothing is read from the database.
+    
+    Args:
+        user_id: The Telegram user ID
+        quote_id: The ID of the quote
+        **updates: Dictionary of fields to update (is_liked, is_disliked, is_favorited)
         
-    except Exception as e:
-        logger.error(f"Error updating quote interaction: {e}", exc_info=True)
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if conn:
-            conn.close()
+    Returns:
+        Partial interaction dict, unlike update_quote_interaction's: only
+        the flags in *updates* or in taps on this row still in the buffer,
+        with their new values. Flags absent from it are unchanged in the
+        database and were not read; call get_quote_interaction for the
+        full state
+    """
+    unknown = set(updates) - INTERACTION_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown interaction fields: {', '.join(sorted(unknown))}")
+    known = {**interaction_buffer.pending(user_id, quote_id), **updates}
+    interaction_buffer.record(user_id, quote_id, **updates)
+    return {flag: bool(known[flag]) for flag in INTERACTION_FLAGS if flag in known}
 
 def toggle_like(user_id: int, quote_id: int) -> bool:
     """
@@ -120,26 +208,12 @@ def toggle_like(user_id: int, quote_id: int) -> bool:
     Returns:
         bool: Current like status after the operation
     """
-    interaction = get_quote_interaction(user_id, quote_id)
-    
-    if interaction['is_liked']:
-        # Already liked, remove the like
-        update_quote_interaction(
-            user_id,
-            quote_id,
-            is_liked=0
-        )
-        return False
-    else:
-        # Not liked, add like and remove dislike
-        update_quote_interaction(
-            user_id, 
-            quote_id,
-            is_liked=1,
-            is_disliked=0  # Remove dislike when liking
-        )
-        return True
-    return True
+    # A like clears the dislike; an unlike leaves the other bits alone
+    state = _upsert_interaction(
+        user_id, quote_id, LIKED,
+        f"CASE WHEN flags & {LIKED} THEN flags & ~{LIKED} ELSE (flags | {LIKED}) & ~{DISLIKED} END"
+    )
+    return state['is_liked']
 
 def toggle_dislike(user_id: int, quote_id: int) -> bool:
     """
@@ -153,19 +227,11 @@ def toggle_dislike(user_id: int, quote_id: int) -> bool:
     Returns:
         bool: True if disliked, False if already disliked
     """
-    interaction = get_quote_interaction(user_id, quote_id)
-    
-    # If already disliked, do nothing
-    if interaction['is_disliked']:
-        return False
-        
-    update_quote_interaction(
-        user_id, 
-        quote_id,
-        is_disliked=1,
-        is_liked=0  # Remove like when disliking
+    state = _upsert_interaction(
+        user_id, quote_id, DISLIKED,
+        f"(flags | {DISLIKED}) & ~{LIKED}", guard=f"flags & {DISLIKED} = 0"
     )
-    return True
+    return state is not None
 
 def toggle_favorite(user_id: int, quote_id: int, is_favorite: bool = None) -> None:
     """
@@ -177,14 +243,13 @@ def toggle_favorite(user_id: int, quote_id: int, is_favorite: bool = None) -> No
         is_favorite: Optional boolean to set favorite status directly
     """
     if is_favorite is None:
-        interaction = get_quote_interaction(user_id, quote_id)
-        is_favorite = not interaction['is_favorited']
-    
-    update_quote_interaction(
-        user_id,
-        quote_id,
-        is_favorited=1 if is_favorite else 0
-    )
+        _upsert_interaction(
+            user_id, quote_id, FAVORITED,
+            f"CASE WHEN flags & {FAVORITED} THEN flags & ~{FAVORITED} ELSE flags | {FAVORITED} END"
+        )
+    else:
+        bit = FAVORITED if is_favorite else 0
+        _upsert_interaction(user_id, quote_id, bit, f"(flags & ~{FAVORITED}) | {bit}")
 
 def get_disliked_quote_ids(user_id: int) -> List[int]:
     """
@@ -196,70 +261,186 @@ def get_disliked_quote_ids(user_id: int) -> List[int]:
     Returns:
         List of disliked quote IDs
     """
-    conn = None
+    return list(get_disliked_quote_id_set(user_id))
+
+def get_disliked_quote_id_set(user_id: int) -> FrozenSet[int]:
+    """
+    Get the set of quote IDs that the user has disliked.
+    
+    Served from the in-process dislike cache; only a miss queries the
+    database. Writes through update_quote_interaction and the toggles
+    keep it current.
+    
+    Args:
+        user_id: The Telegram user ID
+        
+    Returns:
+        Frozen set of disliked quote IDs
+    """
+    cached = dislike_cache.get(user_id)
+    if cached is not None:
+        return cached
+        
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT quote_id FROM quote_interactions WHERE user_id = ? AND is_disliked = 1",
-            (user_id,)
-        )
-        return [row[0] for row in cursor.fetchall()]
+        before = interaction_buffer.pending_dislikes([user_id])
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT quote_id FROM quote_interactions WHERE user_id = ? AND flags & {DISLIKED}",
+                (user_id,)
+            )
+            stored = [row[0] for row in cursor.fetchall()]
+        after = interaction_buffer.pending_dislikes([user_id])
+        return dislike_cache.put(user_id, _with_pending_dislikes(user_id, stored, before, after))
     except Exception as e:
         logger.error(f"Error getting disliked quotes for user {user_id}: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
+        return frozenset()
 
-def get_favorite_quotes(user_id: int, limit: int = 10, offset: int = 0) -> List[dict]:
+def get_disliked_quote_id_sets(user_ids: Iterable[int]) -> Dict[int, FrozenSet[int]]:
+    """
+    Get disliked quote IDs for many users at once.
+    
+    Cached users are served from memory; the rest are fetched with one
+    query per chunk of IDs and added to the cache.
+    
+    Args:
+        user_ids: The Telegram user IDs
+        
+    Returns:
+        Dictionary mapping every requested user ID to its disliked quote IDs
+    """
+    results: Dict[int, FrozenSet[int]] = {}
+    missing = []
+    for user_id in user_ids:
+        cached = dislike_cache.get(user_id)
+        if cached is not None:
+            results[user_id] = cached
+        else:
+            missing.append(user_id)
+    if not missing:
+        return results
+        
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(missing):
+                before = interaction_buffer.pending_dislikes(chunk)
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"""
+                    SELECT user_id, quote_id FROM quote_interactions
+                    WHERE flags & {DISLIKED} AND user_id IN ({placeholders})
+                    """,
+                    chunk
+                )
+                found: Dict[int, List[int]] = {user_id: [] for user_id in chunk}
+                for user_id, quote_id in cursor.fetchall():
+                    found[user_id].append(quote_id)
+                after = interaction_buffer.pending_dislikes(chunk)
+                for user_id, quote_ids in found.items():
+                    quote_ids = _with_pending_dislikes(user_id, quote_ids, before, after)
+                    results[user_id] = dislike_cache.put(user_id, quote_ids)
+    except Exception as e:
+        logger.error(f"Error getting disliked quotes for {len(missing)} users: {e}")
+    for user_id in missing:
+        results.setdefault(user_id, frozenset())
+    return results
+
+def get_quote_engagement() -> Dict[int, Tuple[int, int]]:
+    """
+    Get like and dislike totals for every quote that has any.
+    
+    Read from the quote_stats counters, not aggregated from the interactions.
+    
+    Returns:
+        Dictionary mapping quote ID to a (likes, dislikes) tuple
+    """
+    interaction_buffer.flush()  # count every tap, buffered ones included
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT quote_id, likes, dislikes
+                FROM quote_stats
+                WHERE likes > 0 OR dislikes > 0
+                """
+            )
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    except Exception as e:
+        logger.error(f"Error getting quote engagement: {e}")
+        return {}
+
+def _with_quote_text(rows: List[tuple],
+                     resolve: Optional[Callable[[int], Optional[Mapping[str, Any]]]]) -> List[dict]:
+    """Quote dicts for (quote_id, updated_at, ai text, ai author) rows, corpus text from *resolve*."""
+    quotes = []
+    for quote_id, updated_at, text, author in rows:
+        if text is None and resolve is not None and quote_id > 0:
+            found = resolve(quote_id)
+            if found is not None:
+                text, author = found['quote'], found['author']
+        quotes.append({
+            'quote_id': quote_id,
+            'quote': text or 'Quote text not available',
+            'author': author or 'Unknown',
+            'updated_at': updated_at
+        })
+    return quotes
+
+def get_favorite_quotes(user_id: int, limit: int = 10, offset: int = 0,
+                        resolve: Optional[Callable[[int], Optional[Mapping[str, Any]]]] = None) -> List[dict]:
     """
     Get a user's favorite quotes.
     
+    AI-generated quotes are joined from ai_quotes, corpus quotes are looked
+    up with *resolve*, as in get_quotes_by_interaction.
+    
     Args:
         user_id: The Telegram user ID
         limit: Maximum number of quotes to return
         offset: Offset for pagination
+        resolve: Maps a corpus quote ID to its quote (with 'quote' and
+            'author' keys) or None, e.g. the in-memory store's get()
         
     Returns:
         List of dictionaries containing quote details
     """
-    conn = None
+    interaction_buffer.flush()  # buffered taps first, so the list is current
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT q.id, q.quote, q.author, qi.updated_at
-            FROM quote_interactions qi
-            JOIN quotes q ON qi.quote_id = q.id
-            WHERE qi.user_id = ? AND qi.is_favorited = 1
-            ORDER BY qi.updated_at DESC
-            LIMIT ? OFFSET ?
-            """,
-            (user_id, limit, offset)
-        )
-        return [{
-            'quote_id': row[0],
-            'quote': row[1],
-            'author': row[2],
-            'updated_at': row[3]
-        } for row in cursor.fetchall()]
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT qi.quote_id, datetime(qi.updated_at, 'unixepoch'), a.quote, a.author
+                FROM quote_interactions qi
+                LEFT JOIN ai_quotes a ON a.id = qi.quote_id
+                WHERE qi.user_id = ? AND qi.flags & {FAVORITED}
+                ORDER BY qi.updated_at DESC
+                LIMIT ? OFFSET ?
+                """,
+                (user_id, limit, offset)
+            )
+            rows = cursor.fetchall()
+        return _with_quote_text(rows, resolve)
     except Exception as e:
         logger.error(f"Error getting favorite quotes: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
-def get_quotes_by_interaction(user_id: int, interaction_type: str, limit: int = 50) -> List[dict]:
+def get_quotes_by_interaction(user_id: int, interaction_type: str, limit: int = 50,
+                              resolve: Optional[Callable[[int], Optional[Mapping[str, Any]]]] = None) -> List[dict]:
     """
     Get a user's liked or disliked quotes.
     
+    Interactions store only IDs: AI-generated quotes (negative IDs) are
+    joined from ai_quotes, corpus quotes are looked up with *resolve*.
+    
     Args:
         user_id: The Telegram user ID
         interaction_type: Either 'liked' or 'disliked'
         limit: Maximum number of quotes to return
+        resolve: Maps a corpus quote ID to its quote (with 'quote' and
+            'author' keys) or None, e.g. the in-memory store's get()
         
     Returns:
         List of dictionaries containing quote details
@@ -267,33 +448,26 @@ def get_quotes_by_interaction(user_id: int, interaction_type: str, limit: int =
     if interaction_type not in ['liked', 'disliked']:
         raise ValueError("interaction_type must be 'liked' or 'disliked'")
         
-    column = 'is_liked' if interaction_type == 'liked' else 'is_disliked'
+    bit = LIKED if interaction_type == 'liked' else DISLIKED
+    interaction_buffer.flush()  # buffered taps first, so the list is current
     
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"""
-            SELECT quote_id, quote_text, quote_author, updated_at
-            FROM quote_interactions
-            WHERE user_id = ? AND {column} = 1
-            ORDER BY updated_at DESC
-            LIMIT ?
-            """,
-            (user_id, limit)
-        )
-        
-        return [{
-            'quote_id': row[0],
-            'quote': row[1] or 'Quote text not available',
-            'author': row[2] or 'Unknown',
-            'updated_at': row[3]
-        } for row in cursor.fetchall()]
-        
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT qi.quote_id, datetime(qi.updated_at, 'unixepoch'), a.quote, a.author
+                FROM quote_interactions qi
+                LEFT JOIN ai_quotes a ON a.id = qi.quote_id
+                WHERE qi.user_id = ? AND qi.flags & {bit}
+                ORDER BY qi.updated_at DESC
+                LIMIT ?
+                """,
+                (user_id, limit)
+            )
+            rows = cursor.fetchall()
+        return _with_quote_text(rows, resolve)
+            
     except Exception as e:
         logger.error(f"Error getting {interaction_type} quotes: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        return []
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""Content keys shared by the quote importer, the AI quote table and migrations."""
+import hashlib
+
+def content_hash(quote: str, author: str) -> int:
+    """Stable signed 64-bit key of a quote's normalized text and author."""
+    key = " ".join(quote.casefold().split()) + "\x1f" + " ".join((author or "").casefold().split())
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
@@ -0,0 +1,490 @@
+"""Versioned schema migrations for the Quote Bot database.
+
+Each migration runs once, in order, inside its own transaction, and is
+recorded in the ``schema_version`` table. Databases created by older code
+(including hand-patched ones) are brought to the same schema as new ones:
+steps that add columns check for them first.
+
+HOT_QUERIES lists the queries on the request path, kept in step with the
+repositories; check_query_plans() reports any that SQLite would answer
+with a table scan or a temporary sort.
+"""
+import logging
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+from .models import LIKED, DISLIKED, FAVORITED, UNIX_NOW
+from .keys import content_hash
+
+logger = logging.getLogger(__name__)
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+
+def _add_column(cursor: sqlite3.Cursor, table: str, column: str, declaration: str) -> None:
+    """ALTER TABLE ... ADD COLUMN, unless the column is already there."""
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _create_tables(cursor: sqlite3.Cursor) -> None:
+    """1: the base tables."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        is_paused INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_preferences (
+        user_id INTEGER PRIMARY KEY,
+        topics TEXT,
+        tone TEXT,
+        quote_length TEXT,
+        author_pref TEXT,
+        delivery_time TEXT,
+        weekend_toggle INTEGER DEFAULT 1,
+        context_line INTEGER DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS quote_interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        quote_id INTEGER,
+        quote_text TEXT,
+        quote_author TEXT,
+        is_liked INTEGER DEFAULT 0,
+        is_disliked INTEGER DEFAULT 0,
+        is_favorited INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, quote_id),
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )''')
+    # Per-user no-repeat rotation state (see bot.services.rotation)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS quote_rotations (
+        user_id INTEGER PRIMARY KEY,
+        seed INTEGER NOT NULL,
+        signature INTEGER NOT NULL,
+        corpus_version INTEGER NOT NULL,
+        cursor INTEGER NOT NULL DEFAULT 0
+    )''')
+    # Version of the quotes table content, changed by every import that
+    # writes to it (see quote_repository.get_corpus_version)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS corpus_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )''')
+
+def _add_missing_columns(cursor: sqlite3.Cursor) -> None:
+    """2: columns the code reads that older schemas lack."""
+    # Daily streaks (user_repository.record_daily_interaction)
+    _add_column(cursor, 'users', 'streak_count', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(cursor, 'users', 'last_streak_date', 'TEXT')
+    _add_column(cursor, 'user_preferences', 'timezone', 'TEXT')
+    # Tables from before interactions stored their quote and update time
+    # (ADD COLUMN can't default to CURRENT_TIMESTAMP; old rows stay NULL)
+    _add_column(cursor, 'quote_interactions', 'quote_text', 'TEXT')
+    _add_column(cursor, 'quote_interactions', 'quote_author', 'TEXT')
+    _add_column(cursor, 'quote_interactions', 'updated_at', 'TIMESTAMP')
+
+def _create_query_indexes(cursor: sqlite3.Cursor) -> None:
+    """3: indexes for the hot queries (see HOT_QUERIES)."""
+    # Dislike sets: only disliked rows, quote_id included so the
+    # lookup never touches the table
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_quote_interactions_disliked
+    ON quote_interactions(user_id, quote_id) WHERE is_disliked = 1
+    ''')
+    # /liked and /disliked: newest first, answered from the index alone
+    for flag, name in (('is_liked', 'liked'), ('is_disliked', 'disliked')):
+        cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_quote_interactions_{name}_listing
+        ON quote_interactions(user_id, updated_at, quote_id, quote_text, quote_author)
+        WHERE {flag} = 1
+        ''')
+    # Daily broadcast: active users
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_is_paused ON users(is_paused)")
+    # A prefix of the UNIQUE(user_id, quote_id) index, so pure overhead
+    cursor.execute("DROP INDEX IF EXISTS idx_quote_interactions_user")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_quote_interactions_quote
+    ON quote_interactions(quote_id)
+    ''')
+
+def _create_quote_stats(cursor: sqlite3.Cursor) -> None:
+    """4: per-quote counters kept in step with quote_interactions by triggers."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS quote_stats (
+        quote_id INTEGER PRIMARY KEY,
+        likes INTEGER NOT NULL DEFAULT 0,
+        dislikes INTEGER NOT NULL DEFAULT 0,
+        favorites INTEGER NOT NULL DEFAULT 0,
+        deliveries INTEGER NOT NULL DEFAULT 0
+    )''')
+    _create_quote_stats_triggers(cursor)
+    # Interactions recorded so far (deliveries were never stored: they start at 0)
+    cursor.execute('''
+    INSERT OR IGNORE INTO quote_stats (quote_id, likes, dislikes, favorites)
+    SELECT quote_id, SUM(is_liked != 0), SUM(is_disliked != 0), SUM(is_favorited != 0)
+    FROM quote_interactions
+    GROUP BY quote_id
+    ''')
+
+def _create_quote_stats_triggers(cursor: sqlite3.Cursor) -> None:
+    """The quote_interactions triggers that keep quote_stats counts current."""
+    # Every write to a flag adds its delta; upserts that change nothing
+    # (e.g. a repeated tap) are skipped by the WHEN clause
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS quote_stats_interaction_insert
+    AFTER INSERT ON quote_interactions BEGIN
+        INSERT INTO quote_stats (quote_id, likes, dislikes, favorites)
+        VALUES (new.quote_id, new.is_liked != 0, new.is_disliked != 0, new.is_favorited != 0)
+        ON CONFLICT(quote_id) DO UPDATE SET
+            likes = likes + excluded.likes,
+            dislikes = dislikes + excluded.dislikes,
+            favorites = favorites + excluded.favorites;
+    END''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS quote_stats_interaction_update
+    AFTER UPDATE OF quote_id, is_liked, is_disliked, is_favorited ON quote_interactions
+    WHEN old.quote_id IS NOT new.quote_id
+      OR (old.is_liked != 0) != (new.is_liked != 0)
+      OR (old.is_disliked != 0) != (new.is_disliked != 0)
+      OR (old.is_favorited != 0) != (new.is_favorited != 0)
+    BEGIN
+        UPDATE quote_stats SET
+            likes = likes - (old.is_liked != 0),
+            dislikes = dislikes - (old.is_disliked != 0),
+            favorites = favorites - (old.is_favorited != 0)
+        WHERE quote_id = old.quote_id;
+        INSERT INTO quote_stats (quote_id, likes, dislikes, favorites)
+        VALUES (new.quote_id, new.is_liked != 0, new.is_disliked != 0, new.is_favorited != 0)
+        ON CONFLICT(quote_id) DO UPDATE SET
+            likes = likes + excluded.likes,
+            dislikes = dislikes + excluded.dislikes,
+            favorites = favorites + excluded.favorites;
+    END''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS quote_stats_interaction_delete
+    AFTER DELETE ON quote_interactions BEGIN
+        UPDATE quote_stats SET
+            likes = likes - (old.is_liked != 0),
+            dislikes = dislikes - (old.is_disliked != 0),
+            favorites = favorites - (old.is_favorited != 0)
+        WHERE quote_id = old.quote_id;
+    END''')
+
+def _split_legacy_author(author: str) -> Tuple[str, str]:
+    """Split an author parsed from an old message ("Name\\n\\n💡 Takeaway: …") into (author, takeaway)."""
+    author, _, rest = (author or "").partition("\n\n")
+    _, _, takeaway = rest.partition("Takeaway:")
+    return author.strip(), takeaway.strip()
+
+def _normalize_interactions(cursor: sqlite3.Cursor) -> None:
+    """5: move quote text out of quote_interactions; AI quotes get their own table."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ai_quotes (
+        id INTEGER PRIMARY KEY,             -- negative, apart from corpus ids
+        content_hash INTEGER NOT NULL UNIQUE,
+        quote TEXT NOT NULL,
+        author TEXT,
+        takeaway TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    
+    # The stored ids can't be trusted: corpus ids drifted between imports, so
+    # an interaction's quote_id may now name a different quote or none at all.
+    # Its text is what the user saw. Every row with text is relinked by
+    # content hash: to the corpus quote with that text, or else to an
+    # ai_quotes row (reusing the negative id where it is free). The same text
+    # stored twice gets one ai_quotes row.
+    corpus: Dict[int, int] = {}
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quotes'").fetchone():
+        for quote_id, text, author in cursor.execute("SELECT id, quote, author FROM quotes ORDER BY id DESC").fetchall():
+            corpus[content_hash(text, author)] = quote_id
+    cursor.execute("CREATE TEMP TABLE interaction_relink (row_id INTEGER PRIMARY KEY, target INTEGER NOT NULL)")
+    rows = cursor.execute('''
+        SELECT id, quote_id, quote_text, quote_author
+        FROM quote_interactions
+        WHERE quote_text IS NOT NULL
+        ORDER BY id
+    ''').fetchall()
+    taken = {quote_id for (quote_id,) in cursor.execute("SELECT id FROM ai_quotes").fetchall()}
+    seen: Dict[int, int] = {}
+    for row_id, quote_id, text, author in rows:
+        author, takeaway = _split_legacy_author(author)
+        key = content_hash(text, author)
+        target = corpus.get(key) or seen.get(key)
+        if target is None:
+            target = quote_id if quote_id < 0 and quote_id not in taken else min(taken | {0}) - 1
+            taken.add(target)
+            seen[key] = target
+            cursor.execute(
+                "INSERT INTO ai_quotes (id, content_hash, quote, author, takeaway) VALUES (?, ?, ?, ?, ?)",
+                (target, key, text, author or None, takeaway or None)
+            )
+        cursor.execute("INSERT INTO interaction_relink VALUES (?, ?)", (row_id, target))
+    
+    # Rebuild without the text columns, one row per (user, quote). Where
+    # relinking merges rows, the flags come from the most recently updated one
+    cursor.execute('''
+    CREATE TABLE quote_interactions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        quote_id INTEGER,
+        is_liked INTEGER DEFAULT 0,
+        is_disliked INTEGER DEFAULT 0,
+        is_favorited INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, quote_id),
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )''')
+    cursor.execute('''
+    INSERT INTO quote_interactions_new
+        (user_id, quote_id, is_liked, is_disliked, is_favorited, created_at, updated_at)
+    SELECT user_id, target, is_liked, is_disliked, is_favorited, first_created,
+           COALESCE(updated_at, created_at)
+    FROM (
+        SELECT *,
+               ROW_NUMBER() OVER (PARTITION BY user_id, target
+                                  ORDER BY COALESCE(updated_at, created_at) DESC, id DESC) AS recency,
+               MIN(created_at) OVER (PARTITION BY user_id, target) AS first_created
+        FROM (
+            SELECT qi.*, COALESCE(r.target, qi.quote_id) AS target
+            FROM quote_interactions qi
+            LEFT JOIN temp.interaction_relink r ON r.row_id = qi.id
+        )
+    )
+    WHERE recency = 1
+    ''')
+    cursor.execute("DROP TABLE quote_interactions")
+    cursor.execute("ALTER TABLE quote_interactions_new RENAME TO quote_interactions")
+    
+    # Indexes and triggers went with the old table
+    cursor.execute('''
+    CREATE INDEX idx_quote_interactions_disliked
+    ON quote_interactions(user_id, quote_id) WHERE is_disliked = 1
+    ''')
+    for flag, name in (('is_liked', 'liked'), ('is_disliked', 'disliked')):
+        cursor.execute(f'''
+        CREATE INDEX idx_quote_interactions_{name}_listing
+        ON quote_interactions(user_id, updated_at, quote_id) WHERE {flag} = 1
+        ''')
+    cursor.execute("CREATE INDEX idx_quote_interactions_quote ON quote_interactions(quote_id)")
+    _create_quote_stats_triggers(cursor)
+    
+    # Relinked and merged rows changed the counts of the quotes involved
+    cursor.execute("UPDATE quote_stats SET likes = 0, dislikes = 0, favorites = 0")
+    cursor.execute('''
+    INSERT INTO quote_stats (quote_id, likes, dislikes, favorites)
+    SELECT quote_id, SUM(is_liked != 0), SUM(is_disliked != 0), SUM(is_favorited != 0)
+    FROM quote_interactions
+    WHERE true
+    GROUP BY quote_id
+    ON CONFLICT(quote_id) DO UPDATE SET
+        likes = excluded.likes,
+        dislikes = excluded.dislikes,
+        favorites = excluded.favorites
+    ''')
+    cursor.execute("DROP TABLE temp.interaction_relink")
+
+def _create_flag_stats_triggers(cursor: sqlite3.Cursor) -> None:
+    """The quote_stats triggers for the bit-packed quote_interactions (see migration 6)."""
+    counts = (f"flags & {LIKED} != 0", f"flags & {DISLIKED} != 0", f"flags & {FAVORITED} != 0")
+    new = ", ".join(f"new.{count}" for count in counts)
+    subtract_old = '''
+        UPDATE quote_stats SET
+            likes = likes - (old.{0}),
+            dislikes = dislikes - (old.{1}),
+            favorites = favorites - (old.{2})
+        WHERE quote_id = old.quote_id;'''.format(*counts)
+    add_new = f'''
+        INSERT INTO quote_stats (quote_id, likes, dislikes, favorites)
+        VALUES (new.quote_id, {new})
+        ON CONFLICT(quote_id) DO UPDATE SET
+            likes = likes + excluded.likes,
+            dislikes = dislikes + excluded.dislikes,
+            favorites = favorites + excluded.favorites;'''
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quote_stats_interaction_insert
+    AFTER INSERT ON quote_interactions BEGIN{add_new}
+    END''')
+    # Writes that leave the flags alone (e.g. a repeated tap) are skipped
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quote_stats_interaction_update
+    AFTER UPDATE OF quote_id, flags ON quote_interactions
+    WHEN old.quote_id IS NOT new.quote_id OR old.flags != new.flags
+    BEGIN{subtract_old}{add_new}
+    END''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS quote_stats_interaction_delete
+    AFTER DELETE ON quote_interactions BEGIN{subtract_old}
+    END''')
+
+def _pack_interactions(cursor: sqlite3.Cursor) -> None:
+    """6: quote_interactions as a WITHOUT ROWID table with bit-packed flags."""
+    # The (user_id, quote_id) key is the table itself, so a write updates one
+    # B-tree instead of the rowid table plus the UNIQUE index. updated_at is
+    # Unix seconds; created_at was never read and is dropped.
+    cursor.execute('''
+    CREATE TABLE quote_interactions_packed (
+        user_id INTEGER NOT NULL,
+        quote_id INTEGER NOT NULL,
+        flags INTEGER NOT NULL DEFAULT 0,   -- LIKED | DISLIKED | FAVORITED bits
+        updated_at INTEGER NOT NULL,
+        PRIMARY KEY (user_id, quote_id)
+    ) WITHOUT ROWID''')
+    cursor.execute(f'''
+    INSERT INTO quote_interactions_packed (user_id, quote_id, flags, updated_at)
+    SELECT user_id, quote_id,
+           (COALESCE(is_liked, 0) != 0) * {LIKED}
+           | (COALESCE(is_disliked, 0) != 0) * {DISLIKED}
+           | (COALESCE(is_favorited, 0) != 0) * {FAVORITED},
+           COALESCE(CAST(strftime('%s', COALESCE(updated_at, created_at)) AS INTEGER), {UNIX_NOW})
+    FROM quote_interactions
+    WHERE user_id IS NOT NULL AND quote_id IS NOT NULL
+    ORDER BY user_id, quote_id
+    ''')
+    cursor.execute("DROP TABLE quote_interactions")
+    cursor.execute("ALTER TABLE quote_interactions_packed RENAME TO quote_interactions")
+    
+    # Listings, newest first. The disliked one also answers the dislike
+    # sets (it holds quote_id as part of the key), so disliked rows are
+    # indexed once; no index by quote_id alone, as quote_stats has the totals
+    for bit, name in ((LIKED, 'liked'), (DISLIKED, 'disliked')):
+        cursor.execute(f'''
+        CREATE INDEX idx_quote_interactions_{name}_listing
+        ON quote_interactions(user_id, updated_at) WHERE flags & {bit}
+        ''')
+    _create_flag_stats_triggers(cursor)
+
+# (version, description, step); append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "base tables", _create_tables),
+    (2, "streak, timezone and interaction columns", _add_missing_columns),
+    (3, "indexes for the hot queries", _create_query_indexes),
+    (4, "quote_stats counters", _create_quote_stats),
+    (5, "interactions without quote text, ai_quotes table", _normalize_interactions),
+    (6, "bit-packed WITHOUT ROWID quote_interactions", _pack_interactions),
+]
+
+def schema_version(cursor: sqlite3.Cursor) -> int:
+    """Return the highest applied migration (0 for a new database)."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    return cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Apply every migration newer than the database's schema version.
+
+    Args:
+        conn: Connection to migrate; must not be inside a transaction
+
+    Returns:
+        int: Number of migrations applied
+    """
+    cursor = conn.cursor()
+    current = schema_version(cursor)
+    applied = 0
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor.execute("BEGIN")
+        try:
+            step(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {version} ({description}) failed", exc_info=True)
+            raise
+        logger.info(f"Applied migration {version}: {description}")
+        applied += 1
+    return applied
+
+# Query name → (SQL, sample parameters)
+HOT_QUERIES: Dict[str, Tuple[str, tuple]] = {
+    'disliked quote ids': (
+        f"SELECT quote_id FROM quote_interactions WHERE user_id = ? AND flags & {DISLIKED}",
+        (1,)
+    ),
+    'liked listing': (
+        f"""
+        SELECT qi.quote_id, datetime(qi.updated_at, 'unixepoch'), a.quote, a.author
+        FROM quote_interactions qi
+        LEFT JOIN ai_quotes a ON a.id = qi.quote_id
+        WHERE qi.user_id = ? AND qi.flags & {LIKED}
+        ORDER BY qi.updated_at DESC
+        LIMIT ?
+        """,
+        (1, 50)
+    ),
+    'disliked listing': (
+        f"""
+        SELECT qi.quote_id, datetime(qi.updated_at, 'unixepoch'), a.quote, a.author
+        FROM quote_interactions qi
+        LEFT JOIN ai_quotes a ON a.id = qi.quote_id
+        WHERE qi.user_id = ? AND qi.flags & {DISLIKED}
+        ORDER BY qi.updated_at DESC
+        LIMIT ?
+        """,
+        (1, 50)
+    ),
+    'interaction': (
+        "SELECT flags FROM quote_interactions WHERE user_id = ? AND quote_id = ?",
+        (1, 1)
+    ),
+    'active users': ("SELECT user_id FROM users WHERE is_paused = 0", ()),
+    'user': (
+        "SELECT user_id, username, first_name, is_paused, created_at FROM users WHERE user_id = ?",
+        (1,)
+    ),
+    'preferences': (
+        """
+        SELECT topics, tone, quote_length, author_pref, delivery_time,
+               weekend_toggle, context_line
+        FROM user_preferences
+        WHERE user_id = ?
+        """,
+        (1,)
+    ),
+    'quote stats': (
+        "SELECT likes, dislikes, favorites, deliveries FROM quote_stats WHERE quote_id = ?",
+        (1,)
+    ),
+    'rotation': (
+        "SELECT seed, signature, corpus_version, cursor FROM quote_rotations WHERE user_id = ?",
+        (1,)
+    ),
+}
+
+def check_query_plans(conn: sqlite3.Connection) -> List[str]:
+    """
+    EXPLAIN every hot query and report plans that would not scale.
+
+    Returns:
+        One message per query that scans a table or index, or sorts in a
+        temp B-tree; empty if all of them are index searches
+    """
+    problems = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[3]
+            # a full pass over an index ("SCAN t USING INDEX") counts too
+            if detail.startswith("SCAN ") or "TEMP B-TREE" in detail:
+                problems.append(f"{name}: {detail}")
+    return problems
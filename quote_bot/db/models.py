@@ -1,7 +1,36 @@
 """Database models for the Quote Bot application."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+
+INTERACTION_FLAGS = ('is_liked', 'is_disliked', 'is_favorited')
+
+# quote_interactions stores the flags as bits of one integer
+LIKED, DISLIKED, FAVORITED = 1, 2, 4
+FLAG_BITS = dict(zip(INTERACTION_FLAGS, (LIKED, DISLIKED, FAVORITED)))
+# ...and updated_at as Unix seconds
+UNIX_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# Delivery timezone of users who haven't set one
+DEFAULT_TIMEZONE = 'Asia/Bangkok'
+
+def flag_masks(updates: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Turn flag values into bit masks.
+    
+    Args:
+        updates: Flag name → truthy/falsy value (see INTERACTION_FLAGS)
+        
+    Returns:
+        (bits to set, bits the update touches); a row's new flags are
+        ``(flags & ~touched) | set``
+    """
+    set_bits = touched = 0
+    for flag, value in updates.items():
+        touched |= FLAG_BITS[flag]
+        if value:
+            set_bits |= FLAG_BITS[flag]
+    return set_bits, touched
 
 @dataclass
 class User:
@@ -50,6 +79,28 @@ class UserPreferences:
             context_line=bool(data.get('context_line', False))
         )
 
+@dataclass
+class UserProfile:
+    """A user's row and preferences in one object (see profile_cache).
+
+    Cached profiles are shared, so treat them as read-only; as_prefs()
+    returns a copy that callers may change.
+    """
+    user_id: int
+    user: Optional[User] = None
+    preferences: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_paused(self) -> bool:
+        return bool(self.user and self.user.is_paused)
+
+    def as_prefs(self) -> Dict[str, Any]:
+        """The preferences dict (empty before onboarding) plus ``is_active``."""
+        prefs = dict(self.preferences)
+        prefs['topics'] = list(prefs.get('topics') or [])
+        prefs['is_active'] = not self.is_paused
+        return prefs
+
 @dataclass
 class QuoteInteraction:
     """Quote interaction model for tracking user interactions with quotes."""
@@ -68,3 +119,27 @@ class QuoteInteraction:
             'is_disliked': self.is_disliked,
             'is_favorited': self.is_favorited
         }
+
+@dataclass
+class RotationState:
+    """A user's position in their no-repeat quote rotation.
+
+    The rotation is a permutation of the quotes matching the user's filters,
+    derived from ``seed``; only the seed and ``cursor`` need to be stored.
+    ``signature`` and ``corpus_version`` identify the filters and corpus
+    the permutation was built for, so it is regenerated when either changes.
+    """
+    user_id: int
+    seed: int
+    signature: int
+    corpus_version: int
+    cursor: int = 0
+
+@dataclass
+class QuoteStats:
+    """Engagement counters of one quote (see the quote_stats table)."""
+    quote_id: int
+    likes: int = 0
+    dislikes: int = 0
+    favorites: int = 0
+    deliveries: int = 0
@@ -1,11 +1,27 @@
 """User preferences database operations for the Quote Bot application."""
 import logging
-from typing import Dict, Any, Optional, List
-from .database import get_connection
-from .models import UserPreferences
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Sequence, Tuple
+from .database import connection, chunked
+from .cache import profile_cache
+from .models import UserPreferences, DEFAULT_TIMEZONE
 
 logger = logging.getLogger(__name__)
 
+PREFS_COLUMNS = "topics, tone, quote_length, author_pref, delivery_time, weekend_toggle, context_line, timezone"
+
+def _prefs_from_row(row: Sequence[Any]) -> Dict[str, Any]:
+    """Map a row of PREFS_COLUMNS to the preferences dict."""
+    return {
+        'topics': row[0].split(',') if row[0] else [],
+        'tone': row[1],
+        'quote_length': row[2],
+        'author_pref': row[3],
+        'delivery_time': row[4],
+        'weekend_toggle': bool(row[5]),
+        'context_line': bool(row[6]),
+        'timezone': row[7] or DEFAULT_TIMEZONE
+    }
+
 def save_user_preferences(user_id: int, preferences: Dict[str, Any]) -> None:
     """
     Save or update user preferences in the database.
@@ -20,88 +36,82 @@ def save_user_preferences(user_id: int, preferences: Dict[str, Any]) -> None:
             - delivery_time: Preferred delivery time (HH:MM format)
             - weekend_toggle: Boolean for weekend delivery
             - context_line: Boolean for including context line
+            - timezone: IANA timezone name (optional; a stored one is
+              kept if omitted)
     """
     if not preferences:
         return
         
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Convert topics list to comma-separated string if it's a list
-        topics = preferences.get('topics', [])
-        if isinstance(topics, list):
-            topics = ','.join(topics)
-            
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_preferences 
-            (user_id, topics, tone, quote_length, author_pref, delivery_time, weekend_toggle, context_line)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user_id,
-            topics if topics else None,
-            preferences.get('tone'),
-            preferences.get('quote_length'),
-            preferences.get('author_pref'),
-            preferences.get('delivery_time', '07:00'),
-            1 if preferences.get('weekend_toggle', True) else 0,
-            1 if preferences.get('context_line', False) else 0
-        ))
-        conn.commit()
-        logger.info(f"Saved preferences for user {user_id}")
-        
-        # Schedule the user's daily quote job with the updated preferences
-        try:
-            from bot.services.scheduler import scheduler_service
-            from bot.tasks.quote_tasks import send_quote_to_user
-            
-            # Parse delivery time to handle test options like "21:35 (Test)"
-            delivery_time = preferences.get('delivery_time', '07:00')
-            if '(' in delivery_time:
-                delivery_time = delivery_time.split('(')[0].strip()
-            
-            logger.info(f"Attempting to schedule user {user_id} for delivery at {delivery_time}")
+        with connection() as conn:
+            cursor = conn.cursor()
             
-            # Create preferences dict for scheduler
-            scheduler_prefs = {
-                'delivery_time': delivery_time,
-                'weekend_toggle': preferences.get('weekend_toggle', True),
-                'timezone': 'Asia/Bangkok'  # Use the timezone from .env
-            }
+            # Convert topics list to comma-separated string if it's a list
+            topics = preferences.get('topics', [])
+            if isinstance(topics, list):
+                topics = ','.join(topics)
+                
+            cursor.execute('''
+                INSERT INTO user_preferences 
+                (user_id, topics, tone, quote_length, author_pref, delivery_time, weekend_toggle, context_line, timezone)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    topics = excluded.topics,
+                    tone = excluded.tone,
+                    quote_length = excluded.quote_length,
+                    author_pref = excluded.author_pref,
+                    delivery_time = excluded.delivery_time,
+                    weekend_toggle = excluded.weekend_toggle,
+                    context_line = excluded.context_line,
+                    timezone = COALESCE(excluded.timezone, timezone)
+                RETURNING timezone
+            ''', (
+                user_id,
+                topics if topics else None,
+                preferences.get('tone'),
+                preferences.get('quote_length'),
+                preferences.get('author_pref'),
+                preferences.get('delivery_time', '07:00'),
+                1 if preferences.get('weekend_toggle', True) else 0,
+                1 if preferences.get('context_line', False) else 0,
+                preferences.get('timezone')
+            ))
+            timezone = cursor.fetchone()[0] or DEFAULT_TIMEZONE
+            conn.commit()
+            profile_cache.invalidate(user_id)
+            logger.info(f"Saved preferences for user {user_id}")
             
-            # Create a simple wrapper function
-            async def send_quote_wrapper(uid: int):
-                try:
-                    # Get bot instance from scheduler service
-                    if hasattr(scheduler_service, '_bot_instance') and scheduler_service._bot_instance:
-                        logger.info(f"Sending quote to user {uid}")
-                        await send_quote_to_user(scheduler_service._bot_instance, uid)
-                    else:
-                        logger.error(f"Bot instance not available for user {uid}")
-                except Exception as e:
-                    logger.error(f"Error sending quote to user {uid}: {e}")
-            
-            # Schedule the user's job
-            scheduler_service.schedule_user_daily_quote(
-                user_id, 
-                scheduler_prefs, 
-                send_quote_wrapper
-            )
-            logger.info(f"Successfully scheduled daily quote for user {user_id} at {delivery_time}")
+            # Schedule the user's daily quote job with the updated preferences
+            try:
+                from bot.services.scheduler import scheduler_service
+                
+                # Parse delivery time to handle test options like "21:35 (Test)"
+                delivery_time = preferences.get('delivery_time', '07:00')
+                if '(' in delivery_time:
+                    delivery_time = delivery_time.split('(')[0].strip()
+                
+                logger.info(f"Attempting to schedule user {user_id} for delivery at {delivery_time}")
+                
+                # Create preferences dict for scheduler
+                scheduler_prefs = {
+                    'delivery_time': delivery_time,
+                    'weekend_toggle': preferences.get('weekend_toggle', True),
+                    'timezone': timezone
+                }
+                
+                # Add the user to their delivery slot
+                scheduler_service.schedule_user_daily_quote(user_id, scheduler_prefs)
+                logger.info(f"Successfully scheduled daily quote for user {user_id} at {delivery_time}")
+                
+            except Exception as scheduler_error:
+                logger.error(f"Error scheduling daily quote for user {user_id}: {scheduler_error}")
+                import traceback
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                # Don't raise here - preferences were saved successfully
             
-        except Exception as scheduler_error:
-            logger.error(f"Error scheduling daily quote for user {user_id}: {scheduler_error}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            # Don't raise here - preferences were saved successfully
-        
     except Exception as e:
         logger.error(f"Error saving preferences for user {user_id}: {e}")
         raise
-    finally:
-        if conn:
-            conn.close()
 
 def get_user_preferences(user_id: int) -> Dict[str, Any]:
     """
@@ -113,37 +123,54 @@ def get_user_preferences(user_id: int) -> Dict[str, Any]:
     Returns:
         Dictionary containing user preferences or empty dict if not found
     """
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT topics, tone, quote_length, author_pref, delivery_time, 
-                   weekend_toggle, context_line
-            FROM user_preferences
-            WHERE user_id = ?
-            """,
-            (user_id,)
-        )
-        result = cursor.fetchone()
-        if result:
-            return {
-                'topics': result[0].split(',') if result[0] else [],
-                'tone': result[1],
-                'quote_length': result[2],
-                'author_pref': result[3],
-                'delivery_time': result[4],
-                'weekend_toggle': bool(result[5]),
-                'context_line': bool(result[6])
-            }
-        return {}
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT {PREFS_COLUMNS}
+                FROM user_preferences
+                WHERE user_id = ?
+                """,
+                (user_id,)
+            )
+            result = cursor.fetchone()
+            return _prefs_from_row(result) if result else {}
     except Exception as e:
         logger.error(f"Error getting preferences for user {user_id}: {e}")
         return {}
-    finally:
-        if conn:
-            conn.close()
+
+def get_preferences_for_users(user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Get preferences for many users with one query per chunk of IDs.
+    
+    Args:
+        user_ids: The Telegram user IDs
+        
+    Returns:
+        Dictionary mapping user ID to the same dict get_user_preferences
+        returns; users without preferences are absent
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(user_ids):
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"""
+                    SELECT user_id, {PREFS_COLUMNS}
+                    FROM user_preferences
+                    WHERE user_id IN ({placeholders})
+                    """,
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    results[row[0]] = _prefs_from_row(row[1:])
+            return results
+    except Exception as e:
+        logger.error(f"Error getting preferences for {len(results)}+ users: {e}")
+        return results
 
 def get_user_delivery_time(user_id: int) -> str:
     """
@@ -170,61 +197,71 @@ def get_users_by_delivery_time(hour: int, minute: int) -> List[int]:
         List of user IDs with matching delivery time
     """
     time_str = f"{hour:02d}:{minute:02d}"
-    conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT user_id FROM user_preferences 
-            WHERE delivery_time = ?
-            """,
-            (time_str,)
-        )
-        return [row[0] for row in cursor.fetchall()]
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT user_id FROM user_preferences 
+                WHERE delivery_time = ?
+                """,
+                (time_str,)
+            )
+            return [row[0] for row in cursor.fetchall()]
     except Exception as e:
         logger.error(f"Error getting users for delivery time {time_str}: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_all_users_with_preferences() -> List[tuple]:
     """
     Get all users who have preferences set up.
     
+    Loads everything into memory; prefer iter_users_with_preferences()
+    when the user count may be large.
+    
     Returns:
         List of tuples (user_id, preferences_dict)
     """
-    conn = None
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT user_id, topics, tone, quote_length, author_pref, delivery_time, 
-                   weekend_toggle, context_line
-            FROM user_preferences
-            """
-        )
-        results = []
-        for row in cursor.fetchall():
-            user_id = row[0]
-            prefs = {
-                'topics': row[1].split(',') if row[1] else [],
-                'tone': row[2],
-                'quote_length': row[3],
-                'author_pref': row[4],
-                'delivery_time': row[5],
-                'weekend_toggle': bool(row[6]),
-                'context_line': bool(row[7]),
-                'timezone': 'Asia/Bangkok'  # Default timezone
-            }
-            results.append((user_id, prefs))
-        return results
-    except Exception as e:
-        logger.error(f"Error getting all users with preferences: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
+    return [pair for chunk in iter_users_with_preferences() for pair in chunk]
+
+def iter_users_with_preferences(chunk_size: int = 10_000) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """
+    Stream all users who have preferences set up, in chunks.
+    
+    Each chunk is one keyset-paginated query (``user_id > last``), so only
+    one chunk is in memory at a time and no read transaction stays open
+    between chunks.
+    
+    Args:
+        chunk_size: Number of users per chunk
+        
+    Yields:
+        Lists of up to chunk_size (user_id, preferences_dict) tuples, in
+        ascending user ID order
+    """
+    last_user_id = None
+    while True:
+        # The first page has no lower bound (an OR here would defeat the index)
+        after = "" if last_user_id is None else "WHERE user_id > ?"
+        params = (chunk_size,) if last_user_id is None else (last_user_id, chunk_size)
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT user_id, {PREFS_COLUMNS}
+                    FROM user_preferences
+                    {after}
+                    ORDER BY user_id
+                    LIMIT ?
+                    """,
+                    params
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error getting users with preferences after {last_user_id}: {e}")
+            return
+        if not rows:
+            return
+        yield [(row[0], _prefs_from_row(row[1:])) for row in rows]
+        last_user_id = rows[-1][0]
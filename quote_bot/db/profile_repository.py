@@ -0,0 +1,31 @@
+"""User profile lookups for the Quote Bot application."""
+import logging
+from .cache import profile_cache
+from .models import UserProfile
+from .preference_repository import get_user_preferences
+from .user_repository import get_user
+
+logger = logging.getLogger(__name__)
+
+def get_user_profile(user_id: int) -> UserProfile:
+    """
+    Get a user's row and preferences as one profile.
+    
+    Served from the profile cache; only a miss queries the database.
+    add_user, update_user_status and save_user_preferences invalidate the
+    user's entry, so a cached profile is never older than the last write
+    made through this process.
+    
+    Args:
+        user_id: The Telegram user ID
+        
+    Returns:
+        The profile; ``user`` is None for unknown users and ``preferences``
+        is empty until they finish onboarding
+    """
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = UserProfile(user_id, get_user(user_id), get_user_preferences(user_id))
+        profile_cache.put(user_id, profile)
+        logger.debug(f"Loaded profile for user {user_id}")
+    return profile
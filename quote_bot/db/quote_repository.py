@@ -1,130 +1,263 @@
 """Quote-related database operations for the Quote Bot application."""
 import logging
-from typing import Dict, Optional, List, Any
-from .database import get_connection
+import re
+import sqlite3
+from typing import Dict, Optional, List, Any, Iterator
+from .cache import quote_cache
+from .database import connection, get_connection
+from .keys import content_hash
 from .models import QuoteInteraction
 
 logger = logging.getLogger(__name__)
 
+RANDOM_DRAW_ATTEMPTS = 3
+
+def _quote_from_row(row) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'quote': row[1],
+        'author': row[2],
+        'topic': row[3],
+        'tone': row[4],
+        'takeaway': row[5],
+        'created_at': row[6]
+    }
+
 def get_quote_by_id(quote_id: int) -> Optional[Dict[str, Any]]:
     """
     Get a quote by its ID.
     
+    Served from the read-through quote cache; misses are loaded from the
+    database and cached.
+    
     Args:
         quote_id: The ID of the quote to retrieve
         
     Returns:
         Dictionary containing quote details or None if not found
     """
-    conn = None
+    cached = quote_cache.get(quote_id)
+    if cached is not None:
+        return cached
+        
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT id, quote, author, topic, tone, takeaway, created_at
-            FROM quotes
-            WHERE id = ?
-            """,
-            (quote_id,)
-        )
-        result = cursor.fetchone()
-        if result:
-            return {
-                'id': result[0],
-                'quote': result[1],
-                'author': result[2],
-                'topic': result[3],
-                'tone': result[4],
-                'takeaway': result[5],
-                'created_at': result[6]
-            }
-        return None
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, quote, author, topic, tone, takeaway, created_at
+                FROM quotes
+                WHERE id = ?
+                """,
+                (quote_id,)
+            )
+            result = cursor.fetchone()
+            if result:
+                quote = _quote_from_row(result)
+                quote_cache.put(quote_id, quote)
+                return quote
+            return None
     except Exception as e:
         logger.error(f"Error getting quote {quote_id}: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
+
+def get_quote_ids() -> List[int]:
+    """
+    Get the IDs of all quotes, in ascending order.
+    
+    Returns:
+        List of quote IDs (empty if the quotes table is missing)
+    """
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM quotes ORDER BY id")
+            return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error getting quote ids: {e}")
+        return []
 
 def get_random_quote() -> Optional[Dict[str, Any]]:
     """
     Get a random quote from the database.
     
+    Draws a random ID from the cached ID list and looks it up through the
+    quote cache, so no query sorts the table.
+    
     Returns:
         Dictionary containing quote details or None if no quotes found
     """
+    for _ in range(RANDOM_DRAW_ATTEMPTS):
+        quote_id = quote_cache.random_id(get_quote_ids)
+        if quote_id is None:
+            return None
+        quote = get_quote_by_id(quote_id)
+        if quote:
+            return quote
+        # The id list is stale (quotes were removed since it was loaded)
+        quote_cache.invalidate()
+    return None
+
+def iter_quotes(chunk_size: int = 10_000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every quote in ascending ID order.
+    
+    Args:
+        chunk_size: Number of rows fetched from SQLite at a time
+        
+    Yields:
+        Dictionaries containing quote details
+    """
     conn = None
     try:
+        # A dedicated connection: the cursor stays open across yields
         conn = get_connection()
         cursor = conn.cursor()
         cursor.execute(
             """
             SELECT id, quote, author, topic, tone, takeaway, created_at
             FROM quotes
-            ORDER BY RANDOM()
-            LIMIT 1
+            ORDER BY id
             """
         )
-        result = cursor.fetchone()
-        if result:
-            return {
-                'id': result[0],
-                'quote': result[1],
-                'author': result[2],
-                'topic': result[3],
-                'tone': result[4],
-                'takeaway': result[5],
-                'created_at': result[6]
-            }
-        return None
-    except Exception as e:
-        logger.error(f"Error getting random quote: {e}")
-        return None
+        while rows := cursor.fetchmany(chunk_size):
+            for row in rows:
+                yield _quote_from_row(row)
     finally:
         if conn:
             conn.close()
 
-def search_quotes(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+def get_corpus_version() -> Optional[int]:
+    """
+    Get the version of the quotes table content.
+    
+    The version changes whenever an import adds or updates quotes.
+    
+    Returns:
+        32-bit version, or None if the database holds no quotes
+    """
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT version FROM corpus_state WHERE id = 1 AND EXISTS (SELECT 1 FROM quotes)"
+            )
+            result = cursor.fetchone()
+            return result[0] if result else None
+    except sqlite3.OperationalError:
+        return None  # no quotes table yet
+    except Exception as e:
+        logger.error(f"Error getting corpus version: {e}")
+        return None
+
+def save_ai_quote(quote: str, author: Optional[str] = None, takeaway: Optional[str] = None) -> int:
+    """
+    Store an AI-generated quote so interactions can refer to it by ID.
+    
+    IDs are negative, so they never collide with corpus quote IDs. The same
+    text and author generated again gets the ID it was first stored under.
+    
+    Args:
+        quote: The quote text
+        author: The attributed author
+        takeaway: The one-line takeaway, if any
+        
+    Returns:
+        int: The quote's (negative) ID
+    """
+    try:
+        with connection() as conn:
+            row = conn.execute(
+                """
+                INSERT INTO ai_quotes (id, content_hash, quote, author, takeaway)
+                VALUES ((SELECT min(COALESCE(MIN(id), 0), 0) - 1 FROM ai_quotes), ?, ?, ?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET content_hash = content_hash
+                RETURNING id
+                """,
+                (content_hash(quote, author), quote, author, takeaway)
+            ).fetchone()
+            conn.commit()
+            return row[0]
+    except Exception as e:
+        logger.error(f"Error saving AI quote: {e}")
+        raise
+
+def get_ai_quote(quote_id: int) -> Optional[Dict[str, Any]]:
     """
-    Search for quotes containing the given query.
+    Get an AI-generated quote by its (negative) ID.
+    
+    Args:
+        quote_id: The ID returned by save_ai_quote()
+        
+    Returns:
+        Dictionary with id, quote, author, takeaway and created_at, or None
+    """
+    try:
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT id, quote, author, takeaway, created_at FROM ai_quotes WHERE id = ?",
+                (quote_id,)
+            ).fetchone()
+            if not row:
+                return None
+            return dict(zip(('id', 'quote', 'author', 'takeaway', 'created_at'), row))
+    except Exception as e:
+        logger.error(f"Error getting AI quote {quote_id}: {e}")
+        return None
+
+def _match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", query))
+
+def search_quotes(query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Search for quotes matching the given query, most relevant first.
+    
+    Uses the ``quotes_fts`` full-text index, ranked by BM25 with author and
+    topic hits weighted above the quote text. Every word of the query
+    matches as a prefix ("pers" finds "persistence"). Falls back to an
+    unranked LIKE scan if the index is unavailable.
     
     Args:
         query: The search query
         limit: Maximum number of results to return
+        offset: Number of results to skip (for pagination)
         
     Returns:
         List of matching quotes
     """
-    conn = None
+    expression = _match_expression(query)
+    if not expression:
+        return []
+        
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        search_term = f"%{query}%"
-        cursor.execute(
-            """
-            SELECT id, quote, author, topic, tone, takeaway, created_at
-            FROM quotes
-            WHERE quote LIKE ? OR author LIKE ? OR topic LIKE ?
-            LIMIT ?
-            """,
-            (search_term, search_term, search_term, limit)
-        )
-        return [
-            {
-                'id': row[0],
-                'quote': row[1],
-                'author': row[2],
-                'topic': row[3],
-                'tone': row[4],
-                'takeaway': row[5],
-                'created_at': row[6]
-            }
-            for row in cursor.fetchall()
-        ]
+        with connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    SELECT q.id, q.quote, q.author, q.topic, q.tone, q.takeaway, q.created_at
+                    FROM quotes_fts
+                    JOIN quotes q ON q.id = quotes_fts.rowid
+                    WHERE quotes_fts MATCH ?
+                    ORDER BY bm25(quotes_fts, 1.0, 4.0, 2.0, 0.5)
+                    LIMIT ? OFFSET ?
+                    """,
+                    (expression, limit, offset)
+                )
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Full-text search failed, using LIKE: {e}")
+                search_term = f"%{query}%"
+                cursor.execute(
+                    """
+                    SELECT id, quote, author, topic, tone, takeaway, created_at
+                    FROM quotes
+                    WHERE quote LIKE ? OR author LIKE ? OR topic LIKE ?
+                    LIMIT ? OFFSET ?
+                    """,
+                    (search_term, search_term, search_term, limit, offset)
+                )
+            return [_quote_from_row(row) for row in cursor.fetchall()]
     except Exception as e:
         logger.error(f"Error searching quotes: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
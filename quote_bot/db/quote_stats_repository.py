@@ -0,0 +1,138 @@
+"""Per-quote engagement counter operations for the Quote Bot application.
+
+quote_stats holds likes/dislikes/favorites/deliveries per quote. Triggers on
+quote_interactions keep the first three up to date (see migrations.py) and
+deliveries are counted by the interaction buffer, so reading a quote's
+popularity is a primary-key lookup instead of a GROUP BY over every
+interaction. reconcile_quote_stats() recounts from quote_interactions and
+repairs any drift.
+"""
+import logging
+from typing import Dict, List, Tuple
+from .database import connection
+from .interaction_buffer import interaction_buffer
+from .models import LIKED, DISLIKED, FAVORITED, QuoteStats
+
+logger = logging.getLogger(__name__)
+
+# Columns get_top_quote_stats() can rank by
+STATS_COLUMNS = ('likes', 'dislikes', 'favorites', 'deliveries')
+
+Counts = Tuple[int, int, int]
+
+def get_quote_stats(quote_id: int) -> QuoteStats:
+    """
+    Get the counters of one quote.
+    
+    Args:
+        quote_id: The ID of the quote
+        
+    Returns:
+        QuoteStats (all zero if the quote has no interactions or deliveries)
+    """
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT quote_id, likes, dislikes, favorites, deliveries
+                FROM quote_stats
+                WHERE quote_id = ?
+                """,
+                (quote_id,)
+            )
+            row = cursor.fetchone()
+            return QuoteStats(*row) if row else QuoteStats(quote_id)
+    except Exception as e:
+        logger.error(f"Error getting stats for quote {quote_id}: {e}")
+        return QuoteStats(quote_id)
+
+def get_top_quote_stats(by: str = 'likes', limit: int = 10) -> List[QuoteStats]:
+    """
+    Get the quotes with the highest value of one counter.
+    
+    Args:
+        by: One of STATS_COLUMNS
+        limit: Maximum number of quotes to return
+        
+    Returns:
+        List of QuoteStats, highest first
+    """
+    if by not in STATS_COLUMNS:
+        raise ValueError(f"Unknown quote stats column: {by}")
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT quote_id, likes, dislikes, favorites, deliveries
+                FROM quote_stats
+                WHERE {by} > 0
+                ORDER BY {by} DESC, quote_id
+                LIMIT ?
+                """,
+                (limit,)
+            )
+            return [QuoteStats(*row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error getting top quotes by {by}: {e}")
+        return []
+
+def record_quote_delivery(quote_id: int) -> None:
+    """
+    Count one send of a quote; written with the next interaction flush.
+    
+    Args:
+        quote_id: The ID of the quote that was sent
+    """
+    interaction_buffer.record_delivery(quote_id)
+
+def reconcile_quote_stats() -> Dict[int, Tuple[Counts, Counts]]:
+    """
+    Recount likes, dislikes and favorites from quote_interactions and fix quote_stats.
+    
+    Runs in one write transaction, so no interaction is written between
+    the recount and the fix. Deliveries have no other record and are kept.
+    
+    Returns:
+        Dictionary mapping each drifted quote ID to its
+        ((likes, dislikes, favorites) stored, (likes, dislikes, favorites) recounted)
+    """
+    interaction_buffer.flush()
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                f"""
+                SELECT quote_id, SUM(flags & {LIKED} != 0), SUM(flags & {DISLIKED} != 0),
+                       SUM(flags & {FAVORITED} != 0)
+                FROM quote_interactions
+                GROUP BY quote_id
+                """
+            )
+            actual = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+            cursor.execute("SELECT quote_id, likes, dislikes, favorites FROM quote_stats")
+            stored = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+            
+            drift = {}
+            for quote_id in actual.keys() | stored.keys():
+                have, want = stored.get(quote_id, (0, 0, 0)), actual.get(quote_id, (0, 0, 0))
+                if have != want:
+                    drift[quote_id] = (have, want)
+            cursor.executemany(
+                """
+                INSERT INTO quote_stats (quote_id, likes, dislikes, favorites)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(quote_id) DO UPDATE SET
+                    likes = excluded.likes,
+                    dislikes = excluded.dislikes,
+                    favorites = excluded.favorites
+                """,
+                [(quote_id, *want) for quote_id, (_, want) in drift.items()]
+            )
+            conn.commit()
+            return drift
+    except Exception as e:
+        logger.error(f"Error reconciling quote stats: {e}")
+        return {}
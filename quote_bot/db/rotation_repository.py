@@ -0,0 +1,118 @@
+"""Quote rotation state database operations for the Quote Bot application."""
+import logging
+from typing import Dict, Iterable, Optional
+from .database import connection, chunked
+from .models import RotationState
+
+logger = logging.getLogger(__name__)
+
+def get_rotation_state(user_id: int) -> Optional[RotationState]:
+    """
+    Get a user's stored rotation state.
+    
+    Args:
+        user_id: The Telegram user ID
+        
+    Returns:
+        RotationState or None if the user has no rotation yet
+    """
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT user_id, seed, signature, corpus_version, cursor
+                FROM quote_rotations
+                WHERE user_id = ?
+                """,
+                (user_id,)
+            )
+            result = cursor.fetchone()
+            return RotationState(*result) if result else None
+    except Exception as e:
+        logger.error(f"Error getting rotation state for user {user_id}: {e}")
+        return None
+
+def save_rotation_state(state: RotationState) -> None:
+    """
+    Insert or update a user's rotation state.
+    
+    Args:
+        state: The rotation state to persist
+    """
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO quote_rotations (user_id, seed, signature, corpus_version, cursor)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    seed = excluded.seed,
+                    signature = excluded.signature,
+                    corpus_version = excluded.corpus_version,
+                    cursor = excluded.cursor
+                """,
+                (state.user_id, state.seed, state.signature, state.corpus_version, state.cursor)
+            )
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error saving rotation state for user {state.user_id}: {e}")
+
+def get_rotation_states(user_ids: Iterable[int]) -> Dict[int, RotationState]:
+    """
+    Get stored rotation states for many users with one query per chunk.
+    
+    Args:
+        user_ids: The Telegram user IDs
+        
+    Returns:
+        Dictionary mapping user ID to RotationState; users without a
+        rotation are absent
+    """
+    results: Dict[int, RotationState] = {}
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunked(user_ids):
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"""
+                    SELECT user_id, seed, signature, corpus_version, cursor
+                    FROM quote_rotations
+                    WHERE user_id IN ({placeholders})
+                    """,
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    results[row[0]] = RotationState(*row)
+            return results
+    except Exception as e:
+        logger.error(f"Error getting rotation states: {e}")
+        return results
+
+def save_rotation_states(states: Iterable[RotationState]) -> None:
+    """
+    Insert or update many rotation states in a single transaction.
+    
+    Args:
+        states: The rotation states to persist
+    """
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO quote_rotations (user_id, seed, signature, corpus_version, cursor)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    seed = excluded.seed,
+                    signature = excluded.signature,
+                    corpus_version = excluded.corpus_version,
+                    cursor = excluded.cursor
+                """,
+                ((s.user_id, s.seed, s.signature, s.corpus_version, s.cursor) for s in states)
+            )
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error saving rotation states: {e}")
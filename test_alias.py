@@ -0,0 +1,43 @@
+import sys
+import os
+import random
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.services.alias import AliasTable
+
+DRAWS = 200_000
+
+def frequencies(table, draws=DRAWS, seed=7):
+    rng = random.Random(seed)
+    counts = Counter(table.draw(rng) for _ in range(draws))
+    return [counts[i] / draws for i in range(len(table))]
+
+def test_alias_table():
+    print("Testing alias table sampling...")
+    
+    # Draws follow the weights (within a few standard errors)
+    weights = [1, 2, 3, 4, 0, 10]
+    expected = [w / sum(weights) for w in weights]
+    for got, want in zip(frequencies(AliasTable(weights)), expected):
+        assert abs(got - want) < 0.005, (got, want)
+    print("✅ Draw frequencies match the weights")
+    
+    # A zero weight is never drawn, a single weight always is
+    assert frequencies(AliasTable([0, 5]), draws=10_000)[0] == 0
+    assert frequencies(AliasTable([3.5]), draws=100) == [1.0]
+    # All-zero weights fall back to uniform
+    for got in frequencies(AliasTable([0, 0, 0, 0])):
+        assert abs(got - 0.25) < 0.005, got
+    print("✅ Zero, single and all-zero weights behave")
+    
+    try:
+        AliasTable([])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("an empty table should raise ValueError")
+    print("✅ Empty weights are rejected")
+
+if __name__ == "__main__":
+    test_alias_table()
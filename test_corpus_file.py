@@ -0,0 +1,63 @@
+import sys
+import os
+import csv
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.services.corpus_file import CorpusFormatError, load_corpus, load_csv, write_corpus
+from bot.services.quote_index import QuoteIndex
+
+QUOTES = [
+    {'id': '2', 'quote': 'Stay hungry, stay foolish.', 'author': 'Steve Jobs', 'topic': 'Innovation',
+     'tone': 'Inspirational', 'takeaway': 'Keep learning.'},
+    {'id': '7', 'quote': 'Ça ira — “it will be fine”.', 'author': 'Anonymous', 'topic': 'Hope',
+     'tone': '', 'takeaway': ''},
+    {'id': '9', 'quote': 'Leadership is the capacity to translate vision into reality.',
+     'author': 'Warren Bennis', 'topic': 'Leadership', 'tone': 'Educational', 'takeaway': ''},
+]
+
+def test_corpus_round_trip():
+    print("Testing the binary corpus compile → load round-trip...")
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'quotes.csv')
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(QUOTES[0]))
+            writer.writeheader()
+            writer.writerows(QUOTES)
+        
+        store = load_csv(csv_path)
+        index = QuoteIndex(store)
+        corpus_path = os.path.join(directory, 'quotes.qbin')
+        write_corpus(store, index, corpus_path)
+        
+        loaded, loaded_index = load_corpus(corpus_path)
+        try:
+            # Same quotes, same version, same lookups
+            assert loaded.version == store.version
+            assert [dict(q) for q in loaded] == [dict(q) for q in store]
+            assert loaded.get(7)['quote'] == 'Ça ira — “it will be fine”.'
+            print("✅ Quotes and version survive the round-trip")
+            
+            # The memory-mapped posting lists answer like freshly built ones
+            lookups = [('topic_mask', ['Innovation']), ('topic_mask', ['vision']),
+                       ('author_mask', 'steve jobs'), ('author_mask', 'nobody'),
+                       ('length_mask', 'short')]
+            for method, key in lookups:
+                assert getattr(loaded_index, method)(key) == getattr(index, method)(key), (method, key)
+            print("✅ Loaded indexes match the ones built from the CSV")
+        finally:
+            del loaded, loaded_index
+        
+        # Anything that isn't a corpus is rejected, not half-loaded
+        with open(corpus_path, 'wb') as f:
+            f.write(b'not a corpus')
+        try:
+            load_corpus(corpus_path)
+        except CorpusFormatError:
+            pass
+        else:
+            raise AssertionError("a corrupt corpus should raise CorpusFormatError")
+        print("✅ Corrupt corpus files raise CorpusFormatError")
+
+if __name__ == "__main__":
+    test_corpus_round_trip()
@@ -1,8 +1,13 @@
 import sys
 import os
+import sqlite3
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from quote_bot.db import init_db, add_user, get_active_users, update_user_status
+from quote_bot.db import get_connection, schema_version, check_query_plans
+from quote_bot.db import save_user_preferences, get_user_preferences
+from quote_bot.db.user_repository import get_user_prefs
+from quote_bot.db.migrations import MIGRATIONS, run_migrations
 
 def test_database():
     print("Testing database initialization...")
@@ -11,11 +16,33 @@ def test_database():
     init_db()
     print("✅ Database initialized successfully")
     
+    # Test that every migration has been applied
+    conn = get_connection()
+    try:
+        version = schema_version(conn.cursor())
+        assert version == MIGRATIONS[-1][0], f"schema at version {version}"
+        print(f"✅ Schema at version {version}")
+        
+        # Test that the hot queries are index searches
+        problems = check_query_plans(conn)
+        assert not problems, "Query plan regressions:\n" + "\n".join(problems)
+        print("✅ Hot queries use indexes")
+    finally:
+        conn.close()
+    
     # Test adding a user
     test_user_id = 12345
     add_user(test_user_id, "Test User", "testuser")
     print("✅ Test user added")
     
+    # Test that saving preferences keeps a stored timezone
+    save_user_preferences(test_user_id, {'topics': ['Focus'], 'timezone': 'Europe/Paris'})
+    save_user_preferences(test_user_id, {'topics': ['Growth']})
+    assert get_user_preferences(test_user_id)['topics'] == ['Growth']
+    assert get_user_preferences(test_user_id)['timezone'] == 'Europe/Paris'
+    assert get_user_prefs(test_user_id)['timezone'] == 'Europe/Paris'
+    print("✅ Preference saves keep the timezone")
+    
     # Test getting active users
     active_users = get_active_users()
     print(f"Active users: {active_users}")
@@ -31,5 +58,72 @@ def test_database():
     
     print("✅ All database tests passed!")
 
+def test_legacy_interactions_migration():
+    print("Testing migration of legacy interactions...")
+    
+    # A database from before the migrations: interactions stored the quote
+    # text, and the corpus ids have since drifted away from the stored ones
+    conn = sqlite3.connect(":memory:")
+    conn.executescript('''
+    CREATE TABLE quotes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        quote TEXT NOT NULL,
+        author TEXT,
+        topic TEXT,
+        tone TEXT,
+        takeaway TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE quote_interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        quote_id INTEGER,
+        is_liked INTEGER DEFAULT 0,
+        is_disliked INTEGER DEFAULT 0,
+        is_favorited INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP,
+        quote_text TEXT,
+        quote_author TEXT,
+        UNIQUE(user_id, quote_id)
+    );
+    INSERT INTO quotes (id, quote, author) VALUES
+        (1, 'The best time to plant a tree was 20 years ago.', 'Chinese Proverb'),
+        (2, 'The only limit to our realization of tomorrow is our doubts of today.', 'Franklin D. Roosevelt');
+    INSERT INTO quote_interactions (user_id, quote_id, is_liked, is_disliked, is_favorited, quote_text, quote_author) VALUES
+        (1, 1, 1, 0, 0, 'The only limit to our realization of tomorrow is our doubts of today.', 'Franklin D. Roosevelt'),
+        (1, 7, 0, 1, 0, 'The best time to plant a tree was 20 years ago.', 'Chinese Proverb'),
+        (1, 2, 1, 0, 0, 'Stay hungry, stay foolish.', 'Steve Jobs'),
+        (1, -50, 0, 0, 1, 'Small steps every day.', 'Anonymous' || char(10, 10) || '💡 Takeaway: Keep going'),
+        (2, -60, 1, 0, 0, 'Small steps every day.', 'Anonymous'),
+        (2, 2, NULL, 1, NULL, 'The only limit to our realization of tomorrow is our doubts of today.', 'Franklin D. Roosevelt');
+    ''')
+    try:
+        run_migrations(conn)
+        
+        # Interactions follow their text, not their stored id
+        interactions = conn.execute(
+            "SELECT user_id, quote_id, flags FROM quote_interactions ORDER BY user_id, quote_id"
+        ).fetchall()
+        assert interactions == [(1, -50, 4), (1, -1, 1), (1, 1, 2), (1, 2, 1), (2, -50, 1), (2, 2, 2)], interactions
+        print("✅ Interactions relinked to the corpus by content")
+        
+        # Text missing from the corpus became one ai_quotes row per quote
+        ai_quotes = conn.execute("SELECT id, quote, author, takeaway FROM ai_quotes ORDER BY id").fetchall()
+        assert ai_quotes == [
+            (-50, 'Small steps every day.', 'Anonymous', 'Keep going'),
+            (-1, 'Stay hungry, stay foolish.', 'Steve Jobs', None),
+        ], ai_quotes
+        print("✅ Unmatched quotes moved to ai_quotes")
+        
+        stats = conn.execute(
+            "SELECT quote_id, likes, dislikes, favorites FROM quote_stats WHERE likes + dislikes + favorites > 0 ORDER BY quote_id"
+        ).fetchall()
+        assert stats == [(-50, 1, 0, 1), (-1, 1, 0, 0), (1, 0, 1, 0), (2, 1, 1, 0)], stats
+        print("✅ Quote stats recounted")
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     test_database()
+    test_legacy_interactions_migration()
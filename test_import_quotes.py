@@ -0,0 +1,76 @@
+import sys
+import os
+import csv
+import sqlite3
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from import_quotes import import_quotes
+from quote_bot.db.migrations import run_migrations
+
+FIELDS = ['quote', 'author', 'topic', 'tone', 'takeaway']
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerows(rows)
+
+def snapshot(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        quotes = {quote: (quote_id, topic) for quote_id, quote, topic
+                  in conn.execute("SELECT id, quote, topic FROM quotes")}
+        version = conn.execute("SELECT version FROM corpus_state WHERE id = 1").fetchone()
+        return quotes, version and version[0]
+    finally:
+        conn.close()
+
+def test_reimport_keeps_ids():
+    print("Testing incremental quote import...")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = Path(directory) / 'quote_bot.db'
+        csv_path = Path(directory) / 'quotes.csv'
+        conn = sqlite3.connect(db_path)
+        run_migrations(conn)
+        conn.close()
+        
+        write_csv(csv_path, [
+            ['Stay hungry, stay foolish.', 'Steve Jobs', 'Innovation', 'Inspirational', ''],
+            ['Think different.', 'Steve Jobs', 'Innovation', 'Inspirational', ''],
+            ['Well begun is half done.', 'Aristotle', 'Focus', 'Educational', ''],
+        ])
+        import_quotes(csv_path, db_path=db_path)
+        first, first_version = snapshot(db_path)
+        assert {quote: quote_id for quote, (quote_id, _) in first.items()} == {
+            'Stay hungry, stay foolish.': 1, 'Think different.': 2, 'Well begun is half done.': 3}
+        assert first_version is not None
+        print("✅ First import numbers the quotes")
+        
+        # Reordered, retagged, one new quote and a near-duplicate of an old one
+        write_csv(csv_path, [
+            ['Well begun is half done.', 'Aristotle', 'Productivity', 'Educational', ''],
+            ['Simplicity is the ultimate sophistication.', 'Leonardo da Vinci', 'Design', '', ''],
+            ['Think different.', 'Steve Jobs', 'Innovation', 'Inspirational', ''],
+            ['  stay hungry,  STAY foolish. ', 'steve jobs', 'Innovation', 'Inspirational', ''],
+            ['Stay hungry, stay foolish.', 'Steve Jobs', 'Innovation', 'Inspirational', ''],
+        ])
+        import_quotes(csv_path, batch_size=2, db_path=db_path)
+        second, second_version = snapshot(db_path)
+        assert len(second) == 4, second
+        for quote, (quote_id, _) in first.items():
+            assert second[quote][0] == quote_id, quote
+        assert second['Well begun is half done.'][1] == 'Productivity'
+        assert second['Simplicity is the ultimate sophistication.'][0] == 4
+        assert second_version != first_version
+        print("✅ Re-import keeps ids, updates in place and appends new quotes")
+        
+        # Nothing changed: nothing is written and the version stays
+        import_quotes(csv_path, db_path=db_path)
+        third, third_version = snapshot(db_path)
+        assert third == second and third_version == second_version
+        print("✅ An unchanged CSV leaves the corpus version alone")
+
+if __name__ == "__main__":
+    test_reimport_keeps_ids()
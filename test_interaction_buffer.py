@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from quote_bot.db import init_db, get_connection, add_user, interaction_buffer
+from quote_bot.db import queue_quote_interaction, get_quote_interaction, get_quote_interactions
+from quote_bot.db.interaction_buffer import InteractionBuffer
+from quote_bot.db.models import LIKED, DISLIKED
+
+buffer_module = sys.modules['quote_bot.db.interaction_buffer']
+
+TEST_USER_ID = 424242
+
+def stored_flags(user_id, quote_id):
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT flags FROM quote_interactions WHERE user_id = ? AND quote_id = ?", (user_id, quote_id)
+        ).fetchone()
+        return row and row[0]
+    finally:
+        conn.close()
+
+def held_buffer():
+    """A started buffer whose thread won't flush on its own during the test."""
+    buffer = InteractionBuffer(flush_interval_ms=60_000, max_events=1_000_000)
+    buffer.start()
+    return buffer
+
+def test_coalescing():
+    print("Testing interaction buffer coalescing...")
+    buffer = held_buffer()
+    try:
+        # Three taps on one row become one write, later taps winning
+        buffer.record(TEST_USER_ID, 9001, is_liked=1)
+        buffer.record(TEST_USER_ID, 9001, is_disliked=1)
+        buffer.record(TEST_USER_ID, 9001, is_liked=0)
+        assert len(buffer) == 1
+        assert buffer.pending(TEST_USER_ID, 9001) == {'is_liked': 0, 'is_disliked': 1}
+        assert stored_flags(TEST_USER_ID, 9001) is None
+        
+        assert buffer.flush() == 1
+        assert len(buffer) == 0
+        assert stored_flags(TEST_USER_ID, 9001) == DISLIKED
+        print("✅ Repeated taps coalesce into one row write")
+    finally:
+        buffer.stop()
+
+def test_read_your_writes():
+    print("Testing reads of buffered taps...")
+    interaction_buffer.flush_interval_ms = 60_000
+    interaction_buffer.max_events = 1_000_000
+    interaction_buffer.start()
+    try:
+        state = queue_quote_interaction(TEST_USER_ID, 9002, is_liked=1, is_disliked=0)
+        assert state == {'is_liked': True, 'is_disliked': False}
+        
+        # Not written yet, but every read already sees it
+        assert stored_flags(TEST_USER_ID, 9002) is None
+        assert get_quote_interaction(TEST_USER_ID, 9002)['is_liked']
+        assert get_quote_interactions([(TEST_USER_ID, 9002)])[TEST_USER_ID, 9002]['is_liked']
+        print("✅ Buffered taps are visible before the flush")
+    finally:
+        interaction_buffer.stop()
+    assert stored_flags(TEST_USER_ID, 9002) == LIKED
+    print("✅ Stopping the buffer writes it out")
+
+def test_failed_flush():
+    print("Testing a failed flush...")
+    buffer = held_buffer()
+    connection = buffer_module.connection
+    try:
+        buffer.record(TEST_USER_ID, 9003, is_liked=1)
+        buffer.record(TEST_USER_ID, 9004, is_disliked=1)
+        
+        def broken_connection():
+            raise RuntimeError("database is locked")
+        buffer_module.connection = broken_connection
+        assert buffer.flush() == 0
+        
+        # Everything is queued again, counters included
+        assert len(buffer) == 2
+        assert buffer._events == 2
+        assert buffer.pending(TEST_USER_ID, 9003) == {'is_liked': 1}
+        print("✅ A failed flush puts its rows back")
+        
+        # A tap made meanwhile still wins over the one put back
+        buffer.record(TEST_USER_ID, 9003, is_liked=0)
+        buffer_module.connection = connection
+        assert buffer.flush() == 2
+        assert stored_flags(TEST_USER_ID, 9003) == 0
+        assert stored_flags(TEST_USER_ID, 9004) == DISLIKED
+        print("✅ The retry writes the newest state")
+    finally:
+        buffer_module.connection = connection
+        buffer.stop()
+
+if __name__ == "__main__":
+    init_db()
+    add_user(TEST_USER_ID, "Buffer Test")
+    test_coalescing()
+    test_read_your_writes()
+    test_failed_flush()
@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from quote_bot.db import init_db, add_user, save_user_preferences, get_user_profile, profile_cache
+from quote_bot.db.cache import ProfileCache
+
+cache_module = sys.modules['quote_bot.db.cache']
+
+class FakeClock:
+    """Stands in for the time module so expiry can be stepped by hand."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+def test_ttl_expiry():
+    print("Testing profile cache TTL...")
+    clock = FakeClock()
+    real_time, cache_module.time = cache_module.time, clock
+    try:
+        cache = ProfileCache(max_entries=10, ttl=60)
+        cache.put(1, 'profile-1')
+        clock.now += 59
+        assert cache.get(1) == 'profile-1'
+        clock.now += 1
+        assert cache.get(1) is None
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'size': 0}
+        print("✅ Entries expire after ttl seconds and are dropped")
+        
+        cache.put(1, 'profile-1')
+        clock.now += 30
+        cache.put(1, 'profile-1b')
+        clock.now += 45
+        assert cache.get(1) == 'profile-1b'
+        print("✅ Storing again restarts the TTL")
+    finally:
+        cache_module.time = real_time
+
+def test_lru_eviction():
+    print("Testing profile cache LRU eviction...")
+    cache = ProfileCache(max_entries=3, ttl=60)
+    for user_id in (1, 2, 3):
+        cache.put(user_id, f'profile-{user_id}')
+    assert cache.get(1) == 'profile-1'  # 2 is now least recently used
+    cache.put(4, 'profile-4')
+    assert cache.get(2) is None
+    assert [cache.get(user_id) for user_id in (1, 3, 4)] == ['profile-1', 'profile-3', 'profile-4']
+    assert cache.stats()['size'] == 3
+    print("✅ The least recently used profile is evicted past max_entries")
+    
+    cache.invalidate(3)
+    assert cache.get(3) is None and cache.stats()['size'] == 2
+    cache.invalidate()
+    assert cache.stats()['size'] == 0
+    print("✅ invalidate drops one user or everything")
+
+def test_writes_invalidate():
+    print("Testing profile invalidation on writes...")
+    user_id = 424242
+    add_user(user_id, "Cache User", "cacheuser")
+    save_user_preferences(user_id, {'topics': ['Focus']})
+    assert get_user_profile(user_id).preferences['topics'] == ['Focus']
+    assert profile_cache.get(user_id) is not None
+    
+    save_user_preferences(user_id, {'topics': ['Growth']})
+    assert profile_cache.get(user_id) is None
+    assert get_user_profile(user_id).preferences['topics'] == ['Growth']
+    print("✅ Saving preferences invalidates the cached profile")
+
+if __name__ == "__main__":
+    init_db()
+    test_ttl_expiry()
+    test_lru_eviction()
+    test_writes_invalidate()
@@ -0,0 +1,53 @@
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.services.quote_store import QuoteStore
+from bot.services.quote_index import QuoteIndex, iter_set_bits, nth_set_bit, popcount
+
+QUOTES = [
+    {'id': 10, 'quote': 'Stay hungry, stay foolish.', 'author': 'Steve Jobs', 'topic': 'Innovation'},
+    {'id': 11, 'quote': 'Innovation distinguishes between a leader and a follower.', 'author': 'Steve Jobs', 'topic': 'Leadership'},
+    {'id': 12, 'quote': 'The best way to predict the future is to create it, one small and patient step after another, every single day.', 'author': 'Peter Drucker', 'topic': 'Innovation'},
+    {'id': 13, 'quote': 'Leadership is the capacity to translate vision into reality.', 'author': 'Warren Bennis', 'topic': 'Leadership'},
+]
+
+def ids(index, mask):
+    return [index.store.ids[pos] for pos in iter_set_bits(mask)]
+
+def test_quote_index():
+    print("Testing quote index bitmask filters...")
+    index = QuoteIndex(QuoteStore.from_rows(QUOTES))
+    
+    assert index.full_mask == 0b1111
+    assert ids(index, index.author_mask('steve jobs')) == [10, 11]
+    # A topic matches the topic column or every one of its words in the text
+    assert ids(index, index.topic_mask(['Innovation'])) == [10, 11, 12]
+    assert ids(index, index.topic_mask(['leadership', 'innovation'])) == [10, 11, 12, 13]
+    assert ids(index, index.length_mask('short')) == [10, 11, 13]
+    assert ids(index, index.length_mask('long')) == [12]
+    assert index.author_mask('nobody') == 0
+    print("✅ Single filters select the right quotes")
+    
+    # Filters combine with one AND; excluded ids are masked out
+    mask = index.topic_mask(['innovation']) & index.author_mask('Steve Jobs')
+    assert ids(index, mask) == [10, 11]
+    assert ids(index, mask & ~index.ids_mask([10, 999])) == [11]
+    print("✅ Filters combine by AND-ing masks")
+    
+    # Picks only ever come from the mask, and an empty mask picks nothing
+    rng = random.Random(1)
+    assert {index.pick(mask, rng)['id'] for _ in range(200)} == {10, 11}
+    assert index.pick(0, rng) is None
+    print("✅ Picks stay inside the mask")
+    
+    # Bit helpers agree with each other on a wide, sparse mask
+    wide = (1 << 3) | (1 << 64) | (1 << 200)
+    assert list(iter_set_bits(wide)) == [3, 64, 200]
+    assert popcount(wide) == 3
+    assert [nth_set_bit(wide, n) for n in range(3)] == [3, 64, 200]
+    print("✅ Bit helpers handle masks wider than a word")
+
+if __name__ == "__main__":
+    test_quote_index()
@@ -0,0 +1,46 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.services.quote_store import QuoteStore
+
+QUOTES = [
+    {'id': 1, 'quote': 'Stay hungry, stay foolish.', 'author': 'Steve Jobs', 'topic': 'Innovation',
+     'tone': 'Inspirational', 'takeaway': 'Keep learning.'},
+    {'id': 5, 'quote': 'Ça ira — “it will be fine”.', 'author': 'Anonymous', 'topic': 'Hope', 'tone': ''},
+    {'id': 3, 'quote': 'Think different.', 'author': 'Steve Jobs', 'topic': 'Innovation',
+     'tone': 'Inspirational', 'takeaway': None},
+]
+
+def test_quote_store():
+    print("Testing the columnar quote store...")
+    store = QuoteStore.from_rows(QUOTES)
+    
+    # Views decode every field back, missing ones as ''
+    assert len(store) == 3
+    assert dict(store[0]) == {'id': 1, 'quote': 'Stay hungry, stay foolish.', 'author': 'Steve Jobs',
+                              'topic': 'Innovation', 'tone': 'Inspirational', 'takeaway': 'Keep learning.'}
+    assert store[1]['quote'] == 'Ça ira — “it will be fine”.'
+    assert store[2]['takeaway'] == '' and store[-1]['id'] == 3
+    print("✅ Quotes round-trip through the columns, non-ASCII text included")
+    
+    # Repeated strings are stored once
+    assert len(store.authors) == 2 and len(store.topics) == 2
+    assert store.author_codes[0] == store.author_codes[2]
+    print("✅ Authors and topics are dictionary-encoded")
+    
+    # Lookups by id work whether or not the ids arrive sorted
+    assert not store.sorted_ids
+    assert store.get(5)['author'] == 'Anonymous'
+    assert store.get(4) is None
+    assert QuoteStore.from_rows(sorted(QUOTES, key=lambda q: q['id'])).get(3)['quote'] == 'Think different.'
+    try:
+        store[3]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("position past the end should raise IndexError")
+    print("✅ Quotes are found by id and by position")
+
+if __name__ == "__main__":
+    test_quote_store()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from quote_bot.db import init_db, get_connection, add_user
+from bot.services.quote_index import QuoteIndex
+from bot.services.quote_service import CorpusSnapshot, QuoteService
+from bot.services.quote_store import QuoteStore
+from bot.services.rotation import SeededPermutation
+
+TEST_USER_ID = 434343
+CORPUS_SIZE = 12
+
+def test_seeded_permutation():
+    print("Testing seeded permutations...")
+    for size in (1, 2, 3, 17, 1000, 1025):
+        for seed in (0, 1, 2**62):
+            permutation = SeededPermutation(size, seed)
+            assert sorted(permutation[i] for i in range(size)) == list(range(size)), (size, seed)
+    assert [SeededPermutation(1000, 1)[i] for i in range(20)] != [SeededPermutation(1000, 2)[i] for i in range(20)]
+    assert [SeededPermutation(1000, 1)[i] for i in range(20)] == [SeededPermutation(1000, 1)[i] for i in range(20)]
+    print("✅ Every seed gives a repeatable bijection without repeats")
+
+def corpus_service():
+    """A service over a fixed in-memory corpus, as after a load or reload of version 777."""
+    store = QuoteStore.from_rows({'id': 100 + i, 'quote': f'Quote number {i}.', 'author': 'Tester'}
+                                 for i in range(CORPUS_SIZE))
+    store.version = 777
+    service = QuoteService(selection_mode='rotation')
+    service._loaded = True
+    service._install(CorpusSnapshot(store, QuoteIndex(store)))
+    return service
+
+def test_rotation_survives_reload():
+    print("Testing the persisted rotation cursor...")
+    conn = get_connection()
+    try:
+        conn.execute("DELETE FROM quote_rotations WHERE user_id = ?", (TEST_USER_ID,))
+        conn.commit()
+    finally:
+        conn.close()
+    
+    # Part of a cycle in one process...
+    service = corpus_service()
+    shown = [service.get_quote_for_user(TEST_USER_ID)['id'] for _ in range(5)]
+    # ...and the rest after a restart, which only has the stored cursor
+    service = corpus_service()
+    shown += [service.get_quote_for_user(TEST_USER_ID)['id'] for _ in range(CORPUS_SIZE - len(shown))]
+    assert sorted(shown) == [100 + i for i in range(CORPUS_SIZE)], shown
+    print("✅ A full cycle shows every quote once, across restarts")
+    
+    # Then the next cycle starts
+    assert service.get_quote_for_user(TEST_USER_ID)['id'] in shown
+    print("✅ The rotation starts over once exhausted")
+
+if __name__ == "__main__":
+    init_db()
+    add_user(TEST_USER_ID, "Rotation Test")
+    test_seeded_permutation()
+    test_rotation_survives_reload()
@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot.services.quote_store import QuoteStore
+from bot.services.topic_search import TopicSearch, stem
+
+def test_topic_search():
+    print("Testing topic search...")
+    
+    # Suffix stripping folds inflections together...
+    assert stem('dreams') == stem('dreaming') == 'dream'
+    assert stem('happiness') == stem('happy')
+    # ...but not unrelated words that happen to share a suffix
+    assert stem('business') != stem('busy')
+    assert stem('businesses') == stem('business')
+    print("✅ Stemming keeps business apart from busy")
+    
+    store = QuoteStore.from_rows([
+        {'id': 1, 'quote': 'Build a business customers love.', 'author': 'A', 'topic': 'Entrepreneurship'},
+        {'id': 2, 'quote': 'Being busy is not the same as being productive.', 'author': 'B', 'topic': 'Focus'},
+        {'id': 3, 'quote': 'Dreams need deadlines.', 'author': 'C', 'topic': 'Goals'},
+    ])
+    search = TopicSearch(store)
+    
+    # Only quotes sharing a term with the topic are returned, best first
+    assert [store.ids[pos] for pos, _ in search.search('business', 3)] == [1]
+    assert [store.ids[pos] for pos, _ in search.search('busy', 3)] == [2]
+    assert [store.ids[pos] for pos, _ in search.search('dreaming big', 3)] == [3]
+    assert search.search('zebra', 3) == []
+    print("✅ Topic queries rank only matching quotes")
+
+if __name__ == "__main__":
+    test_topic_search()